@@ -0,0 +1,42 @@
+"""add xhs_notes_archive
+
+Revision ID: 3f8a2c1d9e47
+Revises: 492724b8b6c3
+Create Date: 2026-10-19 15:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f8a2c1d9e47'
+down_revision: Union[str, None] = '492724b8b6c3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'xhs_notes_archive',
+        sa.Column('note_id', sa.String(length=100), nullable=False),
+        sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('reason', sa.String(length=20), nullable=False),
+        sa.Column('is_deleted', sa.Boolean(), nullable=False),
+        sa.Column('title', sa.String(length=500), nullable=True),
+        sa.Column('author_user_id', sa.String(length=100), nullable=True),
+        sa.Column('last_crawl_time', sa.DateTime(), nullable=False),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('note_id'),
+    )
+    op.create_index('idx_note_archive_crawl_time', 'xhs_notes_archive', ['last_crawl_time'], unique=False)
+    op.create_index(op.f('ix_xhs_notes_archive_author_user_id'), 'xhs_notes_archive', ['author_user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_xhs_notes_archive_author_user_id'), table_name='xhs_notes_archive')
+    op.drop_index('idx_note_archive_crawl_time', table_name='xhs_notes_archive')
+    op.drop_table('xhs_notes_archive')
@@ -0,0 +1,54 @@
+"""jsonb note columns with gin indexes
+
+Revision ID: 8b1e5d7c2a90
+Revises: 3f8a2c1d9e47
+Create Date: 2026-10-19 16:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b1e5d7c2a90'
+down_revision: Union[str, None] = '3f8a2c1d9e47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# ALTER COLUMN TYPE 会重写整张表并持有排他锁，大表请在维护窗口执行
+JSON_COLUMNS = {
+    'xhs_notes': ['tags', 'image_list', 'current_tags', 'important_comment_ids', 'previous_stats'],
+    'note_tag_logs': ['old_tags', 'new_tags', 'old_stats', 'new_stats', 'related_comment_ids'],
+    'xhs_comments': ['business_keywords_found'],
+}
+
+
+def upgrade() -> None:
+    for table, columns in JSON_COLUMNS.items():
+        for column in columns:
+            op.alter_column(
+                table, column,
+                type_=postgresql.JSONB(astext_type=sa.Text()),
+                existing_type=sa.JSON(),
+                existing_nullable=True,
+                postgresql_using=f'{column}::jsonb',
+            )
+    op.create_index('idx_note_tags_gin', 'xhs_notes', ['tags'], unique=False, postgresql_using='gin')
+    op.create_index('idx_note_current_tags_gin', 'xhs_notes', ['current_tags'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('idx_note_current_tags_gin', table_name='xhs_notes', postgresql_using='gin')
+    op.drop_index('idx_note_tags_gin', table_name='xhs_notes', postgresql_using='gin')
+    for table, columns in JSON_COLUMNS.items():
+        for column in columns:
+            op.alter_column(
+                table, column,
+                type_=sa.JSON(),
+                existing_type=postgresql.JSONB(astext_type=sa.Text()),
+                existing_nullable=True,
+                postgresql_using=f'{column}::json',
+            )
@@ -0,0 +1,73 @@
+"""partial indexes for note queries
+
+Revision ID: c4d2a9e6f153
+Revises: 8b1e5d7c2a90
+Create Date: 2026-10-19 17:10:00.000000
+
+按记录到的查询形态（commands.index_advisor）替换 xhs_notes 的索引：
+- 列表、计数和导出都带 is_deleted = false，改为只覆盖未删除笔记的部分索引
+- (is_new, is_changed, is_important) 复合索引无法服务 is_new OR is_changed，
+  改为每个标志一个部分索引，由 BitmapOr 合并
+- 删除重复的 author_user_id 索引和 is_deleted 单列索引
+
+前后对比可用 commands.loadtest_read --output / --compare。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d2a9e6f153'
+down_revision: Union[str, None] = '8b1e5d7c2a90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LIVE = 'is_deleted = false'
+
+
+def upgrade() -> None:
+    # CONCURRENTLY 不能在事务中执行；逐条自动提交，建索引期间不阻塞 xhs_notes 的写入
+    with op.get_context().autocommit_block():
+        op.create_index('idx_note_live_crawl_time', 'xhs_notes', ['last_crawl_time'], unique=False,
+                        postgresql_where=sa.text(LIVE), postgresql_concurrently=True)
+        op.create_index('idx_note_live_new', 'xhs_notes', ['last_crawl_time'], unique=False,
+                        postgresql_where=sa.text(f'{LIVE} AND is_new = true'), postgresql_concurrently=True)
+        op.create_index('idx_note_live_changed', 'xhs_notes', ['last_crawl_time'], unique=False,
+                        postgresql_where=sa.text(f'{LIVE} AND is_changed = true'), postgresql_concurrently=True)
+        op.create_index('idx_note_live_important', 'xhs_notes', ['last_crawl_time'], unique=False,
+                        postgresql_where=sa.text(f'{LIVE} AND is_important = true'), postgresql_concurrently=True)
+        op.create_index('idx_note_live_author', 'xhs_notes', ['author_user_id', 'last_crawl_time'], unique=False,
+                        postgresql_where=sa.text(LIVE), postgresql_concurrently=True)
+        op.create_index('idx_note_deleted_crawl_time', 'xhs_notes', ['last_crawl_time'], unique=False,
+                        postgresql_where=sa.text('is_deleted = true'), postgresql_concurrently=True)
+
+        op.drop_index('idx_note_crawl_time', table_name='xhs_notes', postgresql_concurrently=True)
+        op.drop_index('idx_note_tags', table_name='xhs_notes', postgresql_concurrently=True)
+        op.drop_index('idx_author_id', table_name='xhs_notes', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_xhs_notes_author_user_id'), table_name='xhs_notes', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_xhs_notes_is_deleted'), table_name='xhs_notes', postgresql_concurrently=True)
+        # 模型中曾声明但从未迁移创建
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS idx_note_deleted')
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(op.f('ix_xhs_notes_is_deleted'), 'xhs_notes', ['is_deleted'], unique=False,
+                        postgresql_concurrently=True)
+        op.create_index(op.f('ix_xhs_notes_author_user_id'), 'xhs_notes', ['author_user_id'], unique=False,
+                        postgresql_concurrently=True)
+        op.create_index('idx_author_id', 'xhs_notes', ['author_user_id'], unique=False,
+                        postgresql_concurrently=True)
+        op.create_index('idx_note_tags', 'xhs_notes', ['is_new', 'is_changed', 'is_important'], unique=False,
+                        postgresql_concurrently=True)
+        op.create_index('idx_note_crawl_time', 'xhs_notes', ['last_crawl_time'], unique=False,
+                        postgresql_concurrently=True)
+
+        op.drop_index('idx_note_deleted_crawl_time', table_name='xhs_notes', postgresql_concurrently=True)
+        op.drop_index('idx_note_live_author', table_name='xhs_notes', postgresql_concurrently=True)
+        op.drop_index('idx_note_live_important', table_name='xhs_notes', postgresql_concurrently=True)
+        op.drop_index('idx_note_live_changed', table_name='xhs_notes', postgresql_concurrently=True)
+        op.drop_index('idx_note_live_new', table_name='xhs_notes', postgresql_concurrently=True)
+        op.drop_index('idx_note_live_crawl_time', table_name='xhs_notes', postgresql_concurrently=True)
@@ -0,0 +1,41 @@
+"""unique business keyword
+
+Revision ID: d71f3b8e0a26
+Revises: c4d2a9e6f153
+Create Date: 2026-10-19 19:30:00.000000
+
+关键词批量导入使用 INSERT ... ON CONFLICT (keyword)，需要 keyword 上的唯一索引。
+升级前先去重：同一关键词保留最近更新的一条。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd71f3b8e0a26'
+down_revision: Union[str, None] = 'c4d2a9e6f153'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        DELETE FROM business_keywords
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (
+                    PARTITION BY keyword ORDER BY updated_at DESC, created_at DESC, id
+                ) AS duplicate_rank
+                FROM business_keywords
+            ) ranked
+            WHERE duplicate_rank > 1
+        )
+    """)
+    op.drop_index(op.f('ix_business_keywords_keyword'), table_name='business_keywords')
+    op.create_index(op.f('ix_business_keywords_keyword'), 'business_keywords', ['keyword'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_business_keywords_keyword'), table_name='business_keywords')
+    op.create_index(op.f('ix_business_keywords_keyword'), 'business_keywords', ['keyword'], unique=False)
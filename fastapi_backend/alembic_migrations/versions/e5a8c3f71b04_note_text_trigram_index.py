@@ -0,0 +1,37 @@
+"""note text trigram index
+
+Revision ID: e5a8c3f71b04
+Revises: d71f3b8e0a26
+Create Date: 2026-10-19 21:00:00.000000
+
+关键词预览（POST /api/keywords/preview）按入库时的重要性规则匹配
+lower(标题 || ' ' || 描述) LIKE '%关键词%'，为该表达式建立 pg_trgm GIN 索引。
+表达式须与 app.models.note.note_search_text 完全一致。
+索引以 CONCURRENTLY 方式创建和删除，不阻塞回调写入 xhs_notes；CONCURRENTLY 不能在事务中执行，
+因此放在 autocommit_block 中。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a8c3f71b04'
+down_revision: Union[str, None] = 'd71f3b8e0a26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    with op.get_context().autocommit_block():
+        op.execute("""
+            CREATE INDEX CONCURRENTLY idx_note_live_text_trgm ON xhs_notes
+            USING gin (lower(coalesce(title, '') || ' ' || coalesce("desc", '')) gin_trgm_ops)
+            WHERE is_deleted = false
+        """)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('idx_note_live_text_trgm', table_name='xhs_notes', postgresql_concurrently=True)
@@ -0,0 +1,38 @@
+"""add webhook receipts
+
+Revision ID: f2b6d9a4c815
+Revises: e5a8c3f71b04
+Create Date: 2026-10-19 22:30:00.000000
+
+webhook 回调幂等记录：以请求体 SHA-256 为主键，重复回调直接返回首次结果。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b6d9a4c815'
+down_revision: Union[str, None] = 'e5a8c3f71b04'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('webhook_receipts',
+    sa.Column('digest', sa.LargeBinary(length=32), nullable=False),
+    sa.Column('run_id', sa.String(length=100), nullable=True),
+    sa.Column('response', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('completed', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('digest')
+    )
+    op.create_index(op.f('ix_webhook_receipts_expires_at'), 'webhook_receipts', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_webhook_receipts_expires_at'), table_name='webhook_receipts')
+    op.drop_table('webhook_receipts')
@@ -13,6 +13,70 @@ class Settings(BaseSettings):
     TEST_DATABASE_URL: str | None = None
     EXPIRE_ON_COMMIT: bool = False
     AUTO_MIGRATE: bool = False  # Default to False
+    # 连接池大小，0 表示不使用连接池（NullPool，适合 Vercel 等 serverless 环境）
+    # 常驻进程部署建议开启，连接复用后 asyncpg 的预编译语句缓存才能生效
+    DB_POOL_SIZE: int = 0
+    DB_MAX_OVERFLOW: int = 10
+    # 只读副本，配置后查询类接口走副本，写入仍走主库
+    READ_DATABASE_URL: str | None = None
+    # 写入后的读主库窗口（秒），应大于副本的复制延迟
+    READ_AFTER_WRITE_SECONDS: float = 5.0
+
+    # 事件广播后端：memory（单进程）或 postgres（LISTEN/NOTIFY，多 worker 部署时使用）
+    PUBSUB_BACKEND: str = "memory"
+
+    # 进程内响应缓存条目数（按 ETag 缓存轮询接口的响应体），0 表示关闭
+    RESPONSE_CACHE_MAX_ENTRIES: int = 256
+
+    # 慢查询追踪：超过阈值（毫秒）的语句记录日志，0 表示关闭
+    SLOW_QUERY_THRESHOLD_MS: int = 500
+    # 对最慢的只读语句采样 EXPLAIN (ANALYZE, BUFFERS)，会把语句再执行一遍，按需开启
+    SLOW_QUERY_EXPLAIN: bool = False
+    # 管理接口保留的最近慢查询和执行计划条数
+    SLOW_QUERY_BUFFER_SIZE: int = 50
+
+    # 笔记归档：超过 ARCHIVE_COLD_DAYS 天未再爬取或已软删除的笔记移入归档表
+    # ARCHIVE_INTERVAL_HOURS 为 0 时不在进程内定期执行，可改用 commands.archive_notes 配合 cron
+    ARCHIVE_COLD_DAYS: int = 90
+    ARCHIVE_BATCH_SIZE: int = 1000
+    ARCHIVE_INTERVAL_HOURS: float = 0
+
+    # 关键词注册表最长缓存时间（秒），兜底直接修改数据库、未经接口通知的情况
+    KEYWORD_REGISTRY_MAX_AGE_SECONDS: float = 300
+
+    # 关键词影响预览：默认时间预算、抽样行数，估算命中数不超过 EXACT_LIMIT 时才精确统计
+    KEYWORD_PREVIEW_TIME_BUDGET_MS: int = 3000
+    KEYWORD_PREVIEW_SAMPLE_ROWS: int = 20000
+    KEYWORD_PREVIEW_EXACT_LIMIT: int = 20000
+
+    # 入库 CPU 计算（关键词匹配等）：inline 在事件循环中计算，process 分块提交到常驻进程池并行计算
+    INGEST_CPU_MODE: str = "inline"
+    # 每个进程的进程池大小，0 表示 min(4, CPU 核数) // WEB_CONCURRENCY（至少 1）；
+    # gunicorn 的每个 worker 各有一个进程池，显式设置时总进程数为 WEB_CONCURRENCY × INGEST_CPU_WORKERS
+    INGEST_CPU_WORKERS: int = 0
+    INGEST_CPU_CHUNK_SIZE: int = 500
+    # 回调笔记按 note_id 哈希分区并行入库的分区数，每个分区占用一个数据库连接；
+    # 上限为 DB_POOL_SIZE，进程内所有批次的额外分区合计最多占用 DB_POOL_SIZE - 1 个连接
+    INGEST_LANES: int = 1
+
+    # webhook 请求体 HMAC-SHA256 签名密钥（X-Hub-Signature-256），为空时不校验
+    WEBHOOK_SECRET: str | None = None
+    # 签名校验通过的回调跳过笔记的 Pydantic 校验（只做转换）
+    WEBHOOK_TRUST_SIGNED_PAYLOADS: bool = False
+
+    # webhook 幂等记录的保留时间（小时），期间相同请求体的重试直接返回首次结果
+    WEBHOOK_RECEIPT_TTL_HOURS: float = 48
+    # 未完成的记录（worker 在处理中退出）超过该时间（秒）后可被重试重新抢占，应大于单次回调的正常处理时间
+    WEBHOOK_RECEIPT_LEASE_SECONDS: float = 600
+
+    # Logging
+    # 输出格式：json（每行一个 JSON 对象）或 text
+    LOG_FORMAT: str = "json"
+    LOG_LEVEL: str = "INFO"
+    # 按 logger 单独设置级别，逗号分隔，如 "fastapi_app.notes=DEBUG,sqlalchemy.engine=INFO"
+    LOG_LEVELS: str = ""
+    # 逐条笔记日志（fastapi_app.notes）的采样比例，1 表示全部输出
+    LOG_NOTE_SAMPLE_RATE: float = 1.0
 
     # User
     ACCESS_SECRET_KEY: str
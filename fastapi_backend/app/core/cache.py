@@ -0,0 +1,164 @@
+"""
+响应缓存校验
+基于数据版本号生成 ETag，支持 If-None-Match 条件请求和进程内响应缓存
+"""
+
+import asyncio
+import hashlib
+import secrets
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from app.config import settings
+from app.core.pubsub import pubsub
+from app.core.read_routing import prefers_primary
+from app.core.serialization import RawJSONResponse
+
+# 单个响应超过该大小时不放入进程内缓存
+MAX_CACHED_BODY_BYTES = 1024 * 1024
+# 多 worker 之间同步数据版本的通道
+DATA_VERSION_CHANNEL = "data_version"
+
+
+class DataVersion:
+    """
+    数据版本号
+
+    每个作用域（如 notes、tasks）一个版本标记，数据写入后调用 bump()；
+    标记由进程启动标识和递增计数组成，重启或 worker 回收后不会与旧 ETag 冲突。
+
+    多 worker 部署（PUBSUB_BACKEND=postgres）时，bump() 把新标记经 LISTEN/NOTIFY 广播，
+    所有 worker 按通知顺序采用同一标记，因此各 worker 生成的 ETag 一致，
+    一个 worker 上的写入也会让其他 worker 的 ETag 和响应缓存失效。
+    """
+
+    def __init__(self) -> None:
+        self._boot_id = secrets.token_hex(4)
+        self._counter = 0
+        self._versions: Dict[str, str] = {}
+        self._bumped_at: Dict[str, float] = {}
+        self._pending: Set[asyncio.Task] = set()
+
+    def get(self, scope: str) -> str:
+        return self._versions.get(scope, f"{self._boot_id}.0")
+
+    def bump(self, *scopes: str) -> None:
+        self._counter += 1
+        token = f"{self._boot_id}.{self._counter}"
+        self._apply(scopes, token)
+        self._broadcast(scopes, token)
+
+    def receive(self, message: Dict[str, Any]) -> None:
+        """处理其他 worker（以及本进程经由 NOTIFY 回来）的版本变更"""
+        self._apply(message["scopes"], message["token"])
+
+    def changed_within(self, scopes: Iterable[str], seconds: float) -> bool:
+        """最近 seconds 秒内这些作用域是否有写入"""
+        now = time.monotonic()
+        return any(now - self._bumped_at.get(scope, float("-inf")) < seconds for scope in scopes)
+
+    def _apply(self, scopes: Iterable[str], token: str) -> None:
+        now = time.monotonic()
+        for scope in scopes:
+            self._versions[scope] = token
+            self._bumped_at[scope] = now
+
+    def _broadcast(self, scopes: Tuple[str, ...], token: str) -> None:
+        if not pubsub.distributed:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(pubsub.publish(DATA_VERSION_CHANNEL, {"scopes": list(scopes), "token": token}))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+
+class ResponseCache:
+    """以 ETag 为键的 LRU 响应缓存，数据版本变化后旧条目自然失效"""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+
+    def get(self, etag: str) -> Optional[bytes]:
+        body = self._entries.get(etag)
+        if body is not None:
+            self._entries.move_to_end(etag)
+        return body
+
+    def put(self, etag: str, body: bytes) -> None:
+        if self.max_entries <= 0 or len(body) > MAX_CACHED_BODY_BYTES:
+            return
+        self._entries[etag] = body
+        self._entries.move_to_end(etag)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+data_version = DataVersion()
+pubsub.subscribe(DATA_VERSION_CHANNEL, data_version.receive)
+response_cache = ResponseCache(settings.RESPONSE_CACHE_MAX_ENTRIES)
+
+
+def _day_marker() -> str:
+    """统计和 today_only 依赖“今天”，跨天（UTC 与中国时区）时 ETag 也要变化"""
+    now = datetime.utcnow()
+    return f"{now:%Y%m%d}.{now + timedelta(hours=8):%Y%m%d}"
+
+
+def compute_etag(request: Request, scopes: Iterable[str]) -> str:
+    """由路径、排序后的查询参数和相关作用域的数据版本计算 ETag"""
+    query = "&".join(f"{key}={value}" for key, value in sorted(request.query_params.multi_items()))
+    versions = ",".join(data_version.get(scope) for scope in scopes)
+    raw = f"{request.url.path}?{query}|{versions}|{_day_marker()}"
+    return '"' + hashlib.blake2b(raw.encode("utf-8"), digest_size=12).hexdigest() + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+async def versioned_json_response(
+    request: Request,
+    scopes: Tuple[str, ...],
+    build: Callable[[], Awaitable[bytes]],
+) -> Response:
+    """
+    带版本校验的 JSON 响应
+
+    If-None-Match 命中时直接返回 304，不访问数据库；其次查进程内缓存；
+    都未命中时调用 build() 生成响应体并缓存。build() 查询失败时必须抛出异常（不能返回空结果），
+    异常原样传出，不缓存也不下发 ETag。
+
+    从只读副本读取且刚有写入时，副本可能还没追上新版本，
+    此时不下发 ETag 也不缓存，避免把旧数据记在新版本号下。
+    """
+    if not prefers_primary(request) and data_version.changed_within(scopes, settings.READ_AFTER_WRITE_SECONDS):
+        return RawJSONResponse(await build(), headers={"Cache-Control": "no-cache"})
+
+    etag = compute_etag(request, scopes)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    body = response_cache.get(etag)
+    if body is None:
+        body = await build()
+        response_cache.put(etag, body)
+
+    return RawJSONResponse(body, headers=headers)
@@ -0,0 +1,56 @@
+"""
+多 worker 协调
+多进程部署（gunicorn 多个 worker）时，定时归档这类单例任务通过 Postgres 会话级咨询锁
+（pg_try_advisory_lock）选出一个 worker 执行；持锁 worker 退出后连接断开、锁自动释放，
+其余 worker 在下次重试时接管。
+"""
+
+import asyncio
+import hashlib
+from typing import Awaitable, Callable
+
+from sqlalchemy import text
+
+from app.core.logger import app_logger as logger
+
+# 未抢到锁的 worker 重试间隔（秒）
+RETRY_INTERVAL_SECONDS = 60
+
+
+def advisory_lock_key(name: str) -> int:
+    """把任务名映射为 pg_advisory_lock 使用的 64 位有符号整数"""
+    digest = hashlib.blake2b(f"xiuer:{name}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+async def run_singleton(
+    name: str,
+    job: Callable[[], Awaitable[None]],
+    retry_interval: float = RETRY_INTERVAL_SECONDS,
+) -> None:
+    """
+    在所有 worker 中只运行一份 job
+
+    每个 worker 都启动该协程：抢到锁的 worker 执行 job（通常是一个不返回的循环），
+    锁由专用连接持有（AUTOCOMMIT，不留空闲事务）；其余 worker 每隔 retry_interval 秒重试。
+    job 异常退出时释放锁，稍后由任一 worker 重新获取。
+    """
+    from app.database import engine
+
+    key = advisory_lock_key(name)
+    while True:
+        try:
+            async with engine.connect() as conn:
+                conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                acquired = (await conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": key})).scalar()
+                if acquired:
+                    logger.info(f"获得单例任务锁，开始执行: {name}")
+                    try:
+                        await job()
+                    finally:
+                        await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"单例任务 {name} 执行失败: {str(e)}")
+        await asyncio.sleep(retry_interval)
@@ -0,0 +1,112 @@
+"""
+任务事件推送
+把任务开始、进度、入库批次、完成/失败等事件分发给 SSE 订阅者
+"""
+
+import asyncio
+import itertools
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional, Set
+
+from app.core.logger import app_logger as logger
+from app.core.pubsub import MessageTooLarge, pubsub
+from app.core.serialization import json_dumps
+
+TASK_EVENTS_CHANNEL = "task_events"
+
+# 任务事件类型
+EVENT_STARTED = "started"
+EVENT_PROGRESS = "progress"
+EVENT_INGEST_CHUNK = "ingest_chunk"
+EVENT_COMPLETED = "completed"
+EVENT_FAILED = "failed"
+TERMINAL_EVENTS = {EVENT_COMPLETED, EVENT_FAILED}
+
+# 每个订阅者最多积压的事件数，消费过慢时丢弃最旧的事件
+SUBSCRIBER_QUEUE_SIZE = 100
+# 为新订阅者保留最近事件的任务数
+LAST_EVENT_TASKS = 1000
+# 入库事件中附带的错误条数和每条的最大长度，完整错误列表记录在 webhook 回执（webhook_receipts）中
+MAX_EVENT_ERRORS = 5
+MAX_EVENT_ERROR_LENGTH = 200
+
+
+def ingest_chunk_data(result: Dict[str, Any]) -> Dict[str, Any]:
+    """入库批次事件的数据：计数、错误总数和少量错误样例"""
+    errors = result.get("errors") or []
+    return {
+        **{key: value for key, value in result.items() if key != "errors"},
+        "error_count": len(errors),
+        "errors": [error[:MAX_EVENT_ERROR_LENGTH] for error in errors[:MAX_EVENT_ERRORS]],
+    }
+
+
+class TaskEventBroker:
+    """按 task_id 分发事件，并保留每个任务的最后一个事件供新订阅者补发"""
+
+    def __init__(self) -> None:
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self._last_events: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._ids = itertools.count(1)
+
+    async def publish(self, task_id: Optional[str], event: str, data: Optional[Dict[str, Any]] = None) -> None:
+        if not task_id:
+            return
+        message = {
+            "task_id": str(task_id),
+            "event": event,
+            "data": data or {},
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+        try:
+            await pubsub.publish(TASK_EVENTS_CHANNEL, message)
+        except MessageTooLarge as e:
+            # 订阅者仍能收到事件类型，数据只标记为已截断
+            logger.warning(f"任务 {task_id} 的 {event} 事件数据过大，已省略: {str(e)}")
+            await pubsub.publish(TASK_EVENTS_CHANNEL, {**message, "data": {"truncated": True}})
+
+    def dispatch(self, message: Dict[str, Any]) -> None:
+        task_id = message["task_id"]
+        message["id"] = next(self._ids)
+
+        self._last_events[task_id] = message
+        self._last_events.move_to_end(task_id)
+        while len(self._last_events) > LAST_EVENT_TASKS:
+            self._last_events.popitem(last=False)
+
+        for queue in self._subscribers.get(task_id, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    @contextmanager
+    def subscribe(self, task_id: str) -> Iterator[asyncio.Queue]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        last_event = self._last_events.get(task_id)
+        if last_event is not None:
+            queue.put_nowait(last_event)
+        self._subscribers[task_id].add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers.get(task_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[task_id]
+
+
+def format_sse(event: str, data: Any, event_id: Optional[int] = None) -> bytes:
+    """编码为一条 Server-Sent Events 消息"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json_dumps(data).decode('utf-8')}")
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+
+task_events = TaskEventBroker()
+pubsub.subscribe(TASK_EVENTS_CHANNEL, task_events.dispatch)
@@ -0,0 +1,200 @@
+"""
+入库 CPU 计算
+笔记入库中的纯 CPU 步骤（文本归一化、关键词匹配、互动阈值判断）与数据库 I/O 分开：
+
+- INGEST_CPU_MODE=inline：在事件循环线程中直接计算（单进程开发、测试环境）
+- INGEST_CPU_MODE=process：批次按 INGEST_CPU_CHUNK_SIZE 分块，提交到常驻的 ProcessPoolExecutor 并行计算，
+  事件循环在等待的同时继续处理前面笔记的数据库读写，大回调不再阻塞其他请求
+
+关键词集合编译为一个正则（re.escape 后按长度降序组成的多选分支），工作进程按版本号缓存编译结果，
+关键词变化后各进程在收到的第一个块上重新编译一次；进程池在启动时预热，避免首个批次承担进程启动开销。
+"""
+
+import asyncio
+import multiprocessing
+import os
+import re
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.config import settings
+from app.core.logger import app_logger as logger
+
+INLINE = "inline"
+PROCESS = "process"
+
+# (标题, 正文, 阈值字段对应的互动数...)
+NotePayload = Tuple[Any, ...]
+
+
+class KeywordMatcher:
+    """关键词子串匹配（小写），所有关键词编译为一个正则"""
+
+    def __init__(self, terms: Sequence[str]) -> None:
+        self.terms = tuple(terms)
+        unique = sorted({term for term in self.terms if term}, key=len, reverse=True)
+        self._pattern = re.compile("|".join(map(re.escape, unique))) if unique else None
+
+    def matches(self, text: str) -> bool:
+        return self._pattern is not None and self._pattern.search(text) is not None
+
+
+def note_payload(note: Any, threshold_fields: Sequence[str]) -> NotePayload:
+    """发送给工作进程的最小数据，避免序列化整条笔记"""
+    return (note.title, note.desc, *[getattr(note, field) for field in threshold_fields])
+
+
+def score_notes(matcher: KeywordMatcher, thresholds: Sequence[int], payloads: Sequence[NotePayload]) -> List[bool]:
+    """标题或正文包含关键词，或任一互动数超过阈值的笔记为重要笔记"""
+    scores = []
+    for title, desc, *counts in payloads:
+        important = matcher.matches(f"{title or ''} {desc or ''}".lower())
+        if not important:
+            important = any(count > threshold for count, threshold in zip(counts, thresholds))
+        scores.append(important)
+    return scores
+
+
+# ---- 工作进程 ----
+
+_worker_version: Optional[int] = None
+_worker_matcher = KeywordMatcher(())
+
+
+def _warm_worker() -> int:
+    return os.getpid()
+
+
+def _score_chunk(version: int, terms: Tuple[str, ...], thresholds: Tuple[int, ...], payloads: List[NotePayload]) -> List[bool]:
+    global _worker_version, _worker_matcher
+    if version != _worker_version:
+        _worker_matcher = KeywordMatcher(terms)
+        _worker_version = version
+    return score_notes(_worker_matcher, thresholds, payloads)
+
+
+# ---- 调度 ----
+
+class ImportanceScores:
+    """按块计算的重要性结果，get(i) 只等待第 i 条笔记所在的块"""
+
+    def __init__(
+        self,
+        chunks: List["asyncio.Future[List[bool]]"],
+        chunk_size: int,
+        fallback: Optional[Callable[[int], List[bool]]] = None,
+    ) -> None:
+        self._chunks = chunks
+        self._chunk_size = chunk_size
+        # 进程池计算失败（如工作进程崩溃）时在当前进程重新计算该块
+        self._fallback = fallback
+        self._recovered: Dict[int, List[bool]] = {}
+
+    async def get(self, index: int) -> bool:
+        chunk, offset = divmod(index, self._chunk_size)
+        if chunk in self._recovered:
+            return self._recovered[chunk][offset]
+        try:
+            return (await self._chunks[chunk])[offset]
+        except Exception as e:
+            if self._fallback is None:
+                raise
+            logger.warning(f"入库计算进程池执行失败，改为在当前进程计算: {str(e)}")
+            self._recovered[chunk] = self._fallback(chunk)
+            return self._recovered[chunk][offset]
+
+
+def default_workers() -> int:
+    """
+    INGEST_CPU_WORKERS=0 时每个进程的池大小：min(4, CPU 核数) 按 gunicorn worker 数（WEB_CONCURRENCY）均分，
+    至少为 1，各 worker 的进程池合计不超过 CPU 核数
+    """
+    web_workers = max(int(os.getenv("WEB_CONCURRENCY") or 1), 1)
+    return max(min(4, os.cpu_count() or 1) // web_workers, 1)
+
+
+class IngestCpuPool:
+    def __init__(self, mode: str, workers: int, chunk_size: int) -> None:
+        if mode not in (INLINE, PROCESS):
+            raise ValueError(f"未知的 INGEST_CPU_MODE: {mode}")
+        self.mode = mode
+        self.workers = workers or default_workers()
+        self.chunk_size = chunk_size
+        self._executor: Optional[Executor] = None
+        self._inline_matcher = KeywordMatcher(())
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            # spawn：工作进程不继承事件循环和数据库连接
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def matcher(self, terms: Tuple[str, ...]) -> KeywordMatcher:
+        """当前进程内使用的编译结果，关键词变化时重新编译"""
+        if self._inline_matcher.terms != terms:
+            self._inline_matcher = KeywordMatcher(terms)
+        return self._inline_matcher
+
+    async def start(self) -> None:
+        """预热：启动全部工作进程并完成模块导入"""
+        if self.mode != PROCESS:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            pids = await asyncio.gather(*[loop.run_in_executor(self.executor, _warm_worker) for _ in range(self.workers)])
+        except Exception as e:
+            # 启动失败不影响服务，提交计算时会重建进程池，仍失败则在当前进程计算
+            logger.error(f"入库计算进程池启动失败: {str(e)}")
+            self.shutdown()
+            return
+        logger.info(f"入库计算进程池已启动: {len(set(pids))} 个进程")
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _submit(self, loop: asyncio.AbstractEventLoop, fn: Callable[..., Any], *args: Any) -> "asyncio.Future[Any]":
+        try:
+            return loop.run_in_executor(self.executor, fn, *args)
+        except BrokenProcessPool:
+            # 工作进程异常退出后进程池不可再用，重建一次
+            logger.warning("入库计算进程池已损坏，重新创建")
+            self.shutdown()
+            return loop.run_in_executor(self.executor, fn, *args)
+
+    def score(self, notes: Sequence[Any], terms: Tuple[str, ...], thresholds: Dict[str, int]) -> ImportanceScores:
+        """
+        开始计算一批笔记的重要性，立即返回
+
+        process 模式下各块已提交到进程池，调用方可以先处理数据库读写，需要时再 await get(i)。
+        """
+        fields = tuple(thresholds)
+        limits = tuple(thresholds.values())
+        loop = asyncio.get_running_loop()
+        chunks: List[asyncio.Future] = []
+        if self.mode == INLINE:
+            matcher = self.matcher(terms)
+            future = loop.create_future()
+            future.set_result(score_notes(matcher, limits, [note_payload(note, fields) for note in notes]))
+            return ImportanceScores([future], max(len(notes), 1))
+
+        version = hash(terms)
+        payloads = [
+            [note_payload(note, fields) for note in notes[start:start + self.chunk_size]]
+            for start in range(0, len(notes), self.chunk_size)
+        ]
+        for chunk in payloads:
+            chunks.append(self._submit(loop, _score_chunk, version, terms, limits, chunk))
+
+        def fallback(chunk: int) -> List[bool]:
+            return score_notes(self.matcher(terms), limits, payloads[chunk])
+
+        return ImportanceScores(chunks, self.chunk_size, fallback)
+
+
+ingest_cpu = IngestCpuPool(settings.INGEST_CPU_MODE, settings.INGEST_CPU_WORKERS, settings.INGEST_CPU_CHUNK_SIZE)
@@ -1,40 +1,175 @@
 """
 Logger 配置
+
+日志记录通过 QueueHandler 放入队列，由 QueueListener 后台线程格式化并写出，
+事件循环线程不再直接做阻塞的 stdout 写入。
+
+- LOG_FORMAT: json（默认，每行一个 JSON 对象）或 text
+- LOG_LEVEL: 全局级别
+- LOG_LEVELS: 按 logger 名单独设置级别，如 "fastapi_app.notes=DEBUG,sqlalchemy.engine=INFO"
+- LOG_NOTE_SAMPLE_RATE: 逐条笔记日志（fastapi_app.notes，DEBUG 级别）的采样比例
 """
 
+import atexit
 import logging
+import logging.handlers
+import queue
+import random
 import sys
-from typing import Any
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+import orjson
+
+from app.config import settings
+
+ROOT_LOGGER_NAME = "fastapi_app"
+
+# LogRecord 自带的属性，JSON 输出时不重复输出
+_RESERVED_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JSONFormatter(logging.Formatter):
+    """每条日志输出为一行 JSON，结构化字段（extra）平铺到顶层"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exc_info"] = record.exc_text
+        return orjson.dumps(payload, default=str).decode("utf-8")
+
+
+class TextFormatter(logging.Formatter):
+    """本地开发用的文本格式，结构化字段追加为 key=value"""
+
+    def __init__(self) -> None:
+        super().__init__("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = [
+            f"{key}={value}" for key, value in record.__dict__.items()
+            if key not in _RESERVED_ATTRS and not key.startswith("_")
+        ]
+        return f"{line} {' '.join(fields)}" if fields else line
+
+
+class SamplingFilter(logging.Filter):
+    """按比例采样 WARNING 以下的日志，警告和错误总是保留"""
+
+    def __init__(self, rate: float) -> None:
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.rate >= 1:
+            return True
+        return random.random() < self.rate
+
+
+def _parse_levels(spec: str) -> Dict[str, str]:
+    levels = {}
+    for item in spec.split(","):
+        name, sep, level = item.partition("=")
+        if sep and name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
 
-# 配置基础日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout)
-    ]
-)
 
-logger = logging.getLogger("fastapi_app")
+def configure_logging() -> None:
+    """安装队列日志管道；重复调用只会替换输出格式和级别"""
+    global _listener, _queue_handler
+
+    formatter = JSONFormatter() if settings.LOG_FORMAT.lower() == "json" else TextFormatter()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+
+    if _listener is not None:
+        _listener.stop()
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    if _queue_handler is not None:
+        root.removeHandler(_queue_handler)
+    _queue_handler = logging.handlers.QueueHandler(log_queue)
+    root.addHandler(_queue_handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+
+    for name, level in _parse_levels(settings.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    note_logger = logging.getLogger(f"{ROOT_LOGGER_NAME}.notes")
+    for existing in [f for f in note_logger.filters if isinstance(f, SamplingFilter)]:
+        note_logger.removeFilter(existing)
+    note_logger.addFilter(SamplingFilter(settings.LOG_NOTE_SAMPLE_RATE))
+
+
+def shutdown_logging() -> None:
+    """刷出队列中剩余的日志"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+configure_logging()
+atexit.register(shutdown_logging)
+
 
 class Logger:
-    """Logger wrapper"""
-    
-    @staticmethod
-    def info(message: str, *args: Any) -> None:
-        logger.info(message, *args)
-    
-    @staticmethod
-    def error(message: str, *args: Any) -> None:
-        logger.error(message, *args)
-    
-    @staticmethod
-    def warning(message: str, *args: Any) -> None:
-        logger.warning(message, *args)
-    
-    @staticmethod
-    def debug(message: str, *args: Any) -> None:
-        logger.debug(message, *args)
+    """
+    Logger wrapper
+
+    消息支持 %-style 延迟格式化：logger.debug("创建新笔记: %s", note_id)，
+    级别未开启时不会格式化字符串；关键字参数作为结构化字段输出。
+    """
+
+    def __init__(self, name: str = ROOT_LOGGER_NAME) -> None:
+        self._logger = logging.getLogger(name)
+
+    def child(self, suffix: str) -> "Logger":
+        return Logger(f"{self._logger.name}.{suffix}")
+
+    def is_enabled_for(self, level: int) -> bool:
+        return self._logger.isEnabledFor(level)
+
+    def _log(self, level: int, message: str, args: tuple, fields: Dict[str, Any], exc_info: Any = None) -> None:
+        if self._logger.isEnabledFor(level):
+            self._logger.log(level, message, *args, extra=fields or None, exc_info=exc_info, stacklevel=3)
+
+    def info(self, message: str, *args: Any, **fields: Any) -> None:
+        self._log(logging.INFO, message, args, fields)
+
+    def error(self, message: str, *args: Any, **fields: Any) -> None:
+        self._log(logging.ERROR, message, args, fields)
+
+    def warning(self, message: str, *args: Any, **fields: Any) -> None:
+        self._log(logging.WARNING, message, args, fields)
+
+    def debug(self, message: str, *args: Any, **fields: Any) -> None:
+        self._log(logging.DEBUG, message, args, fields)
+
+    def exception(self, message: str, *args: Any, **fields: Any) -> None:
+        self._log(logging.ERROR, message, args, fields, exc_info=True)
+
 
 # 导出logger实例
-app_logger = Logger() 
\ No newline at end of file
+app_logger = Logger()
+# 逐条笔记的处理日志，生产环境默认关闭（DEBUG），可通过 LOG_LEVELS 开启并按 LOG_NOTE_SAMPLE_RATE 采样
+note_logger = app_logger.child("notes")
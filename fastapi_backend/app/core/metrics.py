@@ -0,0 +1,299 @@
+"""
+请求性能指标
+记录每个路由的延迟、响应大小、并发请求数，以及每个请求的数据库查询次数和耗时，
+以 Prometheus 文本格式在 /metrics 暴露。
+
+指标保存在进程内，多 worker 部署时每个 worker 各自统计，由 Prometheus 按实例聚合。
+"""
+
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+# 未匹配到路由的请求统一归为一个标签，避免扫描类请求撑爆标签基数
+UNMATCHED_ROUTE = "<unmatched>"
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 每组标签：[各桶计数..., 总和, 总数]，桶计数在输出时再累加
+        self._series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 2)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+                break
+        series[-2] += value
+        series[-1] += 1
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return int(series[-1]) if series else 0
+
+    def sum(self, *labels: str) -> float:
+        series = self._series.get(labels)
+        return series[-2] if series else 0.0
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        bucket_names = self.labelnames + ("le",)
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, hits in zip(self.buckets, series):
+                cumulative += hits
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(bucket_names, labels + (_format_value(bound),))} {int(cumulative)}"
+                )
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_bucket{_format_labels(bucket_names, labels + ('+Inf',))} {int(series[-1])}")
+            lines.append(f"{self.name}_sum{label_text} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{label_text} {int(series[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+REQUESTS_TOTAL = registry.register(Counter(
+    "http_requests_total", "HTTP 请求数", ("method", "route", "status"),
+))
+REQUEST_DURATION = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP 请求耗时（秒）", ("method", "route"), LATENCY_BUCKETS,
+))
+REQUESTS_IN_FLIGHT = registry.register(Gauge(
+    "http_requests_in_flight", "正在处理的 HTTP 请求数",
+))
+RESPONSE_SIZE = registry.register(Histogram(
+    "http_response_size_bytes", "HTTP 响应体大小（字节）", ("method", "route"), SIZE_BUCKETS,
+))
+REQUEST_DB_QUERIES = registry.register(Histogram(
+    "http_request_db_queries", "单个请求执行的数据库查询数", ("method", "route"), QUERY_COUNT_BUCKETS,
+))
+REQUEST_DB_DURATION = registry.register(Histogram(
+    "http_request_db_duration_seconds", "单个请求的数据库耗时（秒）", ("method", "route"), LATENCY_BUCKETS,
+))
+DB_QUERY_DURATION = registry.register(Histogram(
+    "db_query_duration_seconds", "单条数据库语句耗时（秒），包含后台任务", (), LATENCY_BUCKETS,
+))
+
+
+@dataclass
+class RequestStats:
+    """单个请求的数据库统计，通过 ContextVar 在请求处理链路中共享"""
+    query_count: int = 0
+    query_seconds: float = 0.0
+    scope: Optional[dict] = field(default=None, repr=False)
+
+    @property
+    def route(self) -> str:
+        return route_template(self.scope) if self.scope is not None else UNMATCHED_ROUTE
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _request_stats.get()
+
+
+def record_query(elapsed: float) -> None:
+    DB_QUERY_DURATION.observe(elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.query_count += 1
+        stats.query_seconds += elapsed
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    context._query_started_at = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started_at = getattr(context, "_query_started_at", None)
+    if started_at is not None:
+        record_query(time.perf_counter() - started_at)
+
+
+def install_query_hooks(engine: Engine) -> None:
+    """
+    在同步 Engine 上注册语句计时
+
+    AsyncEngine 需传入 engine.sync_engine；事件回调运行在 greenlet 中，
+    能读取到发起查询的协程的 ContextVar，因此查询可以归到对应请求上。
+    """
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def route_template(scope: dict) -> str:
+    """取匹配到的路由模板（如 /api/notes/{note_id}），而不是实际路径"""
+    route = scope.get("route")
+    if route is None:
+        return UNMATCHED_ROUTE
+    return getattr(route, "path_format", None) or getattr(route, "path", UNMATCHED_ROUTE)
+
+
+class MetricsMiddleware:
+    """
+    ASGI 指标中间件
+
+    直接包装 send 统计状态码和响应体大小，对流式响应同样有效；
+    响应头中附带 Server-Timing，便于在浏览器开发者工具中查看单个请求的数据库开销。
+
+    响应体发送完毕（最后一个 http.response.body）即结束统计：Starlette 的 BackgroundTasks
+    在 self.app(...) 返回前执行，后台任务的耗时和查询不计入请求。
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope=scope)
+        token = _request_stats.set(stats)
+        status_code = 500
+        body_size = 0
+        finished = False
+        started_at = time.perf_counter()
+
+        def finish() -> None:
+            nonlocal finished
+            if finished:
+                return
+            finished = True
+            elapsed = time.perf_counter() - started_at
+            REQUESTS_IN_FLIGHT.dec()
+
+            method = scope["method"]
+            route = route_template(scope)
+            REQUESTS_TOTAL.inc(method, route, str(status_code))
+            REQUEST_DURATION.observe(elapsed, method, route)
+            RESPONSE_SIZE.observe(body_size, method, route)
+            REQUEST_DB_QUERIES.observe(stats.query_count, method, route)
+            REQUEST_DB_DURATION.observe(stats.query_seconds, method, route)
+
+        async def send_wrapper(message) -> None:
+            nonlocal status_code, body_size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((
+                    b"server-timing",
+                    f'db;dur={stats.query_seconds * 1000:.1f};desc="{stats.query_count} queries"'.encode("latin-1"),
+                ))
+                message = {**message, "headers": headers}
+            elif message["type"] == "http.response.body":
+                body_size += len(message.get("body", b""))
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # 异常或未发送响应体时在这里结束统计
+            finish()
+            _request_stats.reset(token)
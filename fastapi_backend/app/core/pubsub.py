@@ -0,0 +1,111 @@
+"""
+进程间消息发布/订阅
+默认只在当前进程内分发；PUBSUB_BACKEND=postgres 时通过 LISTEN/NOTIFY 在多个 worker 之间广播
+"""
+
+import asyncio
+from collections import defaultdict
+from typing import Any, Callable, Dict, List
+
+from app.config import settings
+from app.core.logger import app_logger as logger
+from app.core.serialization import json_dumps, json_loads
+
+# NOTIFY 通道名前缀，避免与同库其他应用冲突
+CHANNEL_PREFIX = "xiuer_"
+# Postgres NOTIFY 的载荷必须小于 8000 字节
+MAX_PAYLOAD_BYTES = 7999
+
+Handler = Callable[[Dict[str, Any]], None]
+
+
+class MessageTooLarge(ValueError):
+    """消息编码后超过 NOTIFY 载荷上限"""
+
+
+class PubSub:
+    """
+    轻量发布/订阅
+
+    处理函数是同步的，在事件循环线程中调用，应尽快返回。
+    使用 postgres 后端时，本进程发布的消息也经由 NOTIFY 回到本进程，
+    因此所有 worker（包括发布者）看到的消息顺序一致。
+    """
+
+    def __init__(self, backend: str) -> None:
+        self.backend = backend
+        self._handlers: Dict[str, List[Handler]] = defaultdict(list)
+        self._connection = None
+        self._raw_connection = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def distributed(self) -> bool:
+        return self._raw_connection is not None
+
+    def subscribe(self, channel: str, handler: Handler) -> None:
+        """注册处理函数；应在 start() 之前完成注册"""
+        self._handlers[channel].append(handler)
+
+    async def start(self) -> None:
+        if self.backend != "postgres" or self._connection is not None:
+            return
+        from app.database import engine
+
+        try:
+            self._connection = await engine.connect()
+            self._raw_connection = (await self._connection.get_raw_connection()).driver_connection
+            for channel in self._handlers:
+                await self._raw_connection.add_listener(CHANNEL_PREFIX + channel, self._on_notify)
+            logger.info(f"PubSub 已启用 LISTEN/NOTIFY: {', '.join(self._handlers)}")
+        except Exception as e:
+            logger.error(f"PubSub 连接 Postgres 失败，退回进程内分发: {str(e)}")
+            await self.stop()
+
+    async def stop(self) -> None:
+        self._raw_connection = None
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            try:
+                await connection.close()
+            except Exception as e:
+                logger.warning(f"关闭 PubSub 连接失败: {str(e)}")
+
+    async def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        """
+        发布消息；编码后超过 MAX_PAYLOAD_BYTES 时抛出 MessageTooLarge
+
+        进程内分发时同样检查大小，避免单 worker 环境正常、多 worker 部署时其他 worker 收不到消息。
+        """
+        encoded = json_dumps(message)
+        if len(encoded) > MAX_PAYLOAD_BYTES:
+            raise MessageTooLarge(f"{channel} 消息过大: {len(encoded)} 字节，上限 {MAX_PAYLOAD_BYTES} 字节")
+        if self._raw_connection is not None:
+            try:
+                payload = encoded.decode("utf-8")
+                async with self._lock:
+                    await self._raw_connection.execute(
+                        "SELECT pg_notify($1, $2)", CHANNEL_PREFIX + channel, payload
+                    )
+                return
+            except Exception as e:
+                logger.error(f"NOTIFY 发送失败，仅在本进程分发: {str(e)}")
+        self._dispatch(channel, message)
+
+    def _on_notify(self, connection, pid, channel: str, payload: str) -> None:
+        try:
+            message = json_loads(payload)
+        except ValueError:
+            logger.warning(f"忽略无法解析的通知: {channel}")
+            return
+        self._dispatch(channel[len(CHANNEL_PREFIX):], message)
+
+    def _dispatch(self, channel: str, message: Dict[str, Any]) -> None:
+        for handler in self._handlers.get(channel, ()):
+            try:
+                handler(message)
+            except Exception as e:
+                logger.error(f"处理 {channel} 消息失败: {str(e)}")
+
+
+pubsub = PubSub(settings.PUBSUB_BACKEND)
@@ -0,0 +1,75 @@
+"""
+查询形态记录
+统计笔记列表、计数和导出实际使用的筛选/排序组合（不含具体取值），
+供管理接口导出，由 commands.index_advisor 据此给出索引建议。
+"""
+
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Sequence, Tuple
+
+# 最多保留的形态数，超出后新形态只计入 dropped
+MAX_SHAPES = 500
+
+ShapeKey = Tuple[str, Tuple[str, ...], Tuple[str, ...]]
+
+
+@dataclass
+class ShapeStats:
+    count: int = 0
+    first_seen: datetime = field(default_factory=datetime.utcnow)
+    last_seen: datetime = field(default_factory=datetime.utcnow)
+
+
+class QueryShapeRecorder:
+    """
+    按 (查询类型, 谓词, 排序) 计数
+
+    谓词为 "列 操作符[ 取值]" 形式的字符串，同一条件组内的 OR 用 " OR " 连接，
+    例如 "is_deleted = false"、"is_new = true OR is_changed = true"、"liked_count >="。
+    """
+
+    def __init__(self, max_shapes: int = MAX_SHAPES):
+        self.max_shapes = max_shapes
+        self.dropped = 0
+        self._shapes: Dict[ShapeKey, ShapeStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, predicates: Sequence[str], order: Sequence[str] = ()) -> None:
+        key = (kind, tuple(sorted(predicates)), tuple(order))
+        now = datetime.utcnow()
+        with self._lock:
+            stats = self._shapes.get(key)
+            if stats is None:
+                if len(self._shapes) >= self.max_shapes:
+                    self.dropped += 1
+                    return
+                stats = self._shapes[key] = ShapeStats(first_seen=now)
+            stats.count += 1
+            stats.last_seen = now
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """按次数降序返回所有形态"""
+        with self._lock:
+            items = list(self._shapes.items())
+        items.sort(key=lambda item: item[1].count, reverse=True)
+        return [
+            {
+                "kind": kind,
+                "predicates": list(predicates),
+                "order": list(order),
+                "count": stats.count,
+                "first_seen": stats.first_seen,
+                "last_seen": stats.last_seen,
+            }
+            for (kind, predicates, order), stats in items
+        ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._shapes.clear()
+            self.dropped = 0
+
+
+query_shape_recorder = QueryShapeRecorder()
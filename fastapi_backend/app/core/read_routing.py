@@ -0,0 +1,62 @@
+"""
+读写分离的会话选择
+配置 READ_DATABASE_URL 后，只读接口走只读副本；客户端写入后的一段时间内（READ_AFTER_WRITE_SECONDS）
+通过 Cookie 粘滞到主库，保证能读到自己刚写入的数据。
+"""
+
+import time
+from http.cookies import SimpleCookie
+
+from fastapi import Request
+
+from app.config import settings
+
+# 记录粘滞截止时间（Unix 秒）的 Cookie
+STICKY_COOKIE = "xiuer_primary_until"
+_SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def replica_enabled() -> bool:
+    return bool(settings.READ_DATABASE_URL)
+
+
+def prefers_primary(request: Request) -> bool:
+    """请求是否应读主库：未配置副本，或客户端仍在写后粘滞窗口内"""
+    if not replica_enabled():
+        return True
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def _sticky_cookie_header() -> bytes:
+    cookie = SimpleCookie()
+    window = settings.READ_AFTER_WRITE_SECONDS
+    cookie[STICKY_COOKIE] = f"{time.time() + window:.3f}"
+    cookie[STICKY_COOKIE]["max-age"] = int(window) + 1
+    cookie[STICKY_COOKIE]["path"] = "/"
+    cookie[STICKY_COOKIE]["httponly"] = True
+    cookie[STICKY_COOKIE]["samesite"] = "Lax"
+    return cookie.output(header="").strip().encode("latin-1")
+
+
+class ReadYourWritesMiddleware:
+    """写请求（非 GET/HEAD/OPTIONS）成功后下发粘滞 Cookie"""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["method"] in _SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message) -> None:
+            if message["type"] == "http.response.start" and 200 <= message["status"] < 300:
+                headers = list(message.get("headers", []))
+                headers.append((b"set-cookie", _sticky_cookie_header()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,38 @@
+"""
+快速 JSON 序列化
+基于 orjson 直接把查询结果行编码为响应字节，跳过 Pydantic 的二次校验
+"""
+
+from typing import Any, Iterable, List, Sequence
+
+import orjson
+from fastapi.responses import Response
+
+
+def json_dumps(obj: Any) -> bytes:
+    """orjson 编码，原生支持 datetime / UUID"""
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+
+def json_dumps_str(obj: Any) -> str:
+    """供 SQLAlchemy JSON 列使用的序列化函数（需要返回 str）"""
+    return orjson.dumps(obj).decode("utf-8")
+
+
+def json_loads(data: Any) -> Any:
+    return orjson.loads(data)
+
+
+def rows_to_dicts(rows: Iterable[Sequence[Any]], fields: Sequence[str]) -> List[dict]:
+    """把列元组转换为字段字典，字段顺序与查询列一致"""
+    return [dict(zip(fields, row)) for row in rows]
+
+
+class RawJSONResponse(Response):
+    """内容已经是 JSON 字节的响应，不再经过 response_model 校验"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return json_dumps(content)
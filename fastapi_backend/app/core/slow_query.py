@@ -0,0 +1,221 @@
+"""
+慢查询追踪
+超过阈值的语句记录归一化 SQL、参数形态、耗时和发起请求的路由；
+可选地对最慢的 SELECT 采样 EXPLAIN (ANALYZE, BUFFERS)，结果保存在环形缓冲区，供管理接口查看。
+"""
+
+import asyncio
+import hashlib
+import re
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import settings
+from app.core.logger import app_logger as logger
+from app.core.metrics import current_request_stats
+
+# 不在请求内执行的语句（后台任务、启动脚本等）归到该路由
+BACKGROUND_ROUTE = "<background>"
+# 每条指纹的汇总统计最多保留的条目数
+MAX_FINGERPRINTS = 500
+# 只对只读语句执行 EXPLAIN ANALYZE（会真正执行一遍语句）
+_READ_ONLY_PATTERN = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+_WRITE_PATTERN = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE)\b", re.IGNORECASE)
+# 有副作用的函数和加锁子句：重新执行会抢锁、发通知或推进序列，这类语句即使以 SELECT 开头也不 EXPLAIN
+_SIDE_EFFECT_PATTERN = re.compile(
+    r"\b(pg_(try_)?advisory\w*|pg_notify|set_config|nextval|setval|pg_sleep\w*|"
+    r"pg_cancel_backend|pg_terminate_backend|lo_\w+|dblink\w*)\s*\(|\bFOR\s+(NO\s+KEY\s+)?(UPDATE|SHARE|KEY\s+SHARE)\b",
+    re.IGNORECASE,
+)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\$\d+|\?|%s|%\(\w+\)s)(?:\s*,\s*(?:\$\d+|\?|%s|%\(\w+\)s))+\s*\)")
+_PLACEHOLDER = re.compile(r"\$\d+|%\(\w+\)s|%s")
+_WHITESPACE = re.compile(r"\s+")
+
+# EXPLAIN 自身产生的查询不再追踪
+_explaining: ContextVar[bool] = ContextVar("slow_query_explaining", default=False)
+
+
+def normalize_sql(statement: str) -> str:
+    """
+    归一化 SQL：字面量和占位符统一替换为 ?，IN 列表折叠为 (...)
+
+    这样 inArray 等过滤条件不同长度的参数列表会归为同一条语句。
+    """
+    sql = _STRING_LITERAL.sub("?", statement)
+    sql = _PLACEHOLDER_LIST.sub("(...)", sql)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def fingerprint(normalized_sql: str) -> str:
+    return hashlib.blake2b(normalized_sql.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _value_shape(value: Any) -> str:
+    if isinstance(value, (list, tuple, set)):
+        return f"{type(value).__name__}[{len(value)}]"
+    if value is None:
+        return "null"
+    return type(value).__name__
+
+
+def parameter_shapes(parameters: Any, executemany: bool = False) -> Any:
+    """只记录参数类型和长度，不记录参数值，避免日志中出现用户数据"""
+    if executemany and parameters:
+        return {"rows": len(parameters), "row": parameter_shapes(parameters[0])}
+    if isinstance(parameters, dict):
+        return {key: _value_shape(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_value_shape(value) for value in parameters]
+    return _value_shape(parameters)
+
+
+class SlowQueryTracer:
+    """在 AsyncEngine 上注册语句计时，记录并采样慢查询"""
+
+    def __init__(self, threshold_ms: float, buffer_size: int = 50, explain: bool = False) -> None:
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        # 同步 Engine -> AsyncEngine，EXPLAIN 在语句原来执行的库（主库或只读副本）上运行
+        self._engines: Dict[Any, AsyncEngine] = {}
+        self.recent: Deque[Dict[str, Any]] = deque(maxlen=buffer_size)
+        self.plans: Deque[Dict[str, Any]] = deque(maxlen=buffer_size)
+        self._summary: Dict[str, Dict[str, Any]] = {}
+        # 每条指纹已采样过的最慢耗时，只有更慢时才重新 EXPLAIN
+        self._explained_ms: Dict[str, float] = {}
+        self._pending: Set[asyncio.Task] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms > 0
+
+    def install(self, engine: AsyncEngine) -> None:
+        if not self.enabled:
+            return
+        self._engines[engine.sync_engine] = engine
+        event.listen(engine.sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine.sync_engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        context._slow_query_started_at = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        started_at = getattr(context, "_slow_query_started_at", None)
+        if started_at is None or _explaining.get():
+            return
+        duration_ms = (time.perf_counter() - started_at) * 1000
+        if duration_ms >= self.threshold_ms:
+            self.record(statement, parameters, duration_ms, executemany, self._engines.get(conn.engine))
+
+    def record(
+        self,
+        statement: str,
+        parameters: Any,
+        duration_ms: float,
+        executemany: bool = False,
+        engine: Optional[AsyncEngine] = None,
+    ) -> Dict[str, Any]:
+        stats = current_request_stats()
+        route = stats.route if stats is not None else BACKGROUND_ROUTE
+        normalized = normalize_sql(statement)
+        key = fingerprint(normalized)
+        shapes = parameter_shapes(parameters, executemany)
+
+        entry = {
+            "fingerprint": key,
+            "sql": normalized,
+            "parameters": shapes,
+            "duration_ms": round(duration_ms, 2),
+            "route": route,
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+        self.recent.append(entry)
+        self._update_summary(key, normalized, route, duration_ms)
+        logger.warning(f"慢查询 {duration_ms:.1f}ms [{route}] {normalized} params={shapes}")
+
+        if self.explain and engine is not None and not executemany and self._should_explain(key, statement, duration_ms):
+            self._schedule_explain(engine, entry, statement, parameters)
+        return entry
+
+    def _update_summary(self, key: str, normalized: str, route: str, duration_ms: float) -> None:
+        summary = self._summary.get(key)
+        if summary is None:
+            if len(self._summary) >= MAX_FINGERPRINTS:
+                # 丢弃累计耗时最少的一条
+                del self._summary[min(self._summary, key=lambda k: self._summary[k]["total_ms"])]
+            summary = self._summary[key] = {
+                "fingerprint": key,
+                "sql": normalized,
+                "routes": [],
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+            }
+        summary["count"] += 1
+        summary["total_ms"] += duration_ms
+        summary["max_ms"] = max(summary["max_ms"], duration_ms)
+        if route not in summary["routes"]:
+            summary["routes"].append(route)
+
+    def _should_explain(self, key: str, statement: str, duration_ms: float) -> bool:
+        if self._pending:
+            return False
+        if not _READ_ONLY_PATTERN.match(statement) or _WRITE_PATTERN.search(statement):
+            return False
+        if _SIDE_EFFECT_PATTERN.search(statement):
+            return False
+        return duration_ms > self._explained_ms.get(key, 0.0)
+
+    def _schedule_explain(self, engine: AsyncEngine, entry: Dict[str, Any], statement: str, parameters: Any) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._explained_ms[entry["fingerprint"]] = entry["duration_ms"]
+        task = loop.create_task(self._run_explain(engine, entry, statement, parameters))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _run_explain(self, engine: AsyncEngine, entry: Dict[str, Any], statement: str, parameters: Any) -> None:
+        """在独立连接上执行 EXPLAIN，事务不提交，关闭连接时回滚"""
+        _explaining.set(True)
+        try:
+            async with engine.connect() as conn:
+                result = await conn.exec_driver_sql(
+                    "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement, parameters
+                )
+                plan = result.scalar()
+            self.plans.append({**entry, "plan": plan})
+        except Exception as e:
+            logger.warning(f"慢查询 EXPLAIN 失败 {entry['fingerprint']}: {str(e)}")
+
+    def summary(self) -> List[Dict[str, Any]]:
+        items = sorted(self._summary.values(), key=lambda item: item["total_ms"], reverse=True)
+        return [
+            {**item, "total_ms": round(item["total_ms"], 2), "max_ms": round(item["max_ms"], 2),
+             "avg_ms": round(item["total_ms"] / item["count"], 2)}
+            for item in items
+        ]
+
+    def clear(self) -> None:
+        self.recent.clear()
+        self.plans.clear()
+        self._summary.clear()
+        self._explained_ms.clear()
+
+
+slow_query_tracer = SlowQueryTracer(
+    threshold_ms=settings.SLOW_QUERY_THRESHOLD_MS,
+    buffer_size=settings.SLOW_QUERY_BUFFER_SIZE,
+    explain=settings.SLOW_QUERY_EXPLAIN,
+)
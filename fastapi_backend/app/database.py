@@ -1,30 +1,73 @@
 from typing import AsyncGenerator
 from urllib.parse import urlparse
 
-from fastapi import Depends
+from fastapi import Depends, Request
 from fastapi_users.db import SQLAlchemyUserDatabase
 from sqlalchemy import NullPool
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from .config import settings
+from .core.metrics import install_query_hooks
+from .core.read_routing import prefers_primary
+from .core.slow_query import slow_query_tracer
+from .core.serialization import json_dumps_str, json_loads
 from .models.base import Base
 
 
-parsed_db_url = urlparse(settings.DATABASE_URL)
+def _asyncpg_url(url: str) -> str:
+    parsed_db_url = urlparse(url)
+    return (
+        f"postgresql+asyncpg://{parsed_db_url.username}:{parsed_db_url.password}@"
+        f"{parsed_db_url.hostname}{':' + str(parsed_db_url.port) if parsed_db_url.port else ''}"
+        f"{parsed_db_url.path}"
+    )
+
+
+async_db_connection_url = _asyncpg_url(settings.DATABASE_URL)
+
+# Disable connection pooling for serverless environments like Vercel,
+# unless a pool size is configured for long-running deployments
+if settings.DB_POOL_SIZE > 0:
+    pool_options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_pre_ping": True,
+    }
+else:
+    pool_options = {"poolclass": NullPool}
+
+
+def _create_engine(url: str):
+    engine = create_async_engine(
+        url,
+        **pool_options,
+        # JSON 列（image_list、tags 等）使用 orjson 编解码
+        json_serializer=json_dumps_str,
+        json_deserializer=json_loads,
+    )
+    # 统计每个请求的查询次数和数据库耗时
+    install_query_hooks(engine.sync_engine)
+    # 记录慢查询，供 /api/admin/slow-queries 查看
+    slow_query_tracer.install(engine)
+    return engine
 
-async_db_connection_url = (
-    f"postgresql+asyncpg://{parsed_db_url.username}:{parsed_db_url.password}@"
-    f"{parsed_db_url.hostname}{':' + str(parsed_db_url.port) if parsed_db_url.port else ''}"
-    f"{parsed_db_url.path}"
-)
 
-# Disable connection pooling for serverless environments like Vercel
-engine = create_async_engine(async_db_connection_url, poolclass=NullPool)
+engine = _create_engine(async_db_connection_url)
 
 async_session_maker = async_sessionmaker(
     engine, expire_on_commit=settings.EXPIRE_ON_COMMIT
 )
 
+# 只读副本；未配置时与主库共用同一个 engine
+if settings.READ_DATABASE_URL:
+    read_engine = _create_engine(_asyncpg_url(settings.READ_DATABASE_URL))
+    read_session_maker = async_sessionmaker(
+        read_engine, expire_on_commit=settings.EXPIRE_ON_COMMIT
+    )
+else:
+    read_engine = engine
+    read_session_maker = async_session_maker
+
 
 async def create_db_and_tables():
     async with engine.begin() as conn:
@@ -36,6 +79,18 @@ async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
+async def get_read_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    查询接口使用的会话
+
+    配置只读副本时走副本；客户端刚写入过（带粘滞 Cookie）时仍走主库，保证读到自己的写入。
+    通过该会话执行写操作会在副本上失败，写接口应使用 get_async_session。
+    """
+    session_maker = async_session_maker if prefers_primary(request) else read_session_maker
+    async with session_maker() as session:
+        yield session
+
+
 async def get_user_db(session: AsyncSession = Depends(get_async_session)):
     from .models.user import User
     yield SQLAlchemyUserDatabase(session, User)
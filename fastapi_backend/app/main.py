@@ -1,3 +1,6 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from .schemas.users import UserCreate, UserRead, UserUpdate
 from .services.users import auth_backend, fastapi_users, AUTH_URL_PATH
@@ -7,13 +10,44 @@ from app.routes.keywords import router as keywords_router
 from app.routes.webhook import router as webhook_router
 from app.routes.notes import router as notes_router
 from app.routes.tasks import router as tasks_router
+from app.routes.metrics import router as metrics_router
+from app.routes.admin import router as admin_router
 from app.config import settings
+from app.core.coordination import run_singleton
+from app.core.ingest_cpu import ingest_cpu
+from app.core.pubsub import pubsub
+from app.services.note_archive import archive_periodically
+from app.core.metrics import MetricsMiddleware
+from app.core.read_routing import ReadYourWritesMiddleware, replica_enabled
+from app.core.webhook_signature import WebhookSignatureMiddleware
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await pubsub.start()
+    await ingest_cpu.start()
+    archive_task = None
+    if settings.ARCHIVE_INTERVAL_HOURS > 0:
+        # 多 worker 时只由持有咨询锁的一个 worker 定期归档
+        archive_task = asyncio.create_task(run_singleton(
+            "archive_notes", lambda: archive_periodically(settings.ARCHIVE_INTERVAL_HOURS)
+        ))
+    yield
+    if archive_task is not None:
+        archive_task.cancel()
+    ingest_cpu.shutdown()
+    await pubsub.stop()
+
 
 app = FastAPI(
     generate_unique_id_function=simple_generate_unique_route_id,
     openapi_url=settings.OPENAPI_URL,
+    lifespan=lifespan,
 )
 
+# webhook 签名校验放在最内层，签名不符时在请求体解析前由应用返回 401
+app.add_middleware(WebhookSignatureMiddleware, secret=settings.WEBHOOK_SECRET, path_prefix="/api/webhook")
+
 # Middleware for CORS configuration
 origins = [origin.strip() for origin in settings.CORS_ORIGINS.split(",")]
 
@@ -25,6 +59,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 配置只读副本时，写请求成功后让该客户端短时间内读主库
+if replica_enabled():
+    app.add_middleware(ReadYourWritesMiddleware)
+
+# 请求延迟、响应大小、数据库查询次数等指标，在 /metrics 暴露
+app.add_middleware(MetricsMiddleware)
+
 # Include authentication and user management routes
 app.include_router(
     fastapi_users.get_auth_router(auth_backend),
@@ -64,3 +105,9 @@ app.include_router(notes_router, prefix="/api/notes", tags=["notes"])
 
 # Include tasks routes (任务管理)
 app.include_router(tasks_router, prefix="/api/tasks", tags=["tasks"])
+
+# Include admin routes (性能诊断)
+app.include_router(admin_router, prefix="/api/admin", tags=["admin"])
+
+# Include metrics routes (Prometheus 抓取)
+app.include_router(metrics_router, tags=["metrics"])
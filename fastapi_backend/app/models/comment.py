@@ -1,10 +1,10 @@
 from __future__ import annotations
 from typing import TYPE_CHECKING, List, Any
 from sqlalchemy import (
-    String, Integer, ForeignKey, DateTime, Text, JSON, Boolean
+    String, Integer, ForeignKey, DateTime, Text, Boolean
 )
 from sqlalchemy.orm import relationship, Mapped, mapped_column
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 from uuid import uuid4
 from datetime import datetime
 
@@ -29,7 +29,7 @@ class XhsComment(Base):
     parent_comment_id: Mapped[str] = mapped_column(String(100), nullable=True, index=True)
     root_comment_id: Mapped[str] = mapped_column(String(100), nullable=True, index=True)
     contains_business_keywords: Mapped[bool] = mapped_column(Boolean, default=False)
-    business_keywords_found: Mapped[List[Any]] = mapped_column(JSON, nullable=True)
+    business_keywords_found: Mapped[List[Any]] = mapped_column(JSONB, nullable=True)
     importance_score: Mapped[int] = mapped_column(Integer, default=0)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -10,7 +10,7 @@ class BusinessKeyword(Base):
     __tablename__ = "business_keywords"
 
     id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid4)
-    keyword: Mapped[str] = mapped_column(String(100), nullable=False, index=True)
+    keyword: Mapped[str] = mapped_column(String(100), nullable=False, unique=True, index=True)
     category: Mapped[str] = mapped_column(String(50), nullable=True)
     weight: Mapped[int] = mapped_column(Integer, default=1)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
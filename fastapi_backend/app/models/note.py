@@ -2,10 +2,10 @@ from __future__ import annotations
 from typing import TYPE_CHECKING, List, Any
 import enum
 from sqlalchemy import (
-    String, Integer, ForeignKey, DateTime, Text, JSON, Boolean, Index
+    String, Integer, ForeignKey, DateTime, Text, Boolean, Index, DDL, event, func, literal_column, text
 )
 from sqlalchemy.orm import relationship, Mapped, mapped_column
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 from uuid import uuid4
 from datetime import datetime
 from .base import Base
@@ -27,11 +27,11 @@ class XhsNote(Base):
     note_id: Mapped[str] = mapped_column(String(100), nullable=False, unique=True, index=True)
     note_url: Mapped[str] = mapped_column(String(500), nullable=True)
     note_type: Mapped[str] = mapped_column(String(20), nullable=True)
-    author_user_id: Mapped[str] = mapped_column(String(100), nullable=True, index=True)
+    author_user_id: Mapped[str] = mapped_column(String(100), nullable=True)
     author_nickname: Mapped[str] = mapped_column(String(100), nullable=True)
     title: Mapped[str] = mapped_column(String(500), nullable=True)
     desc: Mapped[str] = mapped_column(Text, nullable=True)
-    tags: Mapped[List[Any]] = mapped_column(JSON, nullable=True)
+    tags: Mapped[List[Any]] = mapped_column(JSONB, nullable=True)
     upload_time: Mapped[datetime] = mapped_column(DateTime, nullable=True)
     ip_location: Mapped[str] = mapped_column(String(100), nullable=True)
     liked_count: Mapped[int] = mapped_column(Integer, default=0)
@@ -40,45 +40,115 @@ class XhsNote(Base):
     share_count: Mapped[int] = mapped_column(Integer, default=0)
     video_cover: Mapped[str] = mapped_column(String(500), nullable=True)
     video_addr: Mapped[str] = mapped_column(String(500), nullable=True)
-    image_list: Mapped[List[Any]] = mapped_column(JSON, nullable=True)
+    image_list: Mapped[List[Any]] = mapped_column(JSONB, nullable=True)
     author_avatar: Mapped[str] = mapped_column(String(500), nullable=True)
-    current_tags: Mapped[List[Any]] = mapped_column(JSON, nullable=True)
+    current_tags: Mapped[List[Any]] = mapped_column(JSONB, nullable=True)
     is_new: Mapped[bool] = mapped_column(Boolean, default=True)
     is_changed: Mapped[bool] = mapped_column(Boolean, default=False)
     is_important: Mapped[bool] = mapped_column(Boolean, default=False)
-    is_deleted: Mapped[bool] = mapped_column(Boolean, default=False, index=True)
+    is_deleted: Mapped[bool] = mapped_column(Boolean, default=False)
     change_reason: Mapped[str] = mapped_column(String(200), nullable=True)
-    important_comment_ids: Mapped[List[Any]] = mapped_column(JSON, nullable=True)
+    important_comment_ids: Mapped[List[Any]] = mapped_column(JSONB, nullable=True)
     first_crawl_time: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
     last_crawl_time: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
     crawl_count: Mapped[int] = mapped_column(Integer, default=1)
-    previous_stats: Mapped[dict[str, Any]] = mapped_column(JSON, nullable=True)
+    previous_stats: Mapped[dict[str, Any]] = mapped_column(JSONB, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
     comments: Mapped[List["XhsComment"]] = relationship("XhsComment", back_populates="note", cascade="all, delete-orphan")
     tag_logs: Mapped[List["NoteTagLog"]] = relationship("NoteTagLog", back_populates="note", cascade="all, delete-orphan")
 
+    # 允许前端筛选/排序的列（apply_filters_to_query / apply_sorting_to_query 白名单）
+    __filterable__ = (
+        "note_id", "note_url", "note_type", "author_user_id", "author_nickname",
+        "title", "desc", "upload_time", "ip_location",
+        "liked_count", "collected_count", "comment_count", "share_count",
+        "is_new", "is_changed", "is_important", "change_reason",
+        "first_crawl_time", "last_crawl_time", "crawl_count",
+        "tags", "current_tags",
+    )
+
+    # 索引按实际查询形态设计（见 commands.index_advisor）：列表查询总是带 is_deleted = false
+    # 并默认按 last_crawl_time 倒序，因此都做成只覆盖未删除笔记的部分索引
     __table_args__ = (
-        Index('idx_note_crawl_time', 'last_crawl_time'),
-        Index('idx_note_tags', 'is_new', 'is_changed', 'is_important'),
-        Index('idx_note_deleted', 'is_deleted'),
-        Index('idx_author_id', 'author_user_id'),
+        Index('idx_note_live_crawl_time', 'last_crawl_time', postgresql_where=text('is_deleted = false')),
+        # is_new / is_changed 的并集筛选由各自的部分索引 BitmapOr 完成
+        Index('idx_note_live_new', 'last_crawl_time', postgresql_where=text('is_deleted = false AND is_new = true')),
+        Index('idx_note_live_changed', 'last_crawl_time', postgresql_where=text('is_deleted = false AND is_changed = true')),
+        Index('idx_note_live_important', 'last_crawl_time', postgresql_where=text('is_deleted = false AND is_important = true')),
+        Index('idx_note_live_author', 'author_user_id', 'last_crawl_time', postgresql_where=text('is_deleted = false')),
+        # 软删除的笔记很少，供归档任务查找
+        Index('idx_note_deleted_crawl_time', 'last_crawl_time', postgresql_where=text('is_deleted = true')),
+        # 标签筛选（contains / overlaps）走 GIN 索引
+        Index('idx_note_tags_gin', 'tags', postgresql_using='gin'),
+        Index('idx_note_current_tags_gin', 'current_tags', postgresql_using='gin'),
+    )
+
+
+def note_search_text(table):
+    """
+    关键词匹配使用的文本：小写的 "标题 描述"，与入库时的重要性判断一致
+
+    常量以字面量渲染（而非绑定参数），查询表达式才能与下方的表达式索引匹配。
+    """
+    return func.lower(
+        func.coalesce(table.c.title, literal_column("''"))
+        + literal_column("' '")
+        + func.coalesce(table.c.desc, literal_column("''"))
     )
 
 
+# 关键词预览的 LIKE '%关键词%' 走 pg_trgm 三元组索引（关键词不少于 3 个字符时可用）
+XhsNote.__table__.append_constraint(Index(
+    'idx_note_live_text_trgm',
+    note_search_text(XhsNote.__table__).label('search_text'),
+    postgresql_using='gin',
+    postgresql_ops={'search_text': 'gin_trgm_ops'},
+    postgresql_where=text('is_deleted = false'),
+))
+event.listen(
+    XhsNote.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+
 class NoteTagLog(Base):
     __tablename__ = "note_tag_logs"
 
     id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid4)
     note_id: Mapped[str] = mapped_column(String(100), ForeignKey("xhs_notes.note_id"), nullable=False, index=True)
-    old_tags: Mapped[List[Any]] = mapped_column(JSON, nullable=True)
-    new_tags: Mapped[List[Any]] = mapped_column(JSON, nullable=True)
+    old_tags: Mapped[List[Any]] = mapped_column(JSONB, nullable=True)
+    new_tags: Mapped[List[Any]] = mapped_column(JSONB, nullable=True)
     change_type: Mapped[str] = mapped_column(String(50), nullable=False)
     change_reason: Mapped[str] = mapped_column(String(200), nullable=True)
-    old_stats: Mapped[dict[str, Any]] = mapped_column(JSON, nullable=True)
-    new_stats: Mapped[dict[str, Any]] = mapped_column(JSON, nullable=True)
-    related_comment_ids: Mapped[List[Any]] = mapped_column(JSON, nullable=True)
+    old_stats: Mapped[dict[str, Any]] = mapped_column(JSONB, nullable=True)
+    new_stats: Mapped[dict[str, Any]] = mapped_column(JSONB, nullable=True)
+    related_comment_ids: Mapped[List[Any]] = mapped_column(JSONB, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
 
-    note: Mapped["XhsNote"] = relationship("XhsNote", back_populates="tag_logs") 
\ No newline at end of file
+    note: Mapped["XhsNote"] = relationship("XhsNote", back_populates="tag_logs")
+
+
+class XhsNoteArchive(Base):
+    """
+    冷数据归档表
+
+    软删除或长期未再爬取的笔记从 xhs_notes 整行移入这里，完整行保存在 payload（JSONB，
+    大字段由 Postgres TOAST 自动压缩），只保留少量用于查询的列，热表索引因此保持精简。
+    """
+    __tablename__ = "xhs_notes_archive"
+
+    note_id: Mapped[str] = mapped_column(String(100), primary_key=True)
+    payload: Mapped[dict[str, Any]] = mapped_column(JSONB, nullable=False)
+    reason: Mapped[str] = mapped_column(String(20), nullable=False)  # deleted / cold
+    is_deleted: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    title: Mapped[str] = mapped_column(String(500), nullable=True)
+    author_user_id: Mapped[str] = mapped_column(String(100), nullable=True, index=True)
+    last_crawl_time: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index('idx_note_archive_crawl_time', 'last_crawl_time'),
+    )
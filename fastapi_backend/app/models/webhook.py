@@ -0,0 +1,24 @@
+from typing import Any
+from sqlalchemy import String, Boolean, DateTime, LargeBinary
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.dialects.postgresql import JSONB
+from datetime import datetime
+from .base import Base
+
+
+class WebhookReceipt(Base):
+    """
+    已接收的 webhook 回调（幂等记录）
+
+    以请求体的 SHA-256 为主键，爬虫超时重试发送的相同回调命中已有记录后直接返回首次的响应，
+    不再解析和入库。记录在 expires_at 后失效并被清理。
+    """
+    __tablename__ = "webhook_receipts"
+
+    digest: Mapped[bytes] = mapped_column(LargeBinary(32), primary_key=True)
+    run_id: Mapped[str] = mapped_column(String(100), nullable=True)
+    # 首次请求的响应体；后台入库完成后补充 processed_count / errors
+    response: Mapped[dict[str, Any]] = mapped_column(JSONB, nullable=True)
+    completed: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
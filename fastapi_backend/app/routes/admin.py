@@ -0,0 +1,60 @@
+"""
+管理员API端点
+性能诊断信息，仅超级用户可访问
+"""
+
+from fastapi import APIRouter, Depends
+
+from app.core.query_shapes import query_shape_recorder
+from app.core.serialization import RawJSONResponse, json_dumps
+from app.core.slow_query import slow_query_tracer
+from app.models.user import User
+from app.services.users import current_superuser
+
+router = APIRouter()
+
+
+@router.get("/slow-queries")
+async def get_slow_queries(user: User = Depends(current_superuser)):
+    """
+    查看慢查询
+
+    - summary: 按归一化 SQL 汇总的次数、累计/平均/最大耗时和来源路由，按累计耗时降序
+    - recent: 最近的慢查询
+    - plans: 采样到的 EXPLAIN (ANALYZE, BUFFERS) 执行计划（需开启 SLOW_QUERY_EXPLAIN）
+    """
+    return RawJSONResponse(json_dumps({
+        "threshold_ms": slow_query_tracer.threshold_ms,
+        "explain_enabled": slow_query_tracer.explain,
+        "summary": slow_query_tracer.summary(),
+        "recent": list(reversed(slow_query_tracer.recent)),
+        "plans": list(reversed(slow_query_tracer.plans)),
+    }))
+
+
+@router.delete("/slow-queries")
+async def clear_slow_queries(user: User = Depends(current_superuser)):
+    """清空慢查询记录，调整索引或查询后重新观察"""
+    slow_query_tracer.clear()
+    return {"message": "慢查询记录已清空"}
+
+
+@router.get("/query-shapes")
+async def get_query_shapes(user: User = Depends(current_superuser)):
+    """
+    查看笔记查询的形态统计（本进程自启动或清空以来）
+
+    结果保存为 JSON 后可交给 commands.index_advisor 生成索引建议；
+    多个 worker 时分别采集后一并传入。
+    """
+    return RawJSONResponse(json_dumps({
+        "shapes": query_shape_recorder.snapshot(),
+        "dropped": query_shape_recorder.dropped,
+    }))
+
+
+@router.delete("/query-shapes")
+async def clear_query_shapes(user: User = Depends(current_superuser)):
+    """清空查询形态统计"""
+    query_shape_recorder.clear()
+    return {"message": "查询形态统计已清空"}
@@ -2,22 +2,39 @@
 关键词管理API端点
 """
 
+from datetime import datetime
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import desc
+from sqlalchemy import desc, func
 
-from ..database import get_async_session
+from ..core.logger import app_logger as logger
+from ..database import get_async_session, get_read_session
 from ..models.keyword import BusinessKeyword
 from ..models.user import User
 from ..schemas.keywords import (
     KeywordCreate,
     KeywordUpdate,
     KeywordResponse,
-    KeywordListResponse
+    KeywordListResponse,
+    KeywordBulkResult,
+    KeywordFileFormat,
+    KeywordPreviewRequest,
+    KeywordPreviewResponse
 )
+from ..services.keyword_bulk import (
+    ENCODERS,
+    MEDIA_TYPES,
+    KeywordImportError,
+    format_from_filename,
+    parse_keywords,
+    stream_keyword_rows,
+    upsert_keywords
+)
+from ..services.keyword_preview import KeywordPreview
+from ..services.keyword_registry import keyword_registry
 
 router = APIRouter()
 
@@ -29,24 +46,32 @@ async def get_keywords(
     category: Optional[str] = None,
     active_only: bool = True,
     search: Optional[str] = None,
-    db: AsyncSession = Depends(get_async_session)
+    db: AsyncSession = Depends(get_read_session),
+    primary_db: AsyncSession = Depends(get_async_session),
 ):
-    """获取关键词列表"""
-    
-    query = select(BusinessKeyword)
+    """获取关键词列表（优先由内存注册表提供）"""
+    
+    try:
+        await keyword_registry.ensure_loaded(primary_db)
+        page, total = keyword_registry.search(skip, limit, category, active_only, search)
+        return KeywordListResponse(
+            keywords=[KeywordResponse.model_validate(entry) for entry in page],
+            total=total,
+            categories=keyword_registry.categories()
+        )
+    except Exception as e:
+        logger.warning(f"关键词注册表不可用，回退到数据库查询: {str(e)}")
     
-    # 筛选条件
+    conditions = []
     if active_only:
-        query = query.filter(BusinessKeyword.is_active == True)
-    
+        conditions.append(BusinessKeyword.is_active == True)
     if category:
-        query = query.filter(BusinessKeyword.category == category)
-    
+        conditions.append(BusinessKeyword.category == category)
     if search:
-        query = query.filter(BusinessKeyword.keyword.ilike(f"%{search}%"))
+        conditions.append(BusinessKeyword.keyword.ilike(f"%{search}%"))
     
     # 分页和排序
-    query = query.order_by(
+    query = select(BusinessKeyword).where(*conditions).order_by(
         desc(BusinessKeyword.weight),
         BusinessKeyword.category,
         BusinessKeyword.keyword
@@ -55,27 +80,23 @@ async def get_keywords(
     result = await db.execute(query)
     keywords = result.scalars().all()
     
-    # 获取总数
-    count_query = select(BusinessKeyword)
-    if active_only:
-        count_query = count_query.filter(BusinessKeyword.is_active == True)
-    if category:
-        count_query = count_query.filter(BusinessKeyword.category == category)
-    if search:
-        count_query = count_query.filter(BusinessKeyword.keyword.ilike(f"%{search}%"))
-    
-    count_result = await db.execute(count_query)
-    total = len(count_result.scalars().all())
-    
-    # 获取分类统计
-    categories_result = await db.execute(select(BusinessKeyword.category).distinct())
-    category_list = [cat for cat in categories_result.scalars().all() if cat]
+    total = (await db.execute(select(func.count(BusinessKeyword.id)).where(*conditions))).scalar_one()
     
     return KeywordListResponse(
         keywords=keywords,
         total=total,
-        categories=category_list
+        categories=await _categories_from_db(db)
+    )
+
+
+async def _categories_from_db(db: AsyncSession) -> List[str]:
+    result = await db.execute(
+        select(BusinessKeyword.category)
+        .where(BusinessKeyword.category.isnot(None), BusinessKeyword.category != "")
+        .distinct()
+        .order_by(BusinessKeyword.category)
     )
+    return list(result.scalars().all())
 
 
 @router.post("/", response_model=KeywordResponse)
@@ -102,10 +123,91 @@ async def create_keyword(
     db.add(keyword)
     await db.commit()
     await db.refresh(keyword)
+    await keyword_registry.upsert(keyword)
     
     return keyword
 
 
+@router.post("/bulk", response_model=KeywordBulkResult)
+async def bulk_import_keywords(
+    file: UploadFile = File(...),
+    format: Optional[KeywordFileFormat] = None,
+    db: AsyncSession = Depends(get_async_session)
+):
+    """
+    批量导入关键词（CSV / JSON / NDJSON，列同导出文件）
+
+    已存在的关键词按导入内容更新，整批在一个事务内完成；返回新建、更新和未变化的数量。
+    未指定 format 时按文件扩展名判断。
+    """
+    format = format or format_from_filename(file.filename)
+    if format is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="无法识别文件格式，请指定 format 参数（csv / json / ndjson）"
+        )
+    
+    try:
+        items = parse_keywords(await file.read(), format)
+    except KeywordImportError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    if not items:
+        return KeywordBulkResult(total=0, created=0, updated=0, unchanged=0)
+    
+    counts = await upsert_keywords(db, items)
+    await db.commit()
+    if counts["created"] or counts["updated"]:
+        await keyword_registry.publish_reload()
+    
+    logger.info(f"批量导入关键词: {counts}")
+    return KeywordBulkResult(**counts)
+
+
+@router.get("/export")
+async def export_keywords(
+    format: KeywordFileFormat = KeywordFileFormat.CSV,
+    db: AsyncSession = Depends(get_read_session)
+):
+    """流式导出全部关键词，导出文件可直接用于批量导入"""
+    partitions = stream_keyword_rows(db)
+    
+    async def body():
+        # 依赖注入的会话在响应发送前就已退出，这里自行负责关闭
+        try:
+            async for chunk in ENCODERS[format](partitions):
+                yield chunk
+        except Exception as e:
+            logger.error(f"导出关键词失败: {str(e)}")
+            raise
+        finally:
+            await partitions.aclose()
+            await db.close()
+    
+    filename = f"keywords-{datetime.utcnow():%Y%m%d%H%M%S}.{format.value}"
+    return StreamingResponse(
+        body(),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.post("/preview", response_model=KeywordPreviewResponse)
+async def preview_keywords(
+    request: KeywordPreviewRequest,
+    db: AsyncSession = Depends(get_read_session)
+):
+    """
+    关键词影响预览（只读）
+
+    评估候选关键词（mode=add）或整套草稿关键词（mode=replace）会命中多少已入库笔记、
+    其中多少会新变为重要笔记，并给出命中样例。宽泛或过短的关键词按抽样估算（estimated=true），
+    超过时间预算时返回已完成的部分（timed_out=true）。
+    """
+    preview = KeywordPreview(db, time_budget_ms=request.time_budget_ms)
+    return await preview.run(request.keywords, request.mode, request.sample_size)
+
+
 @router.put("/{keyword_id}", response_model=KeywordResponse)
 async def update_keyword(
     keyword_id: str,
@@ -148,6 +250,7 @@ async def update_keyword(
     
     await db.commit()
     await db.refresh(keyword)
+    await keyword_registry.upsert(keyword)
     
     return keyword
 
@@ -170,10 +273,12 @@ async def delete_keyword(
             detail="关键词不存在"
         )
     
+    deleted_id, deleted_text = keyword.id, keyword.keyword
     await db.delete(keyword)
     await db.commit()
+    await keyword_registry.remove(deleted_id)
     
-    return {"message": f"关键词 '{keyword.keyword}' 已删除"}
+    return {"message": f"关键词 '{deleted_text}' 已删除"}
 
 
 @router.patch("/{keyword_id}/toggle")
@@ -197,6 +302,7 @@ async def toggle_keyword_status(
     keyword.is_active = not keyword.is_active
     await db.commit()
     await db.refresh(keyword)
+    await keyword_registry.upsert(keyword)
     
     status_text = "启用" if keyword.is_active else "禁用"
     return {
@@ -207,49 +313,57 @@ async def toggle_keyword_status(
 
 @router.get("/categories", response_model=List[str])
 async def get_categories(
-    db: AsyncSession = Depends(get_async_session)
+    db: AsyncSession = Depends(get_read_session),
+    primary_db: AsyncSession = Depends(get_async_session),
 ):
     """获取所有关键词分类"""
     
-    result = await db.execute(select(BusinessKeyword.category).distinct())
-    return [cat for cat in result.scalars().all() if cat]
+    try:
+        await keyword_registry.ensure_loaded(primary_db)
+        return keyword_registry.categories()
+    except Exception as e:
+        logger.warning(f"关键词注册表不可用，回退到数据库查询: {str(e)}")
+    return await _categories_from_db(db)
 
 
 @router.get("/stats")
 async def get_keyword_stats(
-    db: AsyncSession = Depends(get_async_session)
+    db: AsyncSession = Depends(get_read_session),
+    primary_db: AsyncSession = Depends(get_async_session),
 ):
     """获取关键词统计信息"""
     
-    # 总数和活跃数
-    total_result = await db.execute(select(BusinessKeyword))
-    total = len(total_result.scalars().all())
+    try:
+        await keyword_registry.ensure_loaded(primary_db)
+        return keyword_registry.stats()
+    except Exception as e:
+        logger.warning(f"关键词注册表不可用，回退到数据库查询: {str(e)}")
     
-    active_result = await db.execute(
-        select(BusinessKeyword).filter(BusinessKeyword.is_active == True)
-    )
-    active = len(active_result.scalars().all())
+    # 总数和活跃数
+    total, active = (await db.execute(
+        select(
+            func.count(BusinessKeyword.id),
+            func.count(BusinessKeyword.id).filter(BusinessKeyword.is_active == True),
+        )
+    )).one()
     
     # 按分类统计
-    category_stats = {}
-    categories_result = await db.execute(select(BusinessKeyword.category).distinct())
-    
-    for cat in categories_result.scalars().all():
-        if cat:
-            count_result = await db.execute(
-                select(BusinessKeyword).filter(BusinessKeyword.category == cat)
-            )
-            category_stats[cat] = len(count_result.scalars().all())
+    category_result = await db.execute(
+        select(BusinessKeyword.category, func.count(BusinessKeyword.id))
+        .where(BusinessKeyword.category.isnot(None), BusinessKeyword.category != "")
+        .group_by(BusinessKeyword.category)
+        .order_by(BusinessKeyword.category)
+    )
+    category_stats = {cat: count for cat, count in category_result.all()}
     
     # 按权重统计
-    weight_stats = {}
-    for weight in range(1, 11):
-        weight_result = await db.execute(
-            select(BusinessKeyword).filter(BusinessKeyword.weight == weight)
-        )
-        count = len(weight_result.scalars().all())
-        if count > 0:
-            weight_stats[f"权重{weight}"] = count
+    weight_result = await db.execute(
+        select(BusinessKeyword.weight, func.count(BusinessKeyword.id))
+        .where(BusinessKeyword.weight.between(1, 10))
+        .group_by(BusinessKeyword.weight)
+        .order_by(BusinessKeyword.weight)
+    )
+    weight_stats = {f"权重{weight}": count for weight, count in weight_result.all()}
     
     return {
         "total": total,
@@ -257,4 +371,4 @@ async def get_keyword_stats(
         "inactive": total - active,
         "category_stats": category_stats,
         "weight_stats": weight_stats
-    } 
\ No newline at end of file
+    }
@@ -0,0 +1,18 @@
+"""
+性能指标API端点
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.metrics import registry
+
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus 抓取接口"""
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
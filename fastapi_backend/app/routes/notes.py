@@ -3,33 +3,56 @@
 专门处理笔记和评论的查询功能
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from datetime import datetime, timezone, timedelta
 
-from app.database import get_async_session
+from app.database import get_async_session, get_read_session
 from app.schemas.notes import (
     NoteStatsResponse,
     XhsNoteResponse,
     NotesListResponse,
+    NoteExportFormat,
 )
-from app.services.xhs_async_service import XhsDataService
+from app.services.xhs_async_service import (
+    XhsDataService,
+    NOTE_RESPONSE_COLUMNS,
+    NOTE_RESPONSE_FIELDS,
+    resolve_note_columns,
+)
+from app.services.note_archive import restore_archived_note, search_archived_notes
+from app.services.note_export import EXPORT_COLUMNS, ENCODERS, MEDIA_TYPES, parquet_available
 from app.core.logger import app_logger as logger
+from app.core.serialization import RawJSONResponse, json_dumps, rows_to_dicts
+from app.core.cache import data_version, versioned_json_response
+from app.utils import parse_fields
 
 router = APIRouter()
 
 
+def _today_start_cst() -> datetime:
+    """中国时区今天零点（naive datetime）"""
+    # 获取中国时区的当前时间（通过UTC+8小时），然后取其零点，生成一个 naive datetime
+    now_in_cst = datetime.utcnow() + timedelta(hours=8)
+    return now_in_cst.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
 @router.get("/stats", response_model=NoteStatsResponse)
-async def get_notes_stats(db: AsyncSession = Depends(get_async_session)):
+async def get_notes_stats(request: Request, db: AsyncSession = Depends(get_read_session)):
     """
     获取笔记统计信息
+    
+    支持 ETag 条件请求，数据未变化时返回 304
     """
-    try:
+    async def build() -> bytes:
         xhs_service = XhsDataService(db)
         stats = await xhs_service.get_notes_stats()
-        
-        return NoteStatsResponse(**stats)
+        return json_dumps(NoteStatsResponse(**stats).model_dump())
+
+    try:
+        return await versioned_json_response(request, ("notes",), build)
         
     except Exception as e:
         logger.error(f"获取统计信息失败: {str(e)}")
@@ -38,6 +61,7 @@ async def get_notes_stats(db: AsyncSession = Depends(get_async_session)):
 
 @router.get("/", response_model=NotesListResponse)
 async def search_notes(
+    request: Request,
     keyword: str = None,
     is_new: bool = None,
     is_changed: bool = None,
@@ -49,20 +73,26 @@ async def search_notes(
     # 新增的筛选和排序参数
     filters: str = None,
     sort: str = None,
-    db: AsyncSession = Depends(get_async_session)
+    fields: str = None,
+    include_deleted: bool = False,
+    db: AsyncSession = Depends(get_read_session)
 ):
     """
     搜索和筛选笔记 - 支持分页、筛选和排序
+    
+    fields 为逗号分隔的字段名（稀疏字段集），指定后只查询并返回这些列
+    （id 和 note_id 总是返回），用于表格视图跳过 desc、image_list 等大字段。
+    include_deleted=true 时包含已软删除但尚未归档的笔记。
+    支持 ETag 条件请求，数据未变化时返回 304。
     """
     try:
+        columns = resolve_note_columns(parse_fields(fields))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def build() -> bytes:
         # 处理today_only参数
-        date_from = None
-        if today_only:
-            # 获取中国时区的当前时间（通过UTC+8小时），然后取其零点，生成一个 naive datetime
-            now_in_cst = datetime.utcnow() + timedelta(hours=8)
-            today_start = now_in_cst.replace(hour=0, minute=0, second=0, microsecond=0)
-            date_from = today_start
-            print(f"date_from3: {date_from}")
+        date_from = _today_start_cst() if today_only else None
         
         # 计算偏移量
         offset = (page - 1) * size
@@ -78,10 +108,12 @@ async def search_notes(
             author_user_id=author_user_id,
             date_from=date_from,
             filters=filters,
+            include_deleted=include_deleted,
         )
         
-        # 获取笔记列表
-        notes = await xhs_service.search_notes(
+        # 获取笔记列表（只查询响应需要的列，直接编码为 JSON 字节）
+        rows = await xhs_service.search_note_rows(
+            columns,
             keyword=keyword,
             is_new=is_new,
             is_changed=is_changed,
@@ -92,78 +124,163 @@ async def search_notes(
             offset=offset,
             filters=filters,
             sort=sort,
+            include_deleted=include_deleted,
         )
         
-        # 转换为响应模式
-        result = []
-        for note in notes:
-            note_response = XhsNoteResponse(
-                id=str(note.id),
-                note_id=note.note_id,
-                note_url=note.note_url,
-                note_type=note.note_type,
-                title=note.title,
-                desc=note.desc,
-                author_nickname=note.author_nickname,
-                liked_count=note.liked_count,
-                comment_count=note.comment_count,
-                current_tags=note.current_tags,
-                is_new=note.is_new,
-                is_changed=note.is_changed,
-                is_important=note.is_important,
-                is_deleted=note.is_deleted,
-                first_crawl_time=note.first_crawl_time,
-                last_crawl_time=note.last_crawl_time,
-                image_list=note.image_list,
-                author_avatar=note.author_avatar
-            )
-            result.append(note_response)
-        
-        return NotesListResponse(
-            notes=result,
-            total=total,
-            page=page,
-            size=size
-        )
+        return json_dumps({
+            "notes": rows_to_dicts(rows, [column.key for column in columns]),
+            "total": total,
+            "page": page,
+            "size": size,
+        })
+
+    try:
+        return await versioned_json_response(request, ("notes",), build)
         
     except Exception as e:
         logger.error(f"搜索笔记失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"搜索失败: {str(e)}")
 
 
-@router.get("/{note_id}")
-async def get_note_detail(
+@router.get("/export")
+async def export_notes(
+    format: NoteExportFormat = NoteExportFormat.CSV,
+    keyword: str = None,
+    is_new: bool = None,
+    is_changed: bool = None,
+    is_important: bool = None,
+    author_user_id: str = None,
+    today_only: bool = False,
+    filters: str = None,
+    sort: str = None,
+    include_deleted: bool = False,
+    batch_size: int = Query(default=2000, ge=100, le=10000),
+    db: AsyncSession = Depends(get_read_session)
+):
+    """
+    流式导出笔记 - 与列表接口使用相同的 filters/sort
+
+    通过服务端游标一次顺序扫描完成导出，不做 COUNT 和 OFFSET 分页；
+    响应体按批次生成，客户端读取慢时游标随之暂停，内存占用恒定。
+    """
+    if format == NoteExportFormat.PARQUET and not parquet_available():
+        raise HTTPException(status_code=501, detail="服务端未安装 pyarrow，无法导出 Parquet")
+
+    xhs_service = XhsDataService(db)
+    partitions = xhs_service.stream_note_rows(
+        EXPORT_COLUMNS,
+        keyword=keyword,
+        is_new=is_new,
+        is_changed=is_changed,
+        is_important=is_important,
+        author_user_id=author_user_id,
+        date_from=_today_start_cst() if today_only else None,
+        filters=filters,
+        sort=sort,
+        batch_size=batch_size,
+        include_deleted=include_deleted,
+    )
+
+    async def body():
+        # 依赖注入的会话在响应发送前就已退出，这里自行负责关闭
+        try:
+            async for chunk in ENCODERS[format](partitions):
+                yield chunk
+        except Exception as e:
+            logger.error(f"导出笔记失败: {str(e)}")
+            raise
+        finally:
+            await partitions.aclose()
+            await db.close()
+
+    filename = f"notes-{datetime.utcnow():%Y%m%d%H%M%S}.{format.value}"
+    return StreamingResponse(
+        body(),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/archived")
+async def search_archived_notes_endpoint(
+    keyword: str = None,
+    author_user_id: str = None,
+    include_deleted: bool = False,
+    page: int = 1,
+    size: int = Query(default=50, ge=1, le=500),
+    db: AsyncSession = Depends(get_read_session)
+):
+    """
+    查询已归档的笔记
+
+    归档笔记不参与列表、统计和导出；返回字段与笔记详情相同，
+    另附 archive_reason（deleted/cold）和 archived_at。
+    """
+    try:
+        rows, total = await search_archived_notes(
+            db,
+            keyword=keyword,
+            author_user_id=author_user_id,
+            include_deleted=include_deleted,
+            limit=size,
+            offset=(page - 1) * size,
+        )
+        notes = [
+            {
+                **{field: payload.get(field) for field in NOTE_RESPONSE_FIELDS},
+                "archive_reason": reason,
+                "archived_at": archived_at,
+            }
+            for payload, reason, archived_at in rows
+        ]
+        return RawJSONResponse(json_dumps({"notes": notes, "total": total, "page": page, "size": size}))
+
+    except Exception as e:
+        logger.error(f"查询归档笔记失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"查询归档失败: {str(e)}")
+
+
+@router.post("/archived/{note_id}/restore", response_model=XhsNoteResponse)
+async def restore_archived_note_endpoint(
     note_id: str,
     db: AsyncSession = Depends(get_async_session)
+):
+    """
+    把归档的笔记移回笔记表
+    """
+    try:
+        note = await restore_archived_note(db, note_id)
+        if note is None:
+            raise HTTPException(status_code=404, detail="归档笔记不存在")
+        # 提交前取值，避免提交后属性过期触发重新加载
+        body = json_dumps({field: getattr(note, field) for field in NOTE_RESPONSE_FIELDS})
+        await db.commit()
+        data_version.bump("notes")
+        return RawJSONResponse(body)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"恢复归档笔记失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"恢复失败: {str(e)}")
+
+
+@router.get("/{note_id}", response_model=XhsNoteResponse)
+async def get_note_detail(
+    note_id: str,
+    db: AsyncSession = Depends(get_read_session)
 ):
     """
     获取单个笔记详情
     """
     try:
         xhs_service = XhsDataService(db)
-        note = await xhs_service.get_note_by_id(note_id)
+        row = await xhs_service.get_note_row(note_id, NOTE_RESPONSE_COLUMNS)
         
-        if not note:
+        if not row:
             raise HTTPException(status_code=404, detail="笔记不存在")
             
-        return XhsNoteResponse(
-            id=str(note.id),
-            note_id=note.note_id,
-            note_url=note.note_url,
-            note_type=note.note_type,
-            title=note.title,
-            desc=note.desc,
-            author_nickname=note.author_nickname,
-            liked_count=note.liked_count,
-            comment_count=note.comment_count,
-            current_tags=note.current_tags,
-            is_new=note.is_new,
-            is_changed=note.is_changed,
-            is_important=note.is_important,
-            is_deleted=note.is_deleted,
-            first_crawl_time=note.first_crawl_time,
-            last_crawl_time=note.last_crawl_time
-        )
+        return RawJSONResponse(json_dumps(dict(zip(NOTE_RESPONSE_FIELDS, row))))
         
     except HTTPException:
         raise
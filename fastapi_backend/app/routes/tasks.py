@@ -3,15 +3,17 @@
 专门处理爬取任务的触发和管理
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 from typing import Optional, List
+import asyncio
 import json
 import os
 import requests
 
-from app.database import get_async_session
+from app.database import get_async_session, get_read_session
 from app.schemas.webhook import (
     CrawlTaskRequest,
     TaskTriggerResponse,
@@ -30,9 +32,15 @@ from app.models.task import CrawlTask, TaskStatus
 from app.models.user import User
 from sqlalchemy import select, func, and_, case, literal_column
 from app.core.logger import app_logger as logger
+from app.core.cache import data_version, versioned_json_response
+from app.core.serialization import json_dumps
+from app.core.events import task_events, format_sse, EVENT_FAILED, TERMINAL_EVENTS
 
 router = APIRouter()
 
+# SSE 心跳间隔（秒），防止代理因空闲断开连接
+SSE_HEARTBEAT_SECONDS = 15
+
 
 @router.post("/trigger-crawl", response_model=TaskTriggerResponse) 
 async def trigger_crawl_task(
@@ -79,6 +87,7 @@ async def trigger_crawl_task(
         
         db.add(task)
         await db.commit()
+        data_version.bump("tasks")
         # 不要刷新关系，只获取任务ID
         task_id = task.id
         
@@ -121,6 +130,7 @@ async def trigger_crawl_task(
             task.status = TaskStatus.RUNNING
             task.started_at = datetime.utcnow()
             await db.commit()
+            data_version.bump("tasks")
             
             return TaskTriggerResponse(
                 success=True,
@@ -133,6 +143,7 @@ async def trigger_crawl_task(
             task.status = TaskStatus.FAILED
             task.error_message = f"GitHub API调用失败: {response.status_code} - {response.text}"
             await db.commit()
+            data_version.bump("tasks")
             
             raise HTTPException(
                 status_code=500, 
@@ -151,7 +162,7 @@ async def get_tasks(
     filters: Optional[List[str]] = None,
     status: Optional[str] = None,
     keyword: Optional[str] = None,
-    db: AsyncSession = Depends(get_async_session)
+    db: AsyncSession = Depends(get_read_session)
 ):
     """
     获取任务列表
@@ -171,7 +182,6 @@ async def get_tasks(
         
         # 分页计算
         offset = (page - 1) * size
-        print(f"filters: {filters}")
         # 查询总数
         count_query = select(func.count(CrawlTask.id))
         if conditions:
@@ -227,12 +237,15 @@ async def get_tasks(
 
 @router.get("/stats", response_model=TaskStatsResponse, name="get_task_stats")
 async def get_task_stats(
-    db: AsyncSession = Depends(get_async_session)
+    request: Request,
+    db: AsyncSession = Depends(get_read_session)
 ):
     """
     获取任务统计信息
+    
+    支持 ETag 条件请求，任务状态未变化时返回 304
     """
-    try:
+    async def build() -> bytes:
         # 查询总数
         total_query = select(func.count(CrawlTask.id).label("total"))
         total_result = await db.execute(total_query)
@@ -255,13 +268,16 @@ async def get_task_stats(
         failed_result = await db.execute(failed_query)
         failed = failed_result.scalar() or 0
         
-        return TaskStatsResponse(
+        return json_dumps(TaskStatsResponse(
             total_tasks=total,
             pending_tasks=pending,
             running_tasks=running,
             completed_tasks=completed,
             failed_tasks=failed
-        )
+        ).model_dump())
+
+    try:
+        return await versioned_json_response(request, ("tasks",), build)
         
     except Exception as e:
         logger.error(f"获取任务统计失败: {str(e)}")
@@ -271,7 +287,7 @@ async def get_task_stats(
 @router.get("/detail/{task_id}", response_model=TaskResponse)
 async def get_task_detail(
     task_id: str,
-    db: AsyncSession = Depends(get_async_session)
+    db: AsyncSession = Depends(get_read_session)
 ):
     """
     获取任务详情
@@ -318,6 +334,66 @@ async def get_task_detail(
         raise HTTPException(status_code=500, detail=f"获取任务详情失败: {str(e)}")
 
 
+@router.get("/{task_id}/events")
+async def stream_task_events(
+    task_id: str,
+    request: Request,
+    db: AsyncSession = Depends(get_read_session)
+):
+    """
+    订阅任务事件（Server-Sent Events）
+    
+    先推送一次当前任务状态（snapshot），之后推送 started / progress /
+    ingest_chunk / completed / failed 事件，任务结束后关闭连接，
+    前端无需再轮询任务详情接口。
+    """
+    import uuid
+    try:
+        uuid_obj = uuid.UUID(task_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"无效的任务ID格式: {task_id}")
+    
+    result = await db.execute(select(CrawlTask).where(CrawlTask.id == uuid_obj))
+    task = result.scalar_one_or_none()
+    if not task:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    
+    snapshot = {
+        "status": task.status.value,
+        "total_crawled": task.total_crawled,
+        "new_notes": task.new_notes,
+        "changed_notes": task.changed_notes,
+        "important_notes": task.important_notes,
+        "error_message": task.error_message,
+        "started_at": task.started_at,
+        "finished_at": task.finished_at,
+    }
+    finished = task.status in (TaskStatus.COMPLETED, TaskStatus.FAILED)
+    
+    async def event_stream():
+        yield format_sse("snapshot", snapshot)
+        if finished:
+            return
+        
+        with task_events.subscribe(task_id) as queue:
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                
+                yield format_sse(message["event"], message["data"], message["id"])
+                if message["event"] in TERMINAL_EVENTS:
+                    break
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.delete("/{task_id}", response_model=TaskActionResponse)
 async def cancel_task(
     task_id: str,
@@ -354,6 +430,8 @@ async def cancel_task(
         task.error_message = "任务被用户取消"
         task.finished_at = datetime.utcnow()
         await db.commit()
+        data_version.bump("tasks")
+        await task_events.publish(task_id, EVENT_FAILED, {"error_message": task.error_message})
         
         return TaskActionResponse(
             success=True,
@@ -409,6 +487,7 @@ async def create_task(
         
         db.add(task)
         await db.commit()
+        data_version.bump("tasks")
         await db.refresh(task)
         
         return TaskActionResponse(
@@ -5,29 +5,40 @@ Webhook API 端点
 
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import json
-import hmac
-import hashlib
 
+from app.config import settings
 from app.database import get_async_session
 from app.schemas.webhook import (
     WebhookRequest,
     WebhookResponse,
     WebhookStatus
 )
-from app.schemas.notes import (
-    XhsNoteData,
-    ProcessResult
-)
+from app.schemas.notes import ProcessResult
 from app.services.xhs_async_service import XhsDataService
+from app.services.ingest_lanes import ingest_partitioned, lock_notes
+from app.services.note_normalizer import is_note_item
+from app.services.note_validation import prepare_notes
+from app.services.webhook_receipts import IdempotentWebhookRoute, complete_receipt, release_receipt
 from app.models.task import CrawlTask, TaskStatus
 from app.core.logger import app_logger as logger
+from app.core.cache import data_version
+from app.core.events import (
+    task_events,
+    EVENT_STARTED,
+    EVENT_PROGRESS,
+    EVENT_INGEST_CHUNK,
+    ingest_chunk_data,
+    EVENT_COMPLETED,
+    EVENT_FAILED,
+)
 from sqlalchemy import select
 from datetime import datetime
 import uuid
 
-router = APIRouter()
+# 带请求体的回调按请求体摘要去重，爬虫的超时重试直接返回首次结果
+router = APIRouter(route_class=IdempotentWebhookRoute)
 
 
 async def update_task_status(db: AsyncSession, task_id: str, status: TaskStatus, 
@@ -67,52 +78,53 @@ async def update_task_status(db: AsyncSession, task_id: str, status: TaskStatus,
             task.error_message = error_message
             
         await db.commit()
+        data_version.bump("tasks")
         logger.info(f"更新任务状态: {task_id} -> {status.value}")
         
+        # 推送任务事件
+        if status == TaskStatus.RUNNING:
+            await task_events.publish(task_id, EVENT_STARTED)
+        elif status == TaskStatus.COMPLETED:
+            await task_events.publish(task_id, EVENT_COMPLETED, {
+                "total_crawled": task.total_crawled,
+                "new_notes": task.new_notes,
+                "changed_notes": task.changed_notes,
+                "important_notes": task.important_notes,
+            })
+        elif status == TaskStatus.FAILED:
+            await task_events.publish(task_id, EVENT_FAILED, {"error_message": task.error_message})
+        
     except Exception as e:
         logger.error(f"更新任务状态失败: {str(e)}")
 
 
-def transform_note_data(raw_data: dict) -> dict:
+async def ingest_notes(xhs_service: XhsDataService, items: List[Any], trusted: bool = False) -> Optional[ProcessResult]:
     """
-    转换原始笔记数据为符合XhsNoteData schema的格式
-    将嵌套结构转换为扁平化结构
+    转换、校验并按 INGEST_LANES 分区并行入库回调中的笔记列表
+
+    无效笔记不影响其余笔记入库，以“第 N 条笔记无效”的形式记入结果的 errors；没有笔记时返回 None。
     """
-    transformed = {}
-    
-    # 复制基础字段
-    for key in ['note_id', 'note_url', 'note_type', 'title', 'desc', 'tags', 
-                'upload_time', 'ip_location', 'video_cover', 
-                'image_list', 'xsec_token']:
-        if key in raw_data:
-            transformed[key] = raw_data[key]
-    
-    # 处理author嵌套字段
-    if 'author' in raw_data and isinstance(raw_data['author'], dict):
-        author = raw_data['author']
-        transformed['author_user_id'] = author.get('user_id')
-        transformed['author_nickname'] = author.get('nickname')
-        transformed['author_avatar'] = author.get('avatar')
-    
-    # 处理interact_info嵌套字段
-    if 'interact_info' in raw_data and isinstance(raw_data['interact_info'], dict):
-        interact = raw_data['interact_info']
-        transformed['liked_count'] = interact.get('liked_count', 0)
-        transformed['collected_count'] = interact.get('collected_count', 0)
-        transformed['comment_count'] = interact.get('comment_count', 0)
-        transformed['share_count'] = interact.get('share_count', 0)
+    batch = prepare_notes(items, trusted)
+    if batch.invalid:
+        logger.warning(f"回调中有{len(batch.invalid)}条无效笔记: {batch.errors[:5]}")
+    if batch.notes:
+        result = await ingest_partitioned(xhs_service, batch.notes, settings.INGEST_LANES)
+        logger.info(f"处理笔记批量数据完成: 新增{result.new_count}个笔记，变更{result.changed_count}个笔记")
+    elif batch.invalid:
+        result = ProcessResult(total_processed=0, new_count=0, changed_count=0, important_count=0)
     else:
-        # 如果没有嵌套结构，尝试直接从根级别获取
-        transformed['liked_count'] = raw_data.get('liked_count', 0)
-        transformed['collected_count'] = raw_data.get('collected_count', 0)
-        transformed['comment_count'] = raw_data.get('comment_count', 0)
-        transformed['share_count'] = raw_data.get('share_count', 0)
-    
-    return transformed
+        return None
+    result.errors = batch.errors + result.errors
+    return result
+
 
-async def process_webhook_data_background(data: Any, db: AsyncSession, task_id: str = None):
+async def process_webhook_data_background(data: Any, db: AsyncSession, task_id: str = None,
+                                          receipt: bytes = None, trusted: bool = False):
     """
     后台处理webhook数据 - 简化版
+
+    receipt 为该回调的幂等记录摘要：处理完成后写入结果，失败时删除记录以便重试重新处理。
+    trusted 为 True（签名可信的来源）时跳过笔记的 Pydantic 校验。
     """
     try:
         xhs_service = XhsDataService(db)
@@ -122,24 +134,20 @@ async def process_webhook_data_background(data: Any, db: AsyncSession, task_id:
         if isinstance(data, dict):
             # 检查是否是包含notes数组的数据格式
             if "notes" in data and isinstance(data["notes"], list):
-                notes_data = []
-                for item in data["notes"]:
-                    if isinstance(item, dict) and "note_id" in item:
-                        # 转换数据格式
-                        transformed_item = transform_note_data(item)
-                        notes_data.append(XhsNoteData(**transformed_item))
-                
-                if notes_data:
-                    result = await xhs_service.process_notes_batch(notes_data)
-                    logger.info(f"处理笔记批量数据完成: 新增{result.new_count}个笔记，变更{result.changed_count}个笔记")
-                else:
+                # 原始 note_card 或扁平格式，单次遍历转换后整批校验
+                result = await ingest_notes(xhs_service, data["notes"], trusted)
+                if result is None:
                     logger.warning(f"notes数组为空或格式不正确")
             # 检查是否是单个笔记
-            elif "note_id" in data:
-                # 转换数据格式
-                transformed_data = transform_note_data(data)
-                note_data = XhsNoteData(**transformed_data)
+            elif is_note_item(data):
+                batch = prepare_notes([data], trusted)
+                if batch.invalid:
+                    raise ValueError(batch.errors[0])
+                note_data = batch.notes[0]
+                await lock_notes(db, [note_data.note_id])
                 is_new, is_changed, is_important = await xhs_service.process_single_note(note_data)
+                await db.commit()
+                data_version.bump("notes")
                 logger.info(f"处理单个笔记完成: {note_data.note_id}")
                 # 为单个笔记创建处理结果
                 result = ProcessResult(
@@ -154,23 +162,24 @@ async def process_webhook_data_background(data: Any, db: AsyncSession, task_id:
                 
         elif isinstance(data, list):
             # 处理笔记列表
-            notes_data = []
-            for item in data:
-                if isinstance(item, dict) and "note_id" in item:
-                    # 转换数据格式
-                    transformed_item = transform_note_data(item)
-                    notes_data.append(XhsNoteData(**transformed_item))
-            
-            if notes_data:
-                result = await xhs_service.process_notes_batch(notes_data)
-                logger.info(f"处理笔记批量数据完成: 新增{result.new_count}个笔记，变更{result.changed_count}个笔记")
+            result = await ingest_notes(xhs_service, data, trusted)
         
         # 更新任务状态
         if task_id and result:
+            await task_events.publish(task_id, EVENT_INGEST_CHUNK, ingest_chunk_data(result.model_dump()))
             await update_task_status(db, task_id, TaskStatus.COMPLETED, result)
         
+        if receipt:
+            await complete_receipt(db, receipt, result)
+        
     except Exception as e:
         logger.error(f"后台处理webhook数据失败: {str(e)}")
+        if receipt:
+            try:
+                await db.rollback()
+                await release_receipt(db, receipt)
+            except Exception as release_error:
+                logger.error(f"删除webhook幂等记录失败: {str(release_error)}")
         if task_id:
             await update_task_status(db, task_id, TaskStatus.FAILED, None, str(e))
 
@@ -179,13 +188,20 @@ async def process_webhook_data_background(data: Any, db: AsyncSession, task_id:
 async def receive_xhs_webhook(
     webhook_data: WebhookRequest,
     background_tasks: BackgroundTasks,
+    request: Request,
     db: AsyncSession = Depends(get_async_session)
 ):
     """
     接收小红书爬虫结果的webhook端点
+
+    相同请求体的重复回调在解析前即被 IdempotentWebhookRoute 拦截并返回首次结果。
     """
     try:
         logger.info(f"收到webhook数据: 状态={webhook_data.status}, 消息={webhook_data.message}")
+        request.state.webhook_run_id = webhook_data.run_id
+        receipt = getattr(request.state, "webhook_receipt", None)
+        # 签名校验通过且允许信任时，后台入库跳过逐条笔记的 Pydantic 校验
+        trusted = settings.WEBHOOK_TRUST_SIGNED_PAYLOADS and getattr(request.state, "webhook_signature_verified", False)
         
         # 根据不同状态处理数据
         if webhook_data.status == WebhookStatus.STARTED:
@@ -198,8 +214,12 @@ async def receive_xhs_webhook(
             )
         
         elif webhook_data.status == WebhookStatus.PROGRESS:
-            # 进度更新，可以记录到日志或更新任务状态
+            # 进度更新，推送给订阅该任务事件的客户端
             logger.info(f"任务进度更新: {webhook_data.progress}% - {webhook_data.message}")
+            await task_events.publish(webhook_data.task_id, EVENT_PROGRESS, {
+                "progress": webhook_data.progress,
+                "message": webhook_data.message,
+            })
             return WebhookResponse(
                 status="received",
                 message="进度更新已接收"
@@ -212,8 +232,11 @@ async def receive_xhs_webhook(
                     process_webhook_data_background,
                     webhook_data.data,
                     db,
-                    webhook_data.task_id  # 传递task_id
+                    webhook_data.task_id,  # 传递task_id
+                    receipt,
+                    trusted,
                 )
+                request.state.webhook_pending = True
                 logger.info(f"SUCCESS状态收到数据，后台处理中")
             
             return WebhookResponse(
@@ -230,8 +253,11 @@ async def receive_xhs_webhook(
                     process_webhook_data_background,
                     webhook_data.data,
                     db,
-                    webhook_data.task_id  # 传递task_id
+                    webhook_data.task_id,  # 传递task_id
+                    receipt,
+                    trusted,
                 )
+                request.state.webhook_pending = True
                 logger.info(f"COMPLETED状态收到数据，后台处理中")
                 return WebhookResponse(
                     status="received",
@@ -274,20 +300,3 @@ async def test_webhook():
     """测试webhook端点"""
     return {"message": "Webhook测试成功", "timestamp": datetime.utcnow()}
 
-
-def verify_webhook_signature(request: Request, secret: str) -> bool:
-    """验证webhook签名"""
-    try:
-        signature = request.headers.get("X-Hub-Signature-256")
-        if not signature:
-            return False
-        
-        body = request.body()
-        expected_signature = hmac.new(
-            secret.encode(), body, hashlib.sha256
-        ).hexdigest()
-        expected_signature = f"sha256={expected_signature}"
-        
-        return hmac.compare_digest(signature, expected_signature)
-    except Exception:
-        return False 
\ No newline at end of file
@@ -23,6 +23,7 @@ from .notes import (
     XhsNoteResponse,
     NotesListResponse,
     NoteStatsResponse,
+    NoteExportFormat,
     ProcessResult
 )
 
@@ -77,6 +78,7 @@ __all__ = [
     "XhsNoteResponse",
     "NotesListResponse",
     "NoteStatsResponse",
+    "NoteExportFormat",
     "ProcessResult",
     
     # Comments 模式
@@ -4,7 +4,8 @@
 
 from typing import List, Optional
 from datetime import datetime
-from pydantic import BaseModel
+from enum import Enum
+from pydantic import BaseModel, Field
 from uuid import UUID
 
 
@@ -39,4 +40,67 @@ class KeywordResponse(KeywordBase):
 class KeywordListResponse(BaseModel):
     keywords: List[KeywordResponse]
     total: int
-    categories: List[str] 
\ No newline at end of file
+    categories: List[str]
+
+
+class KeywordFileFormat(str, Enum):
+    """关键词导入导出文件格式"""
+    CSV = "csv"
+    JSON = "json"
+    NDJSON = "ndjson"
+
+
+class KeywordBulkResult(BaseModel):
+    total: int
+    created: int
+    updated: int
+    unchanged: int
+
+
+class KeywordPreviewMode(str, Enum):
+    """add: 在当前启用关键词基础上加入候选；replace: 以草稿集合替换当前启用关键词"""
+    ADD = "add"
+    REPLACE = "replace"
+
+
+class KeywordPreviewRequest(BaseModel):
+    keywords: List[str] = Field(min_length=1, max_length=100)
+    mode: KeywordPreviewMode = KeywordPreviewMode.ADD
+    sample_size: int = Field(default=5, ge=0, le=50)
+    # 为空时使用 KEYWORD_PREVIEW_TIME_BUDGET_MS
+    time_budget_ms: Optional[int] = Field(default=None, ge=100, le=30000)
+
+
+class KeywordPreviewNote(BaseModel):
+    note_id: str
+    title: Optional[str] = None
+    author_nickname: Optional[str] = None
+    liked_count: Optional[int] = None
+    comment_count: Optional[int] = None
+    collected_count: Optional[int] = None
+    is_important: Optional[bool] = None
+    last_crawl_time: Optional[datetime] = None
+
+
+class KeywordPreviewItem(BaseModel):
+    keyword: str
+    match_count: int
+    # 命中且当前不是重要笔记的数量
+    newly_important: int
+    # 为 true 时计数由样本按比例估算
+    estimated: bool
+    samples: List[KeywordPreviewNote]
+
+
+class KeywordPreviewResponse(BaseModel):
+    mode: KeywordPreviewMode
+    keywords: List[KeywordPreviewItem]
+    # 命中任一关键词的笔记数；超时未完成时为 null
+    total_matches: Optional[int] = None
+    newly_important: Optional[int] = None
+    # 仅 replace 模式：当前重要、但不再命中任何关键词且互动数据未达阈值的笔记数
+    no_longer_important: Optional[int] = None
+    estimated: bool
+    sample_percent: float
+    timed_out: bool
+    elapsed_ms: float
@@ -3,9 +3,10 @@ Notes 相关的 Pydantic 模式定义
 用于处理小红书笔记数据的结构化定义
 """
 
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional, List, Dict, Any
 from datetime import datetime
+from enum import Enum
 
 
 class XhsNoteData(BaseModel):
@@ -40,7 +41,8 @@ class XhsNoteData(BaseModel):
     # 额外数据
     xsec_token: Optional[str] = None
     
-    @validator('note_id')
+    @field_validator('note_id')
+    @classmethod
     def validate_note_id(cls, v):
         if not v or len(v) < 10:
             raise ValueError('note_id 无效')
@@ -93,6 +95,13 @@ class NotesListResponse(BaseModel):
     size: int = Field(description="每页大小")
 
 
+class NoteExportFormat(str, Enum):
+    """笔记导出格式"""
+    CSV = "csv"
+    NDJSON = "ndjson"
+    PARQUET = "parquet"
+
+
 class NoteStatsResponse(BaseModel):
     """笔记统计响应"""
     total_notes: int
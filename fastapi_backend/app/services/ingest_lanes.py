@@ -0,0 +1,114 @@
+"""
+分区并行入库
+一批笔记按 note_id 的哈希分到 INGEST_LANES 个分区（lane），各分区在独立的会话（连接）上并行执行
+process_notes_batch：
+
+- 同一 note_id 总在同一分区内按回调中的顺序处理，不会有两个协程同时对同一条笔记“先查后插”
+  （唯一约束冲突）或覆盖彼此的计数更新
+- 跨进程（多个 worker、并发的回调）由 Postgres 事务级咨询锁保证：每个分区在事务开始时按升序对其
+  全部 note_id 加 pg_advisory_xact_lock，提交或回滚时自动释放；所有持锁方按同一顺序加锁，不会死锁
+- 分区 0 使用调用方的会话，其余分区各自新建会话；额外会话由进程内共享的信号量限额（连接池大小减一），
+  并发回调再多也不会因分区占满连接池，分区数同样按该上限截断
+"""
+
+import asyncio
+from typing import Any, Callable, Iterable, List, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.coordination import advisory_lock_key
+from app.config import settings
+from app.core.logger import app_logger as logger
+from app.database import async_session_maker
+from app.schemas.notes import ProcessResult
+from app.services.xhs_async_service import XhsDataService
+
+_LOCK_NOTES = text("SELECT pg_advisory_xact_lock(key) FROM unnest(CAST(:keys AS bigint[])) AS key")
+
+
+def lane_session_limit() -> int:
+    """进程内同时为分区 1..N 打开的会话上限：连接池大小减一，留给调用方会话；未启用连接池时按 INGEST_LANES"""
+    if settings.DB_POOL_SIZE > 0:
+        return max(settings.DB_POOL_SIZE - 1, 1)
+    return max(settings.INGEST_LANES - 1, 1)
+
+
+# 所有并发批次共享，额外分区拿到名额后才新建会话
+_lane_sessions = asyncio.Semaphore(lane_session_limit())
+
+
+def note_lock_key(note_id: str) -> int:
+    return advisory_lock_key(f"note:{note_id}")
+
+
+def partition_notes(notes: Sequence[Any], lanes: int) -> List[List[Any]]:
+    """按 note_id 分区，分区内保持原顺序；分区号只取决于 note_id，在各进程间一致"""
+    partitions: List[List[Any]] = [[] for _ in range(max(lanes, 1))]
+    for note in notes:
+        partitions[note_lock_key(note.note_id) % len(partitions)].append(note)
+    return partitions
+
+
+async def lock_notes(db: AsyncSession, note_ids: Iterable[str]) -> None:
+    """在当前事务中按升序锁定笔记，事务结束时释放"""
+    keys = sorted({note_lock_key(note_id) for note_id in note_ids})
+    if keys:
+        await db.execute(_LOCK_NOTES, {"keys": keys})
+
+
+async def _ingest_lane(service: XhsDataService, notes: List[Any]) -> ProcessResult:
+    try:
+        await lock_notes(service.db, [note.note_id for note in notes])
+    except Exception:
+        await service.db.rollback()
+        raise
+    # process_notes_batch 在结束时提交（或回滚），锁随之释放
+    return await service.process_notes_batch(notes)
+
+
+async def _ingest_new_session(
+    session_factory: Callable[[], AsyncSession], slots: asyncio.Semaphore, notes: List[Any]
+) -> ProcessResult:
+    async with slots:
+        async with session_factory() as db:
+            return await _ingest_lane(XhsDataService(db), notes)
+
+
+async def ingest_partitioned(
+    service: XhsDataService,
+    notes: Sequence[Any],
+    lanes: int,
+    session_factory: Callable[[], AsyncSession] = async_session_maker,
+    slots: Optional[asyncio.Semaphore] = None,
+) -> ProcessResult:
+    """
+    分区并行入库，返回各分区合并后的结果
+
+    每个分区单独提交；某个分区失败时其余分区照常完成，之后抛出第一个异常（由调用方按整批失败处理，
+    重试时已提交的分区会按重复爬取再处理一次）。分区数不超过 lane_session_limit() + 1，
+    额外分区在 slots（默认为进程内共享的信号量）有空余名额时才打开会话，否则排队等待。
+    """
+    lanes = min(lanes, lane_session_limit() + 1)
+    slots = slots or _lane_sessions
+    partitions = [partition for partition in partition_notes(notes, lanes) if partition]
+    if not partitions:
+        return ProcessResult(total_processed=0, new_count=0, changed_count=0, important_count=0)
+
+    outcomes = await asyncio.gather(
+        _ingest_lane(service, partitions[0]),
+        *[_ingest_new_session(session_factory, slots, partition) for partition in partitions[1:]],
+        return_exceptions=True,
+    )
+    failures = [outcome for outcome in outcomes if isinstance(outcome, BaseException)]
+    if failures:
+        logger.error(f"分区入库失败: {len(failures)}/{len(partitions)} 个分区")
+        raise failures[0]
+
+    return ProcessResult(
+        total_processed=sum(result.total_processed for result in outcomes),
+        new_count=sum(result.new_count for result in outcomes),
+        changed_count=sum(result.changed_count for result in outcomes),
+        important_count=sum(result.important_count for result in outcomes),
+        errors=[error for result in outcomes for error in result.errors],
+    )
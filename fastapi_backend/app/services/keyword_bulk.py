@@ -0,0 +1,207 @@
+"""
+关键词批量导入导出
+导入：解析 CSV / JSON / NDJSON，整批一条 INSERT ... ON CONFLICT (keyword) DO UPDATE 写入，
+内容未变化的行不更新；导出：服务端游标逐批编码，导出文件可直接再导入。
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+import uuid
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Sequence, Tuple
+
+import orjson
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import literal_column, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.keyword import BusinessKeyword
+from app.schemas.keywords import KeywordCreate, KeywordFileFormat
+
+# 导入导出使用的列，顺序即 CSV 表头顺序
+KEYWORD_FIELDS = ["keyword", "category", "weight", "is_active", "description"]
+
+# 每条 INSERT 的行数，避免超过 Postgres 单语句 32767 个参数的上限
+UPSERT_CHUNK_SIZE = 2000
+
+MEDIA_TYPES: Dict[KeywordFileFormat, str] = {
+    KeywordFileFormat.CSV: "text/csv; charset=utf-8",
+    KeywordFileFormat.JSON: "application/json",
+    KeywordFileFormat.NDJSON: "application/x-ndjson",
+}
+
+_items_adapter = TypeAdapter(List[KeywordCreate])
+
+
+class KeywordImportError(ValueError):
+    """导入文件无法解析或校验失败"""
+
+
+def format_from_filename(filename: str | None) -> KeywordFileFormat | None:
+    suffix = (filename or "").rsplit(".", 1)[-1].lower()
+    try:
+        return KeywordFileFormat(suffix)
+    except ValueError:
+        return None
+
+
+def _csv_records(text: str) -> List[Dict[str, Any]]:
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames or "keyword" not in reader.fieldnames:
+        raise KeywordImportError("CSV 缺少 keyword 列")
+    records = []
+    for row in reader:
+        record: Dict[str, Any] = {}
+        for field in KEYWORD_FIELDS:
+            value = (row.get(field) or "").strip()
+            if value:
+                record[field] = value
+            elif field in ("category", "description") and field in reader.fieldnames:
+                # 空单元格表示清空；weight / is_active 为空时使用默认值
+                record[field] = None
+        records.append(record)
+    return records
+
+
+def parse_keywords(content: bytes, format: KeywordFileFormat) -> List[KeywordCreate]:
+    """
+    解析导入文件为关键词列表
+
+    同一关键词出现多次时以最后一次为准（ON CONFLICT 不允许一条语句两次更新同一行）。
+    """
+    try:
+        text = content.decode("utf-8-sig")
+        if format == KeywordFileFormat.CSV:
+            records = _csv_records(text)
+        elif format == KeywordFileFormat.NDJSON:
+            records = [json.loads(line) for line in text.splitlines() if line.strip()]
+        else:
+            records = json.loads(text)
+            if isinstance(records, dict):
+                records = records.get("keywords", [])
+        items = _items_adapter.validate_python(records)
+    except UnicodeDecodeError:
+        raise KeywordImportError("文件必须为 UTF-8 编码")
+    except json.JSONDecodeError as e:
+        raise KeywordImportError(f"JSON 解析失败: {e.msg} (第 {e.lineno} 行)")
+    except ValidationError as e:
+        error = e.errors()[0]
+        index, *location = error["loc"] or ("",)
+        if not isinstance(index, int):
+            raise KeywordImportError(f"导入数据应为关键词列表: {error['msg']}")
+        raise KeywordImportError(f"第 {index + 1} 条数据无效: {'.'.join(map(str, location))} {error['msg']}")
+
+    deduplicated: Dict[str, KeywordCreate] = {}
+    for item in items:
+        item.keyword = item.keyword.strip()
+        if not item.keyword:
+            raise KeywordImportError("关键词不能为空")
+        deduplicated.pop(item.keyword, None)
+        deduplicated[item.keyword] = item
+    return list(deduplicated.values())
+
+
+async def upsert_keywords(db: AsyncSession, items: Sequence[KeywordCreate]) -> Dict[str, int]:
+    """
+    批量写入关键词（调用方负责提交）
+
+    只更新每条数据中出现过的列：JSON/NDJSON 中各对象的键可能不同，按出现的列分组后每组各自 upsert，
+    缺少某列的条目不会把库中已有的值覆盖为默认值（新插入的行仍使用默认值）。
+    内容与库中一致的行被 WHERE 条件跳过，不产生新版本。
+    RETURNING 中 xmax = 0 表示本次插入的新行，其余返回行为更新。
+    """
+    groups: Dict[Tuple[str, ...], List[KeywordCreate]] = {}
+    for item in items:
+        fields = tuple(field for field in KEYWORD_FIELDS if field in item.model_fields_set)
+        groups.setdefault(fields, []).append(item)
+
+    created = updated = 0
+    for fields, group in groups.items():
+        update_fields = [field for field in fields if field != "keyword"]
+        for start in range(0, len(group), UPSERT_CHUNK_SIZE):
+            inserted_rows, updated_rows = await _upsert_chunk(db, group[start:start + UPSERT_CHUNK_SIZE], update_fields)
+            created += inserted_rows
+            updated += updated_rows
+
+    return {
+        "total": len(items),
+        "created": created,
+        "updated": updated,
+        "unchanged": len(items) - created - updated,
+    }
+
+
+async def _upsert_chunk(db: AsyncSession, chunk: Sequence[KeywordCreate], update_fields: List[str]) -> Tuple[int, int]:
+    """写入一组列相同的关键词，返回 (插入数, 更新数)"""
+    table = BusinessKeyword.__table__
+    now = datetime.utcnow()
+    statement = insert(table).values([
+        {**item.model_dump(), "id": uuid.uuid4(), "created_at": now, "updated_at": now}
+        for item in chunk
+    ])
+    if update_fields:
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.keyword],
+            set_={**{field: statement.excluded[field] for field in update_fields}, "updated_at": now},
+            where=tuple_(*[table.c[field] for field in update_fields]).is_distinct_from(
+                tuple_(*[statement.excluded[field] for field in update_fields])
+            ),
+        )
+    else:
+        statement = statement.on_conflict_do_nothing(index_elements=[table.c.keyword])
+    result = await db.execute(statement.returning(literal_column("(xmax = 0)").label("inserted")))
+    inserted = [row.inserted for row in result.all()]
+    return sum(inserted), len(inserted) - sum(inserted)
+
+
+async def stream_keyword_rows(db: AsyncSession, batch_size: int = 1000) -> AsyncIterator[Sequence[Any]]:
+    """按关键词顺序分批产出导出行"""
+    query = select(*[BusinessKeyword.__table__.c[field] for field in KEYWORD_FIELDS]).order_by(BusinessKeyword.keyword)
+    result = await db.stream(query.execution_options(yield_per=batch_size))
+    async for partition in result.partitions():
+        yield partition
+
+
+async def encode_csv(partitions: AsyncIterator[Sequence[Any]]) -> AsyncIterator[bytes]:
+    """CSV 编码，带 BOM 以便 Excel 正确识别中文"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(KEYWORD_FIELDS)
+    yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+
+    async for rows in partitions:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(["" if value is None else value for value in row] for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def encode_ndjson(partitions: AsyncIterator[Sequence[Any]]) -> AsyncIterator[bytes]:
+    """每行一个 JSON 对象"""
+    async for rows in partitions:
+        yield b"".join(
+            orjson.dumps(dict(zip(KEYWORD_FIELDS, row)), option=orjson.OPT_APPEND_NEWLINE)
+            for row in rows
+        )
+
+
+async def encode_json(partitions: AsyncIterator[Sequence[Any]]) -> AsyncIterator[bytes]:
+    """JSON 数组，逐批输出元素"""
+    separator = b"["
+    async for rows in partitions:
+        if not rows:
+            continue
+        yield separator + b",".join(orjson.dumps(dict(zip(KEYWORD_FIELDS, row))) for row in rows)
+        separator = b","
+    yield b"[]" if separator == b"[" else b"]"
+
+
+ENCODERS = {
+    KeywordFileFormat.CSV: encode_csv,
+    KeywordFileFormat.JSON: encode_json,
+    KeywordFileFormat.NDJSON: encode_ndjson,
+}
@@ -0,0 +1,246 @@
+"""
+关键词影响预览
+启用关键词前，按入库时的重要性规则（标题或描述包含关键词，或互动数据超过阈值）
+评估候选关键词或整套草稿关键词在现有笔记上的命中数、样例和 is_important 变化，不修改数据。
+
+- 先用一次 TABLESAMPLE 抽样扫描同时估算所有关键词的命中数
+- 估算命中数不超过 KEYWORD_PREVIEW_EXACT_LIMIT 且能使用 pg_trgm 索引（idx_note_live_text_trgm，
+  关键词不少于 3 个字符）时再精确统计；过短或过于宽泛的关键词只返回按比例放大的估算值
+- 每条语句用 statement_timeout 限制在剩余时间预算内，超时后返回已完成的部分
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy import and_, desc, false, func, literal_column, not_, or_, select, tablesample, text, true
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.logger import app_logger as logger
+from app.models.note import XhsNote, note_search_text
+from app.schemas.keywords import KeywordPreviewMode
+from app.services.xhs_async_service import IMPORTANT_ENGAGEMENT_THRESHOLDS
+
+# pg_trgm 需要至少一个完整三元组才能用索引筛选 LIKE '%...%'
+TRIGRAM_MIN_LENGTH = 3
+
+# 表尚未 ANALYZE（reltuples 未知）时按每行约 2KB 由表大小估算行数
+ROW_BYTES_ESTIMATE = 2048
+
+# Postgres query_canceled（statement_timeout 触发）
+QUERY_CANCELED = "57014"
+
+SAMPLE_COLUMNS = [
+    "note_id", "title", "author_nickname", "liked_count", "comment_count",
+    "collected_count", "is_important", "last_crawl_time",
+]
+
+Condition = Callable[[Any], Any]
+
+
+class PreviewBudgetExceeded(Exception):
+    """时间预算用完"""
+
+
+@dataclass
+class Measurement:
+    matches: int
+    not_important: int
+    estimated: bool
+
+
+def like_pattern(keyword: str) -> str:
+    escaped = keyword.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def keyword_condition(keyword: str) -> Condition:
+    pattern = like_pattern(keyword)
+    return lambda table: note_search_text(table).like(pattern)
+
+
+def engagement_condition(table) -> Any:
+    return or_(*[table.c[field] > threshold for field, threshold in IMPORTANT_ENGAGEMENT_THRESHOLDS.items()])
+
+
+def normalize_keywords(keywords: Sequence[str]) -> List[str]:
+    """与重要性判断一致地小写匹配，去掉空白和重复"""
+    return list(dict.fromkeys(keyword.strip().lower() for keyword in keywords if keyword.strip()))
+
+
+class KeywordPreview:
+    def __init__(
+        self,
+        db: AsyncSession,
+        time_budget_ms: Optional[int] = None,
+        sample_rows: int = settings.KEYWORD_PREVIEW_SAMPLE_ROWS,
+        exact_limit: int = settings.KEYWORD_PREVIEW_EXACT_LIMIT,
+    ) -> None:
+        self.db = db
+        self.time_budget_ms = time_budget_ms or settings.KEYWORD_PREVIEW_TIME_BUDGET_MS
+        self.sample_rows = sample_rows
+        self.exact_limit = exact_limit
+        self.sample_percent = 100.0
+        self._started = time.monotonic()
+        self._deadline = self._started + self.time_budget_ms / 1000
+
+    # ---- 执行 ----
+
+    async def _execute(self, statement):
+        """以剩余时间预算为 statement_timeout 执行语句"""
+        remaining_ms = int((self._deadline - time.monotonic()) * 1000)
+        if remaining_ms <= 0:
+            raise PreviewBudgetExceeded()
+        await self.db.execute(select(func.set_config("statement_timeout", str(remaining_ms), True)))
+        try:
+            return await self.db.execute(statement)
+        except DBAPIError as e:
+            if getattr(e.orig, "sqlstate", None) == QUERY_CANCELED:
+                raise PreviewBudgetExceeded() from e
+            raise
+
+    async def _estimate_rows(self) -> float:
+        row = (await self._execute(
+            text(
+                "SELECT reltuples, pg_relation_size(oid) FROM pg_class "
+                "WHERE oid = CAST(:table AS regclass)"
+            ).bindparams(table=XhsNote.__tablename__)
+        )).one()
+        reltuples, size = row
+        return reltuples if reltuples > 0 else size / ROW_BYTES_ESTIMATE
+
+    def _table(self, sampled: bool):
+        table = XhsNote.__table__
+        if not sampled or self.sample_percent >= 100:
+            return table
+        return tablesample(table, func.system(self.sample_percent), name="sampled", seed=literal_column("0"))
+
+    @staticmethod
+    def _live(table) -> Any:
+        return table.c.is_deleted == false()
+
+    def _scale(self, count: int) -> int:
+        return round(count * 100 / self.sample_percent)
+
+    # ---- 统计 ----
+
+    async def _sample_counts(self, conditions: List[Condition]) -> List[Measurement]:
+        """一次抽样扫描统计所有条件的 (命中数, 其中非重要笔记数)"""
+        table = self._table(sampled=True)
+        not_important = table.c.is_important.is_not(true())
+        columns = []
+        for condition in conditions:
+            matched = condition(table)
+            columns.append(func.count().filter(matched))
+            columns.append(func.count().filter(and_(matched, not_important)))
+        row = (await self._execute(select(*columns).select_from(table).where(self._live(table)))).one()
+        estimated = self.sample_percent < 100
+        return [
+            Measurement(self._scale(row[i]), self._scale(row[i + 1]), estimated)
+            for i in range(0, len(row), 2)
+        ]
+
+    async def _refine(self, condition: Condition, sampled: Measurement, indexable: bool) -> Measurement:
+        """样本估算足够小且可走索引时改为精确统计"""
+        if not sampled.estimated or not indexable or sampled.matches > self.exact_limit:
+            return sampled
+        table = self._table(sampled=False)
+        matched = condition(table)
+        row = (await self._execute(
+            select(func.count(), func.count().filter(table.c.is_important.is_not(true())))
+            .where(self._live(table), matched)
+        )).one()
+        return Measurement(row[0], row[1], estimated=False)
+
+    async def _samples(self, condition: Condition, estimated: bool, limit: int) -> List[Dict[str, Any]]:
+        if limit <= 0:
+            return []
+        table = self._table(sampled=estimated)
+        result = await self._execute(
+            select(*[table.c[name] for name in SAMPLE_COLUMNS])
+            .where(self._live(table), condition(table))
+            .order_by(desc(table.c.last_crawl_time))
+            .limit(limit)
+        )
+        return [dict(row._mapping) for row in result.all()]
+
+    # ---- 入口 ----
+
+    async def run(
+        self,
+        keywords: Sequence[str],
+        mode: KeywordPreviewMode = KeywordPreviewMode.ADD,
+        sample_size: int = 5,
+    ) -> Dict[str, Any]:
+        terms = normalize_keywords(keywords)
+        conditions = [keyword_condition(term) for term in terms]
+
+        def any_match(table):
+            return or_(*[condition(table) for condition in conditions]) if conditions else false()
+
+        def no_longer_important(table):
+            return and_(table.c.is_important == true(), not_(any_match(table)), not_(engagement_condition(table)))
+
+        response: Dict[str, Any] = {
+            "mode": mode,
+            "keywords": [],
+            "total_matches": None,
+            "newly_important": None,
+            "no_longer_important": 0 if mode == KeywordPreviewMode.ADD else None,
+            "estimated": False,
+        }
+        timed_out = False
+        try:
+            rows = await self._estimate_rows()
+            self.sample_percent = min(100.0, 100.0 * self.sample_rows / rows) if rows > 0 else 100.0
+
+            aggregate_conditions = [*conditions, any_match]
+            if mode == KeywordPreviewMode.REPLACE:
+                aggregate_conditions.append(no_longer_important)
+            sampled = await self._sample_counts(aggregate_conditions)
+
+            for term, condition, estimate in zip(terms, conditions, sampled):
+                measured = await self._refine(condition, estimate, len(term) >= TRIGRAM_MIN_LENGTH)
+                response["keywords"].append({
+                    "keyword": term,
+                    "match_count": measured.matches,
+                    "newly_important": measured.not_important,
+                    "estimated": measured.estimated,
+                    "samples": await self._samples(condition, measured.estimated, sample_size),
+                })
+                response["estimated"] |= measured.estimated
+
+            if len(terms) == 1:
+                total = Measurement(
+                    response["keywords"][0]["match_count"],
+                    response["keywords"][0]["newly_important"],
+                    response["keywords"][0]["estimated"],
+                )
+            else:
+                indexable = all(len(term) >= TRIGRAM_MIN_LENGTH for term in terms)
+                total = await self._refine(any_match, sampled[len(terms)], indexable)
+            response["total_matches"] = total.matches
+            response["newly_important"] = total.not_important
+            response["estimated"] |= total.estimated
+
+            if mode == KeywordPreviewMode.REPLACE:
+                # 只扫描当前重要的笔记（idx_note_live_important）
+                lost = await self._refine(no_longer_important, sampled[-1], indexable=True)
+                response["no_longer_important"] = lost.matches
+                response["estimated"] |= lost.estimated
+        except PreviewBudgetExceeded:
+            timed_out = True
+            # 超时后事务已中止
+            await self.db.rollback()
+            logger.warning(f"关键词预览超出时间预算 {self.time_budget_ms}ms，返回部分结果")
+
+        response.update(
+            sample_percent=round(self.sample_percent, 4),
+            timed_out=timed_out,
+            elapsed_ms=round((time.monotonic() - self._started) * 1000, 2),
+        )
+        return response
@@ -0,0 +1,208 @@
+"""
+业务关键词内存注册表
+关键词表很小而读取频繁（关键词列表、分类、统计，以及每条入库笔记的重要性判断），
+因此整表加载到内存，由列表、计数、分类和搜索直接在内存中完成。
+
+- 首次使用时加载，超过 KEYWORD_REGISTRY_MAX_AGE_SECONDS 后下次使用时重新加载（兜底直接改库的情况）
+- 本进程的写接口提交后调用 upsert()/remove()，并经 pubsub 通知其他 worker 应用同一变更
+- 批量变更调用 publish_reload()，各 worker 下次使用时重新加载
+"""
+
+import asyncio
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.logger import app_logger as logger
+from app.core.pubsub import pubsub
+from app.models.keyword import BusinessKeyword
+
+KEYWORDS_CHANNEL = "keywords"
+
+
+@dataclass(frozen=True)
+class KeywordEntry:
+    """关键词快照，字段与 KeywordResponse 一致"""
+    id: uuid.UUID
+    keyword: str
+    category: Optional[str]
+    weight: int
+    is_active: bool
+    description: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+
+    @classmethod
+    def from_model(cls, keyword: BusinessKeyword) -> "KeywordEntry":
+        return cls(
+            id=keyword.id,
+            keyword=keyword.keyword,
+            category=keyword.category,
+            weight=keyword.weight,
+            is_active=keyword.is_active,
+            description=keyword.description,
+            created_at=keyword.created_at,
+            updated_at=keyword.updated_at,
+        )
+
+    @classmethod
+    def from_message(cls, data: Dict[str, Any]) -> "KeywordEntry":
+        return cls(**{
+            **data,
+            "id": uuid.UUID(data["id"]),
+            "created_at": datetime.fromisoformat(data["created_at"]),
+            "updated_at": datetime.fromisoformat(data["updated_at"]),
+        })
+
+    def to_message(self) -> Dict[str, Any]:
+        return {
+            **asdict(self),
+            "id": str(self.id),
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat(),
+        }
+
+    def sort_key(self) -> Tuple:
+        # 与原 SQL 排序一致：权重降序，分类（NULL 在后），关键词
+        return (-self.weight, self.category is None, self.category or "", self.keyword)
+
+
+class KeywordRegistry:
+    def __init__(self, max_age_seconds: float) -> None:
+        self.max_age_seconds = max_age_seconds
+        self._entries: Dict[uuid.UUID, KeywordEntry] = {}
+        self._ordered: List[KeywordEntry] = []
+        self._active_terms: Tuple[str, ...] = ()
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        # 加载期间收到的变更，加载完成后重放，避免被旧快照覆盖
+        self._backlog: Optional[List[Dict[str, Any]]] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.max_age_seconds
+
+    async def ensure_loaded(self, db: AsyncSession) -> None:
+        """
+        未加载或已超过最大缓存时间时从 db 重新加载
+
+        db 必须是主库会话：从延迟的只读副本加载会把旧关键词缓存到下次过期，入库判断也会使用这份数据。
+        """
+        if self.loaded:
+            return
+        async with self._lock:
+            if not self.loaded:
+                await self.reload(db)
+
+    async def reload(self, db: AsyncSession) -> None:
+        self._backlog = []
+        try:
+            result = await db.execute(select(BusinessKeyword))
+            self._entries = {keyword.id: KeywordEntry.from_model(keyword) for keyword in result.scalars().all()}
+            for message in self._backlog:
+                self._apply(message)
+            self._rebuild()
+            self._loaded_at = time.monotonic()
+            logger.info(f"关键词注册表已加载: {len(self._entries)} 个")
+        finally:
+            self._backlog = None
+
+    def invalidate(self) -> None:
+        """下次使用时重新加载"""
+        self._loaded_at = None
+
+    # ---- 变更 ----
+
+    async def upsert(self, keyword: BusinessKeyword) -> None:
+        """写接口提交后调用（需在对象过期前），本进程立即生效并通知其他 worker"""
+        await self._publish({"op": "upsert", "keyword": KeywordEntry.from_model(keyword).to_message()})
+
+    async def remove(self, keyword_id: uuid.UUID) -> None:
+        await self._publish({"op": "remove", "id": str(keyword_id)})
+
+    async def publish_reload(self) -> None:
+        """批量变更后让所有 worker 重新加载"""
+        await self._publish({"op": "reload"})
+
+    async def _publish(self, message: Dict[str, Any]) -> None:
+        # 先在本进程应用，保证写后立即可读；postgres 后端会把消息再送回本进程，重复应用无副作用
+        self.receive(message)
+        if pubsub.distributed:
+            await pubsub.publish(KEYWORDS_CHANNEL, message)
+
+    def receive(self, message: Dict[str, Any]) -> None:
+        if message["op"] == "reload":
+            self.invalidate()
+            return
+        if self._backlog is not None:
+            self._backlog.append(message)
+        if self._loaded_at is None:
+            return
+        self._apply(message)
+        self._rebuild()
+
+    def _apply(self, message: Dict[str, Any]) -> None:
+        if message["op"] == "upsert":
+            entry = KeywordEntry.from_message(message["keyword"])
+            self._entries[entry.id] = entry
+        elif message["op"] == "remove":
+            self._entries.pop(uuid.UUID(message["id"]), None)
+
+    def _rebuild(self) -> None:
+        self._ordered = sorted(self._entries.values(), key=KeywordEntry.sort_key)
+        self._active_terms = tuple(entry.keyword.lower() for entry in self._ordered if entry.is_active)
+
+    # ---- 查询 ----
+
+    @property
+    def active_terms(self) -> Tuple[str, ...]:
+        """启用关键词的小写形式，用于入库时的重要性判断"""
+        return self._active_terms
+
+    def search(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        category: Optional[str] = None,
+        active_only: bool = True,
+        search: Optional[str] = None,
+    ) -> Tuple[List[KeywordEntry], int]:
+        """返回 (当前页, 总数)，排序与分页语义同原 SQL 查询"""
+        needle = search.lower() if search else None
+        matched = [
+            entry for entry in self._ordered
+            if (not active_only or entry.is_active)
+            and (not category or entry.category == category)
+            and (needle is None or needle in entry.keyword.lower())
+        ]
+        return matched[skip:skip + limit], len(matched)
+
+    def categories(self) -> List[str]:
+        return sorted({entry.category for entry in self._ordered if entry.category})
+
+    def stats(self) -> Dict[str, Any]:
+        total = len(self._ordered)
+        active = sum(1 for entry in self._ordered if entry.is_active)
+        category_stats: Dict[str, int] = {}
+        weight_counts: Dict[int, int] = {}
+        for entry in self._ordered:
+            if entry.category:
+                category_stats[entry.category] = category_stats.get(entry.category, 0) + 1
+            weight_counts[entry.weight] = weight_counts.get(entry.weight, 0) + 1
+        return {
+            "total": total,
+            "active": active,
+            "inactive": total - active,
+            "category_stats": dict(sorted(category_stats.items())),
+            "weight_stats": {f"权重{weight}": weight_counts[weight] for weight in range(1, 11) if weight in weight_counts},
+        }
+
+
+keyword_registry = KeywordRegistry(settings.KEYWORD_REGISTRY_MAX_AGE_SECONDS)
+pubsub.subscribe(KEYWORDS_CHANNEL, keyword_registry.receive)
@@ -0,0 +1,220 @@
+"""
+笔记归档服务
+把软删除和长期未再爬取的笔记从热表 xhs_notes 批量移入 xhs_notes_archive，
+归档笔记再次被爬到或手动恢复时移回热表。
+"""
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import DateTime, Integer, bindparam, desc, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.cache import data_version
+from app.core.logger import app_logger as logger
+from app.models.note import XhsNote, XhsNoteArchive
+
+ARCHIVE_REASON_DELETED = "deleted"
+ARCHIVE_REASON_COLD = "cold"
+
+# 批量查询归档笔记时每条语句的 note_id 数
+ARCHIVED_LOOKUP_CHUNK_SIZE = 1000
+
+# 单条语句完成“选取-删除-写入归档”：
+# - FOR UPDATE SKIP LOCKED 使多个进程同时执行时互不阻塞、不会重复搬运
+# - 仍有评论或标签日志引用的笔记（外键依赖）留在热表
+# - to_jsonb(m) 保存完整行，恢复时按列还原
+# - 两个条件分别对应部分索引 idx_note_deleted_crawl_time 和 idx_note_live_crawl_time（BitmapOr 合并），
+#   冷数据条件需显式带 is_deleted = false，否则无法使用部分索引而退化为全表扫描
+ARCHIVE_BATCH_SQL = text("""
+WITH candidates AS (
+    SELECT n.id
+    FROM xhs_notes n
+    WHERE (n.is_deleted = true OR (n.is_deleted = false AND n.last_crawl_time < :cold_before))
+      AND NOT EXISTS (SELECT 1 FROM xhs_comments c WHERE c.note_id = n.note_id)
+      AND NOT EXISTS (SELECT 1 FROM note_tag_logs l WHERE l.note_id = n.note_id)
+    ORDER BY n.last_crawl_time
+    LIMIT :batch_size
+    FOR UPDATE SKIP LOCKED
+), moved AS (
+    DELETE FROM xhs_notes n
+    USING candidates
+    WHERE n.id = candidates.id
+    RETURNING n.*
+)
+INSERT INTO xhs_notes_archive
+    (note_id, payload, reason, is_deleted, title, author_user_id, last_crawl_time, archived_at)
+SELECT
+    m.note_id,
+    to_jsonb(m),
+    CASE WHEN m.is_deleted THEN 'deleted' ELSE 'cold' END,
+    COALESCE(m.is_deleted, false),
+    m.title,
+    m.author_user_id,
+    m.last_crawl_time,
+    timezone('utc', now())
+FROM moved m
+ON CONFLICT (note_id) DO UPDATE SET
+    payload = EXCLUDED.payload,
+    reason = EXCLUDED.reason,
+    is_deleted = EXCLUDED.is_deleted,
+    title = EXCLUDED.title,
+    author_user_id = EXCLUDED.author_user_id,
+    last_crawl_time = EXCLUDED.last_crawl_time,
+    archived_at = EXCLUDED.archived_at
+RETURNING reason
+""").bindparams(
+    bindparam("cold_before", type_=DateTime),
+    bindparam("batch_size", type_=Integer),
+)
+
+
+def cold_cutoff(cold_days: Optional[int]) -> Optional[datetime]:
+    """超过 cold_days 天未再爬取的笔记视为冷数据；None 或 0 表示只归档软删除的笔记"""
+    if not cold_days:
+        return None
+    return datetime.utcnow() - timedelta(days=cold_days)
+
+
+async def count_archive_candidates(db: AsyncSession, cold_before: Optional[datetime]) -> Dict[str, int]:
+    """统计待归档的笔记数（不考虑外键依赖），用于 dry run"""
+    deleted = await db.execute(select(func.count(XhsNote.id)).filter(XhsNote.is_deleted == True))
+    cold = 0
+    if cold_before is not None:
+        cold_result = await db.execute(
+            select(func.count(XhsNote.id)).filter(
+                XhsNote.is_deleted == False, XhsNote.last_crawl_time < cold_before
+            )
+        )
+        cold = cold_result.scalar() or 0
+    return {ARCHIVE_REASON_DELETED: deleted.scalar() or 0, ARCHIVE_REASON_COLD: cold}
+
+
+async def archive_notes(
+    db: AsyncSession,
+    cold_before: Optional[datetime],
+    batch_size: int = 1000,
+    max_batches: Optional[int] = None,
+) -> Dict[str, int]:
+    """
+    分批归档，每批单独提交，避免长事务和大量行锁
+
+    返回按原因统计的归档数。
+    """
+    moved = {ARCHIVE_REASON_DELETED: 0, ARCHIVE_REASON_COLD: 0}
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        result = await db.execute(ARCHIVE_BATCH_SQL, {"cold_before": cold_before, "batch_size": batch_size})
+        reasons = result.scalars().all()
+        await db.commit()
+        batches += 1
+
+        for reason in reasons:
+            moved[reason] += 1
+        if len(reasons) < batch_size:
+            break
+
+    if any(moved.values()):
+        data_version.bump("notes")
+    logger.info(
+        "笔记归档完成: 软删除%d个，冷数据%d个",
+        moved[ARCHIVE_REASON_DELETED], moved[ARCHIVE_REASON_COLD],
+        batches=batches,
+    )
+    return moved
+
+
+def note_from_payload(payload: Dict[str, Any]) -> XhsNote:
+    """由归档的 JSON 行还原 XhsNote 对象"""
+    values = {}
+    for column in XhsNote.__table__.columns:
+        if column.name not in payload:
+            continue
+        value = payload[column.name]
+        if value is not None:
+            if isinstance(column.type, DateTime):
+                value = datetime.fromisoformat(value)
+            elif column.name == "id":
+                value = uuid.UUID(value)
+        values[column.key] = value
+    return XhsNote(**values)
+
+
+async def archived_note_ids(db: AsyncSession, note_ids: Iterable[str]) -> Set[str]:
+    """返回其中已归档的 note_id，入库批次用它代替逐条查询归档表"""
+    pending = list(dict.fromkeys(note_ids))
+    archived: Set[str] = set()
+    for start in range(0, len(pending), ARCHIVED_LOOKUP_CHUNK_SIZE):
+        chunk = pending[start:start + ARCHIVED_LOOKUP_CHUNK_SIZE]
+        result = await db.execute(select(XhsNoteArchive.note_id).where(XhsNoteArchive.note_id.in_(chunk)))
+        archived.update(result.scalars().all())
+    return archived
+
+
+async def restore_archived_note(db: AsyncSession, note_id: str) -> Optional[XhsNote]:
+    """
+    把归档的笔记移回热表（不提交），不存在时返回 None
+
+    软删除状态随行一起还原，已删除的笔记恢复后仍不出现在默认列表中。
+    """
+    archived = await db.get(XhsNoteArchive, note_id)
+    if archived is None:
+        return None
+    note = note_from_payload(archived.payload)
+    await db.delete(archived)
+    db.add(note)
+    await db.flush()
+    return note
+
+
+def _archive_filters(query, keyword: Optional[str], author_user_id: Optional[str], include_deleted: bool):
+    if not include_deleted:
+        query = query.filter(XhsNoteArchive.is_deleted == False)
+    if keyword:
+        query = query.filter(XhsNoteArchive.title.ilike(f"%{keyword}%"))
+    if author_user_id:
+        query = query.filter(XhsNoteArchive.author_user_id == author_user_id)
+    return query
+
+
+async def search_archived_notes(
+    db: AsyncSession,
+    keyword: Optional[str] = None,
+    author_user_id: Optional[str] = None,
+    include_deleted: bool = False,
+    limit: int = 50,
+    offset: int = 0,
+) -> Tuple[List[Any], int]:
+    """查询归档笔记，返回 ((payload, reason, archived_at) 行列表, 总数)"""
+    count_query = _archive_filters(
+        select(func.count()).select_from(XhsNoteArchive), keyword, author_user_id, include_deleted
+    )
+    total = (await db.execute(count_query)).scalar() or 0
+
+    query = _archive_filters(
+        select(XhsNoteArchive.payload, XhsNoteArchive.reason, XhsNoteArchive.archived_at),
+        keyword, author_user_id, include_deleted,
+    )
+    query = query.order_by(desc(XhsNoteArchive.last_crawl_time)).offset(offset).limit(limit)
+    rows = (await db.execute(query)).all()
+    return rows, total
+
+
+async def archive_periodically(interval_hours: float) -> None:
+    """按 ARCHIVE_INTERVAL_HOURS 定期归档的后台任务"""
+    from app.database import async_session_maker
+
+    while True:
+        await asyncio.sleep(interval_hours * 3600)
+        try:
+            async with async_session_maker() as db:
+                await archive_notes(
+                    db,
+                    cold_cutoff(settings.ARCHIVE_COLD_DAYS),
+                    batch_size=settings.ARCHIVE_BATCH_SIZE,
+                )
+        except Exception as e:
+            logger.error(f"定期归档失败: {str(e)}")
@@ -0,0 +1,166 @@
+"""
+笔记导出服务
+把服务端游标产出的笔记行编码为 CSV / NDJSON / Parquet 字节流
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Sequence
+
+import orjson
+
+from app.models.note import XhsNote
+from app.schemas.notes import NoteExportFormat
+
+# 导出的列，按顺序输出；JSON 列在 CSV/Parquet 中序列化为字符串
+EXPORT_COLUMNS = [
+    XhsNote.note_id,
+    XhsNote.note_url,
+    XhsNote.note_type,
+    XhsNote.author_user_id,
+    XhsNote.author_nickname,
+    XhsNote.title,
+    XhsNote.desc,
+    XhsNote.tags,
+    XhsNote.upload_time,
+    XhsNote.ip_location,
+    XhsNote.liked_count,
+    XhsNote.collected_count,
+    XhsNote.comment_count,
+    XhsNote.share_count,
+    XhsNote.current_tags,
+    XhsNote.is_new,
+    XhsNote.is_changed,
+    XhsNote.is_important,
+    XhsNote.first_crawl_time,
+    XhsNote.last_crawl_time,
+    XhsNote.crawl_count,
+]
+
+EXPORT_FIELD_NAMES = [column.key for column in EXPORT_COLUMNS]
+
+JSON_FIELDS = {"tags", "current_tags"}
+
+MEDIA_TYPES: Dict[NoteExportFormat, str] = {
+    NoteExportFormat.CSV: "text/csv; charset=utf-8",
+    NoteExportFormat.NDJSON: "application/x-ndjson",
+    NoteExportFormat.PARQUET: "application/vnd.apache.parquet",
+}
+
+
+def _to_text(field: str, value: Any) -> Any:
+    """把单元格转换为 CSV/Parquet 可写的标量"""
+    if value is None:
+        return None
+    if field in JSON_FIELDS:
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def encode_csv(partitions: AsyncIterator[Sequence[Any]]) -> AsyncIterator[bytes]:
+    """CSV 编码，带 BOM 以便 Excel 正确识别中文"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELD_NAMES)
+    yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+
+    async for rows in partitions:
+        buffer.seek(0)
+        buffer.truncate()
+        for row in rows:
+            writer.writerow([
+                "" if value is None else _to_text(field, value)
+                for field, value in zip(EXPORT_FIELD_NAMES, row)
+            ])
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def encode_ndjson(partitions: AsyncIterator[Sequence[Any]]) -> AsyncIterator[bytes]:
+    """每行一个 JSON 对象"""
+    async for rows in partitions:
+        yield b"".join(
+            orjson.dumps(dict(zip(EXPORT_FIELD_NAMES, row)), option=orjson.OPT_APPEND_NEWLINE)
+            for row in rows
+        )
+
+
+class _DrainableSink(io.RawIOBase):
+    """ParquetWriter 的写入目标，每写完一个 row group 就把已写字节取走"""
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+async def encode_parquet(partitions: AsyncIterator[Sequence[Any]]) -> AsyncIterator[bytes]:
+    """每个分批写成一个 row group，内存只保留当前分批"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {
+        "upload_time": pa.timestamp("us"),
+        "first_crawl_time": pa.timestamp("us"),
+        "last_crawl_time": pa.timestamp("us"),
+        "liked_count": pa.int64(),
+        "collected_count": pa.int64(),
+        "comment_count": pa.int64(),
+        "share_count": pa.int64(),
+        "crawl_count": pa.int64(),
+        "is_new": pa.bool_(),
+        "is_changed": pa.bool_(),
+        "is_important": pa.bool_(),
+    }
+    schema = pa.schema([(field, types.get(field, pa.string())) for field in EXPORT_FIELD_NAMES])
+
+    sink = _DrainableSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        async for rows in partitions:
+            columns: Dict[str, List[Any]] = {field: [] for field in EXPORT_FIELD_NAMES}
+            for row in rows:
+                for field, value in zip(EXPORT_FIELD_NAMES, row):
+                    columns[field].append(value if field in types else _to_text(field, value))
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+ENCODERS = {
+    NoteExportFormat.CSV: encode_csv,
+    NoteExportFormat.NDJSON: encode_ndjson,
+    NoteExportFormat.PARQUET: encode_parquet,
+}
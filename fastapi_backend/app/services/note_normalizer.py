@@ -0,0 +1,273 @@
+"""
+原始笔记归一化
+爬虫回调中的笔记有两种形态（见 note_data_analysis.md）：
+- 搜索结果原始格式：{"id", "xsec_token", "note_card": {"display_title", "user", "interact_info", "cover", "image_list", ...}}，
+  互动数据为字符串（"99871"、"1.2万"），图片为带 info_list 的对象
+- 部分扁平化格式：{"note_id", "title", "author", "interact_info", "image_list": [URL, ...], ...}
+
+NOTE_SOURCES 按 XhsNoteData 的字段声明每列的来源路径（依次取第一个不为 None 的值）和转换函数，
+compile_normalizer 据此生成一个函数，单次遍历把一条原始笔记直接转换为入库用的 NoteRow 元组，
+不再先构造中间 dict、再逐条构造 Pydantic 模型。
+"""
+
+from __future__ import annotations
+
+import re
+from collections import namedtuple
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.schemas.notes import XhsNoteData
+
+NOTE_URL_PREFIX = "https://www.xiaohongshu.com/explore/"
+
+# 计数单位后缀
+COUNT_UNITS = {"万": 10_000, "w": 10_000, "W": 10_000, "亿": 100_000_000, "k": 1_000, "K": 1_000}
+
+# 大于该值的数字时间戳按毫秒处理
+EPOCH_MILLIS_THRESHOLD = 100_000_000_000
+
+_COUNT_PATTERN = re.compile(r"^\s*([0-9][0-9,]*(?:\.[0-9]+)?)\s*([万wW亿kK]?)\s*\+?\s*$")
+_EMPTY: Dict[str, Any] = {}
+
+# 列顺序与 XhsNoteData 字段一致，服务层按属性名读取，NoteRow 可直接代替 XhsNoteData 入库
+NOTE_COLUMNS: Tuple[str, ...] = tuple(XhsNoteData.model_fields)
+NoteRow = namedtuple(
+    "NoteRow",
+    NOTE_COLUMNS,
+    defaults=[XhsNoteData.model_fields[name].default for name in NOTE_COLUMNS[1:]],
+)
+
+
+class NoteNormalizeError(ValueError):
+    """原始笔记无法转换为入库数据"""
+
+
+def parse_count(value: Any) -> int:
+    """
+    解析互动计数：整数、"99871"、"1,234"、"1.2万"、"3亿"、"10w+"
+
+    空值和无法识别的内容（如 "赞"）按 0 处理。
+    """
+    kind = type(value)
+    if kind is int:
+        return value
+    if kind is str and value.isdigit():
+        return int(value)
+    if value is None or kind is bool:
+        return 0
+    if kind is float:
+        return int(value)
+    match = _COUNT_PATTERN.match(str(value))
+    if match is None:
+        return 0
+    number, unit = match.groups()
+    number = number.replace(",", "")
+    if not unit:
+        return int(number) if "." not in number else int(float(number))
+    return int(round(float(number) * COUNT_UNITS[unit]))
+
+
+def parse_time(value: Any) -> Optional[datetime]:
+    """ISO 字符串或秒/毫秒时间戳，统一为 UTC 的 naive datetime（与 upload_time 列一致）"""
+    if value is None or value == "" or isinstance(value, datetime):
+        return value or None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        seconds = value / 1000 if value > EPOCH_MILLIS_THRESHOLD else value
+        return datetime.fromtimestamp(seconds, tz=timezone.utc).replace(tzinfo=None)
+    try:
+        parsed = datetime.fromisoformat(str(value))
+    except ValueError:
+        raise NoteNormalizeError(f"无法解析时间: {value}")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def tag_names(value: Any) -> Optional[List[str]]:
+    """标签列表：字符串或 {"name": ...} 对象；其他内容原样保留，由校验报错"""
+    if not isinstance(value, list):
+        return value or None
+    if all(type(tag) is str for tag in value):
+        return list(value)
+    return [tag.get("name") if isinstance(tag, dict) else tag for tag in value if tag]
+
+
+def image_urls(value: Any) -> Optional[List[str]]:
+    """图片列表：URL 字符串，或取 WB_DFT 场景（没有时取第一个）URL 的图片对象；其他内容原样保留"""
+    if not isinstance(value, list):
+        return value or None
+    if all(type(image) is str for image in value):
+        return list(value)
+    urls = []
+    for image in value:
+        if not isinstance(image, dict):
+            urls.append(image)
+            continue
+        url = image.get("url_default")
+        if url is None:
+            infos = [info for info in image.get("info_list") or () if isinstance(info, dict)]
+            for info in infos:
+                if info.get("image_scene") == "WB_DFT":
+                    url = info.get("url")
+                    break
+            else:
+                if infos:
+                    url = infos[0].get("url")
+        url = url or image.get("url")
+        if url:
+            urls.append(url)
+    return urls
+
+
+def note_id_value(value: Any) -> str:
+    """与 XhsNoteData.validate_note_id 相同的规则"""
+    if not isinstance(value, str) or len(value) < 10:
+        raise NoteNormalizeError("note_id 无效")
+    return value
+
+
+def note_url_for(note_id: str) -> str:
+    return NOTE_URL_PREFIX + note_id
+
+
+@dataclass(frozen=True)
+class Source:
+    """列来源：按顺序尝试的 "上下文.键" 路径，取到的值经 convert 转换"""
+    paths: Tuple[str, ...]
+    convert: Optional[Callable[[Any], Any]] = None
+    # 所有路径都为空时由另一列推导
+    derive: Optional[Tuple[str, Callable[[Any], Any]]] = None
+
+
+# 上下文：依次取第一个 dict；card 为 note_card，扁平格式下即笔记本身
+NOTE_CONTEXTS: Dict[str, Tuple[str, ...]] = {
+    "card": ("item.note_card", "item"),
+    "user": ("card.user", "card.author"),
+    "interact": ("card.interact_info", "card"),
+    "cover": ("card.cover",),
+}
+
+NOTE_SOURCES: Dict[str, Source] = {
+    "note_id": Source(("card.note_id", "card.id", "item.id"), note_id_value),
+    "note_url": Source(("card.note_url", "item.note_url"), derive=("note_id", note_url_for)),
+    "note_type": Source(("card.note_type", "card.type")),
+    "author_user_id": Source(("user.user_id",)),
+    "author_nickname": Source(("user.nickname", "user.nick_name")),
+    "author_avatar": Source(("user.avatar",)),
+    "title": Source(("card.title", "card.display_title")),
+    "desc": Source(("card.desc",)),
+    "tags": Source(("card.tags", "card.tag_list"), tag_names),
+    "upload_time": Source(("card.upload_time", "card.time"), parse_time),
+    "ip_location": Source(("card.ip_location",)),
+    "liked_count": Source(("interact.liked_count",), parse_count),
+    "collected_count": Source(("interact.collected_count",), parse_count),
+    "comment_count": Source(("interact.comment_count",), parse_count),
+    "share_count": Source(("interact.share_count", "interact.shared_count"), parse_count),
+    "video_cover": Source(("card.video_cover", "cover.url_default", "cover.url_pre", "cover.url")),
+    "video_addr": Source(("card.video_addr",)),
+    "image_list": Source(("card.image_list",), image_urls),
+    "xsec_token": Source(("item.xsec_token", "card.xsec_token")),
+}
+
+
+def _first_value(target: str, paths: Iterable[str], dict_only: bool = False) -> List[str]:
+    lines = []
+    for i, path in enumerate(paths):
+        context, _, key = path.partition(".")
+        expression = context if not key else f"{context}.get({key!r})"
+        check = f"not isinstance({target}, dict)" if dict_only else f"{target} is None"
+        if i == 0:
+            lines.append(f"    {target} = {expression}")
+        else:
+            lines.append(f"    if {check}:")
+            lines.append(f"        {target} = {expression}")
+    if dict_only:
+        lines.append(f"    if not isinstance({target}, dict):")
+        lines.append(f"        {target} = _EMPTY")
+    return lines
+
+
+def compile_normalizer(
+    sources: Dict[str, Source] = NOTE_SOURCES,
+    contexts: Dict[str, Tuple[str, ...]] = NOTE_CONTEXTS,
+    row_type: Callable[..., Sequence[Any]] = NoteRow,
+) -> Callable[[Dict[str, Any]], Sequence[Any]]:
+    """
+    按来源声明生成 normalize(item) -> row
+
+    生成的函数只包含字典取值、None 判断和转换函数调用，没有逐列的循环和反射；
+    转换函数抛出的异常原样传出。
+    """
+    fields = getattr(row_type, "_fields", None)
+    if fields is not None and tuple(sources) != tuple(fields):
+        raise ValueError(f"来源声明的列与 {row_type.__name__} 字段不一致")
+
+    namespace: Dict[str, Any] = {"_EMPTY": _EMPTY, "_row": row_type}
+    lines = ["def normalize(item):"]
+    for name, paths in contexts.items():
+        lines += _first_value(name, paths, dict_only=True)
+
+    columns = list(sources)
+    for index, column in enumerate(columns):
+        source = sources[column]
+        target = f"c{index}"
+        lines += _first_value(target, source.paths)
+        if source.convert is not None:
+            namespace[f"_convert{index}"] = source.convert
+            lines.append(f"    {target} = _convert{index}({target})")
+        if source.derive is not None:
+            base, derive = source.derive
+            namespace[f"_derive{index}"] = derive
+            lines.append(f"    if {target} is None:")
+            lines.append(f"        {target} = _derive{index}(c{columns.index(base)})")
+    lines.append(f"    return _row({', '.join(f'c{index}' for index in range(len(columns)))})")
+
+    exec(compile("\n".join(lines), "<note_normalizer>", "exec"), namespace)
+    return namespace["normalize"]
+
+
+normalize_note = compile_normalizer()
+
+
+def is_note_item(item: Any) -> bool:
+    """回调数据中可识别为笔记的条目"""
+    return isinstance(item, dict) and ("note_id" in item or "note_card" in item)
+
+
+@dataclass
+class InvalidNote:
+    """无法入库的笔记，index 为其在回调列表中的下标"""
+    index: int
+    message: str
+
+    def __str__(self) -> str:
+        return f"第 {self.index + 1} 条笔记无效: {self.message}"
+
+
+@dataclass
+class NoteBatch:
+    """待入库的笔记（NoteRow 或校验后的 XhsNoteData）及其在回调列表中的下标"""
+    notes: List[Any] = field(default_factory=list)
+    indexes: List[int] = field(default_factory=list)
+    invalid: List[InvalidNote] = field(default_factory=list)
+
+    @property
+    def errors(self) -> List[str]:
+        return [str(note) for note in self.invalid]
+
+
+def normalize_notes(items: Iterable[Any]) -> NoteBatch:
+    """转换回调中的笔记列表，跳过无法识别为笔记的条目，无效条目连同下标收集到 invalid"""
+    batch = NoteBatch()
+    for index, item in enumerate(items):
+        if not is_note_item(item):
+            continue
+        try:
+            batch.notes.append(normalize_note(item))
+        except NoteNormalizeError as e:
+            batch.invalid.append(InvalidNote(index, str(e)))
+        else:
+            batch.indexes.append(index)
+    return batch
@@ -0,0 +1,103 @@
+"""
+笔记批量校验
+回调中的笔记经 note_normalizer 转换为 NoteRow 后整批校验，不再逐条 XhsNoteData(**item)：
+
+- 按 XhsNoteData 字段注解生成的检查函数先判断每行的值是否已是目标类型（note_id 规则已在转换时检查），
+  绝大多数行在这一步通过，直接作为 NoteRow 入库
+- 其余行整批交给 TypeAdapter(List[XhsNoteData])，按属性读取（from_attributes），由 Pydantic 转换或报错
+- 无效条目连同下标收集到 NoteBatch.invalid，不抛出异常，其余条目照常入库
+- trusted=True 时跳过校验，用于签名校验通过的可信来源（WEBHOOK_TRUST_SIGNED_PAYLOADS）
+"""
+
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Type, Union, get_args, get_origin
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from app.schemas.notes import XhsNoteData
+from app.services.note_normalizer import InvalidNote, NoteBatch, normalize_notes
+
+_notes_adapter = TypeAdapter(List[XhsNoteData])
+
+_EXACT_TYPES = {str: "str", int: "int", datetime: "datetime"}
+
+
+def _type_check(name: str, annotation: Any) -> Optional[str]:
+    """值已是注解类型时成立的表达式，无法直接判断的注解返回 None"""
+    optional = False
+    if get_origin(annotation) is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) != 1:
+            return None
+        annotation, optional = args[0], True
+
+    if annotation in _EXACT_TYPES:
+        # type() is 而非 isinstance：bool 不算 int，子类交给 Pydantic 处理
+        check = f"type({name}) is {_EXACT_TYPES[annotation]}"
+    elif get_origin(annotation) is list and get_args(annotation) == (str,):
+        check = f"(type({name}) is list and all(type(item) is str for item in {name}))"
+    else:
+        return None
+    return f"({name} is None or {check})" if optional else check
+
+
+def compile_conformance(model: Type[BaseModel]) -> Callable[[Any], bool]:
+    """
+    生成 conforms(row) -> bool：row 按模型字段顺序排列，所有值都已是字段类型时返回 True
+
+    有无法判断的字段类型时所有行都返回 False（全部交给 Pydantic）。
+    """
+    names = [f"c{index}" for index in range(len(model.model_fields))]
+    checks = [_type_check(name, field.annotation) for name, field in zip(names, model.model_fields.values())]
+    if any(check is None for check in checks):
+        return lambda row: False
+
+    source = f"def conforms(row):\n    {', '.join(names)}, = row\n    return " + " and ".join(checks)
+    namespace: Dict[str, Any] = {"datetime": datetime}
+    exec(compile(source, f"<{model.__name__} conformance>", "exec"), namespace)
+    return namespace["conforms"]
+
+
+_conforms = compile_conformance(XhsNoteData)
+
+
+def _pydantic_validate(notes: List[Any]) -> tuple[List[Any], Dict[int, str]]:
+    """整批校验，返回 (通过的笔记, {位置: 第一个错误})"""
+    try:
+        return _notes_adapter.validate_python(notes, from_attributes=True), {}
+    except ValidationError as e:
+        failed: Dict[int, str] = {}
+        for error in e.errors(include_url=False):
+            position, *location = error["loc"]
+            failed.setdefault(position, f"{'.'.join(map(str, location))} {error['msg']}".strip())
+    keep = [note for position, note in enumerate(notes) if position not in failed]
+    return _notes_adapter.validate_python(keep, from_attributes=True), failed
+
+
+def validate_notes(batch: NoteBatch) -> NoteBatch:
+    """校验转换后的笔记，类型不符的行由 Pydantic 转换，仍无效的行移入 invalid"""
+    pending = [position for position, note in enumerate(batch.notes) if not _conforms(note)]
+    if not pending:
+        return batch
+
+    validated, failed = _pydantic_validate([batch.notes[position] for position in pending])
+    replaced = dict(zip((position for i, position in enumerate(pending) if i not in failed), validated))
+    rejected = {pending[i] for i in failed}
+
+    result = NoteBatch(invalid=list(batch.invalid))
+    for position, note in enumerate(batch.notes):
+        if position in rejected:
+            continue
+        result.notes.append(replaced.get(position, note))
+        result.indexes.append(batch.indexes[position])
+    result.invalid += [InvalidNote(batch.indexes[pending[i]], message) for i, message in failed.items()]
+    result.invalid.sort(key=lambda note: note.index)
+    return result
+
+
+def prepare_notes(items: Iterable[Any], trusted: bool = False) -> NoteBatch:
+    """转换并（除可信来源外）校验回调中的笔记列表"""
+    batch = normalize_notes(items)
+    if trusted or not batch.notes:
+        return batch
+    return validate_notes(batch)
@@ -0,0 +1,197 @@
+"""
+webhook 幂等处理
+爬虫在超时后会重试回调，同一份数据可能被处理两三次（浪费入库能力并重复累加 crawl_count）。
+收到回调时先按请求体的 SHA-256 在 webhook_receipts 中抢占一条记录：
+- 抢占成功：正常处理，响应和后台入库结果写回该记录
+- 已存在：不解析、不入库，直接返回首次的响应（入库完成后含 processed_count）
+- 处理失败（异常、4xx/5xx、后台入库失败）：删除记录，允许重试重新处理
+- 处理中 worker 退出（如 max_requests 回收、超时被杀）：记录停留在未完成状态，
+  超过 WEBHOOK_RECEIPT_LEASE_SECONDS 后视为失效，由下一次重试重新抢占
+"""
+
+import hashlib
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Callable, Coroutine, Dict, Optional
+
+import orjson
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.logger import app_logger as logger
+from app.database import get_async_session
+from app.models.webhook import WebhookReceipt
+from app.schemas.notes import ProcessResult
+
+# 每次抢占时顺带清理的过期记录数上限
+PURGE_BATCH_SIZE = 100
+
+REPLAY_HEADER = "Idempotent-Replay"
+
+
+def body_digest(body: bytes) -> bytes:
+    return hashlib.sha256(body).digest()
+
+
+async def claim_receipt(
+    db: AsyncSession,
+    digest: bytes,
+    ttl_hours: float = settings.WEBHOOK_RECEIPT_TTL_HOURS,
+    lease_seconds: float = settings.WEBHOOK_RECEIPT_LEASE_SECONDS,
+) -> Optional[WebhookReceipt]:
+    """
+    抢占回调记录并提交，抢占成功返回 None，重复回调返回已有记录
+
+    已过期的记录，以及抢占后超过 lease_seconds 仍未完成的记录（处理它的 worker 已退出）
+    视为不存在并被重新抢占；并发的相同回调只有一个能抢占成功。
+    """
+    now = datetime.utcnow()
+    statement = insert(WebhookReceipt).values(
+        digest=digest, completed=False, created_at=now, expires_at=now + timedelta(hours=ttl_hours)
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[WebhookReceipt.digest],
+        set_={
+            "run_id": None,
+            "response": None,
+            "completed": False,
+            "created_at": statement.excluded.created_at,
+            "expires_at": statement.excluded.expires_at,
+        },
+        where=or_(
+            WebhookReceipt.expires_at < now,
+            and_(
+                WebhookReceipt.completed.is_(False),
+                WebhookReceipt.created_at < now - timedelta(seconds=lease_seconds),
+            ),
+        ),
+    ).returning(WebhookReceipt.digest)
+    claimed = (await db.execute(statement)).scalar_one_or_none() is not None
+
+    existing = None
+    if not claimed:
+        existing = (await db.execute(select(WebhookReceipt).where(WebhookReceipt.digest == digest))).scalar_one_or_none()
+    else:
+        await _purge_expired(db, now)
+    await db.commit()
+    return existing
+
+
+async def _purge_expired(db: AsyncSession, now: datetime) -> None:
+    expired = (
+        select(WebhookReceipt.digest)
+        .where(WebhookReceipt.expires_at < now)
+        .limit(PURGE_BATCH_SIZE)
+        .scalar_subquery()
+    )
+    await db.execute(delete(WebhookReceipt).where(WebhookReceipt.digest.in_(expired)))
+
+
+async def record_response(
+    db: AsyncSession, digest: bytes, response: Dict[str, Any], run_id: Optional[str], completed: bool
+) -> None:
+    await db.execute(
+        update(WebhookReceipt)
+        .where(WebhookReceipt.digest == digest)
+        .values(response=response, run_id=run_id, completed=completed)
+    )
+    await db.commit()
+
+
+async def complete_receipt(db: AsyncSession, digest: bytes, result: Optional[ProcessResult]) -> None:
+    """后台入库完成后把处理结果写入记录，之后的重试返回该结果"""
+    receipt = await db.get(WebhookReceipt, digest)
+    if receipt is None:
+        return
+    if result is not None:
+        receipt.response = {
+            **(receipt.response or {}),
+            "processed_count": result.total_processed,
+            "errors": result.errors or None,
+        }
+    receipt.completed = True
+    await db.commit()
+
+
+async def release_receipt(db: AsyncSession, digest: bytes) -> None:
+    """处理失败时删除记录，让爬虫的重试重新处理"""
+    await db.execute(delete(WebhookReceipt).where(WebhookReceipt.digest == digest))
+    await db.commit()
+
+
+def replay_response(receipt: WebhookReceipt) -> Response:
+    if receipt.response is None:
+        # 首次请求仍在处理中，尚无可返回的结果
+        return Response(
+            content=orjson.dumps({"detail": "相同的回调正在处理中"}),
+            status_code=409,
+            media_type="application/json",
+            headers={REPLAY_HEADER: "true"},
+        )
+    return Response(
+        content=orjson.dumps(receipt.response),
+        media_type="application/json",
+        headers={REPLAY_HEADER: "true"},
+    )
+
+
+@asynccontextmanager
+async def _session(request: Request) -> AsyncIterator[AsyncSession]:
+    # 与依赖注入使用同一会话来源（测试中被 dependency_overrides 替换）
+    factory = request.app.dependency_overrides.get(get_async_session, get_async_session)
+    generator = factory()
+    try:
+        yield await generator.__anext__()
+    finally:
+        await generator.aclose()
+
+
+class IdempotentWebhookRoute(APIRoute):
+    """
+    带请求体的 webhook 路由：在 FastAPI 解析和校验请求体之前完成去重
+
+    抢占到的记录摘要放在 request.state.webhook_receipt，端点把需要后台入库的情况标记为
+    request.state.webhook_pending = True，由后台任务在完成后调用 complete_receipt。
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+        if self.body_field is None:
+            return handler
+
+        async def idempotent_handler(request: Request) -> Response:
+            body = await request.body()
+            # 签名中间件已在接收请求体时算出摘要
+            digest = getattr(request.state, "webhook_body_digest", None) or body_digest(body)
+            async with _session(request) as db:
+                existing = await claim_receipt(db, digest)
+            if existing is not None:
+                logger.info(f"重复的 webhook 回调，返回首次结果: run_id={existing.run_id}")
+                return replay_response(existing)
+
+            request.state.webhook_receipt = digest
+            try:
+                response = await handler(request)
+            except BaseException:
+                async with _session(request) as db:
+                    await release_receipt(db, digest)
+                raise
+
+            async with _session(request) as db:
+                if response.status_code >= 400:
+                    await release_receipt(db, digest)
+                else:
+                    await record_response(
+                        db,
+                        digest,
+                        orjson.loads(response.body),
+                        getattr(request.state, "webhook_run_id", None),
+                        completed=not getattr(request.state, "webhook_pending", False),
+                    )
+            return response
+
+        return idempotent_handler
@@ -6,26 +6,82 @@
 from __future__ import annotations
 
 import asyncio
+import time
 from datetime import datetime, timedelta, timezone
-from typing import List, Optional, Tuple, Dict, Any
+from typing import AsyncIterator, List, Optional, Sequence, Set, Tuple, Dict, Any
 from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import and_, or_, desc, func
 from sqlalchemy.future import select
+from sqlalchemy.orm import load_only
 import json
 
 from app.models.note import XhsNote, NoteTag, NoteTagLog
 from app.models.comment import XhsComment
-from app.models.keyword import BusinessKeyword
 from app.models.task import CrawlTask
 from app.schemas.notes import XhsNoteData, ProcessResult
 from app.schemas.comments import XhsCommentData
-from app.core.logger import app_logger as logger
-from app.utils import parse_filters, parse_sort, apply_filters_to_query, apply_sorting_to_query
+from app.core.logger import app_logger as logger, note_logger
+from app.core.cache import data_version
+from app.core.ingest_cpu import ingest_cpu, note_payload, score_notes
+from app.services.note_archive import archived_note_ids, restore_archived_note
+from app.services.note_normalizer import NoteRow
+from app.services.keyword_registry import keyword_registry
+from app.core.query_shapes import query_shape_recorder
+from app.utils import parse_filters, parse_sort, apply_filters_to_query, apply_sorting_to_query, describe_filters, describe_sort
+
+# 互动数据超过任一阈值的笔记视为重要（与关键词命中并列）
+IMPORTANT_ENGAGEMENT_THRESHOLDS = {
+    "liked_count": 1000,
+    "comment_count": 100,
+    "collected_count": 500,
+}
 
 # 定义 CST 时区，用于将输入的 naive datetime 转换为 aware datetime
 CST = timezone(timedelta(hours=8))
 
+# 笔记响应（XhsNoteResponse）需要的列，按此顺序以元组形式查询
+NOTE_RESPONSE_COLUMNS = [
+    XhsNote.id,
+    XhsNote.note_id,
+    XhsNote.note_url,
+    XhsNote.note_type,
+    XhsNote.title,
+    XhsNote.desc,
+    XhsNote.author_nickname,
+    XhsNote.liked_count,
+    XhsNote.comment_count,
+    XhsNote.current_tags,
+    XhsNote.is_new,
+    XhsNote.is_changed,
+    XhsNote.is_important,
+    XhsNote.is_deleted,
+    XhsNote.first_crawl_time,
+    XhsNote.last_crawl_time,
+    XhsNote.image_list,
+    XhsNote.author_avatar,
+]
+NOTE_RESPONSE_FIELDS = [column.key for column in NOTE_RESPONSE_COLUMNS]
+
+# 列表接口 fields= 可选择的列；id 和 note_id 总是返回
+NOTE_SELECTABLE_COLUMNS = {column.key: getattr(XhsNote, column.key) for column in XhsNote.__table__.columns}
+NOTE_KEY_COLUMNS = [XhsNote.id, XhsNote.note_id]
+
+
+def resolve_note_columns(fields: List[str]) -> List[Any]:
+    """把字段名列表转换为列，未指定时返回默认响应列；存在未知字段时抛出 ValueError"""
+    if not fields:
+        return NOTE_RESPONSE_COLUMNS
+    unknown = [name for name in fields if name not in NOTE_SELECTABLE_COLUMNS]
+    if unknown:
+        raise ValueError(f"不支持的字段: {', '.join(unknown)}")
+    columns = list(NOTE_KEY_COLUMNS)
+    for name in fields:
+        column = NOTE_SELECTABLE_COLUMNS[name]
+        if column not in columns:
+            columns.append(column)
+    return columns
+
 
 class XhsDataService:
     """小红书数据处理服务 - 异步版本"""
@@ -37,19 +93,33 @@ class XhsDataService:
     def _utc_now() -> datetime:
         return datetime.utcnow()
         
-    async def process_notes_batch(self, notes_data: List[XhsNoteData]) -> ProcessResult:
-        """处理笔记批量数据"""
+    async def process_notes_batch(self, notes_data: Sequence[XhsNoteData | NoteRow]) -> ProcessResult:
+        """处理笔记批量数据，笔记可以是 XhsNoteData 或 note_normalizer 转换出的 NoteRow"""
         try:
-            logger.info(f"开始处理笔记批量数据，共{len(notes_data)}个笔记")
+            started_at = time.perf_counter()
+            logger.info("开始处理笔记批量数据，共%d个笔记", len(notes_data))
             
             new_count = 0
             changed_count = 0
             important_count = 0
             errors = []
-            
-            for note_data in notes_data:
+
+            # 重要性判断与数据库读写并行：process 模式下各块在进程池中计算，这里只等待当前笔记所在的块
+            try:
+                await keyword_registry.ensure_loaded(self.db)
+                terms = keyword_registry.active_terms
+            except Exception as e:
+                logger.error(f"加载关键词失败，本批次只按互动数据判断重要性: {str(e)}")
+                terms = ()
+            scores = ingest_cpu.score(notes_data, terms, IMPORTANT_ENGAGEMENT_THRESHOLDS)
+            # 整批查一次归档表，新笔记不再逐条查询
+            archived = await archived_note_ids(self.db, [note_data.note_id for note_data in notes_data])
+            
+            for index, note_data in enumerate(notes_data):
                 try:
-                    is_new, is_changed, is_important = await self.process_single_note(note_data)
+                    is_new, is_changed, is_important = await self.process_single_note(
+                        note_data, is_important=await scores.get(index), archived=archived
+                    )
                     
                     if is_new:
                         new_count += 1
@@ -65,6 +135,19 @@ class XhsDataService:
             
             # 提交数据库变更
             await self.db.commit()
+            data_version.bump("notes")
+
+            # 批次汇总日志，逐条笔记日志在生产环境可关闭或采样
+            logger.info(
+                "笔记批量处理完成: 共%d个，新增%d个，变更%d个，重要%d个，失败%d个",
+                len(notes_data), new_count, changed_count, important_count, len(errors),
+                total=len(notes_data),
+                new=new_count,
+                changed=changed_count,
+                important=important_count,
+                failed=len(errors),
+                duration_ms=round((time.perf_counter() - started_at) * 1000, 1),
+            )
             
             return ProcessResult(
                 total_processed=len(notes_data),
@@ -79,14 +162,27 @@ class XhsDataService:
             logger.error(f"处理笔记批量数据失败: {str(e)}")
             raise
     
-    async def process_single_note(self, note_data: XhsNoteData) -> Tuple[bool, bool, bool]:
-        """处理单个笔记数据，返回(is_new, is_changed, is_important)"""
+    async def process_single_note(
+        self,
+        note_data: XhsNoteData | NoteRow,
+        is_important: Optional[bool] = None,
+        archived: Optional[Set[str]] = None,
+    ) -> Tuple[bool, bool, bool]:
+        """
+        处理单个笔记数据，返回(is_new, is_changed, is_important)
+
+        is_important 为批量预先计算的结果；archived 为批量查询出的已归档 note_id，
+        为 None 时逐条查询归档表。
+        """
         try:
             # 先查找现有笔记（不过滤时间，确保能找到已存在的记录）
             result = await self.db.execute(
                 select(XhsNote).filter(XhsNote.note_id == note_data.note_id)
             )
             existing_note = result.scalars().first()
+            if existing_note is None and (archived is None or note_data.note_id in archived):
+                # 已归档的笔记再次被爬到时移回热表，按已有笔记处理
+                existing_note = await restore_archived_note(self.db, note_data.note_id)
             
             # 获取今天00:00的时间用于对比逻辑
             now = self._utc_now()
@@ -94,17 +190,16 @@ class XhsDataService:
             
             is_new = existing_note is None
             is_changed = False
-            is_important = False
+            if is_important is None:
+                is_important = await self._check_note_importance(note_data)
             
             if is_new:
                 # 创建新笔记
                 note = self._create_new_note_object(note_data)
-                # 检查是否重要
-                is_important = await self._check_note_importance(note_data)
                 note.is_important = is_important
                     
                 self.db.add(note)
-                logger.info(f"创建新笔记: {note_data.note_id}")
+                note_logger.debug("创建新笔记: %s", note_data.note_id)
                 
             else:
                 # 检查是否今天已经爬取过
@@ -113,15 +208,14 @@ class XhsDataService:
                 if already_crawled_today:
                     # 今天已经爬取过，只更新数据，不重新检测变化
                     is_changed = self._update_existing_note_simple(existing_note, note_data)
-                    logger.info(f"今日重复爬取笔记: {note_data.note_id}")
+                    note_logger.debug("今日重复爬取笔记: %s", note_data.note_id)
                 else:
                     # 今天首次爬取，进行变化检测
                     is_changed = self._update_existing_note_object(existing_note, note_data)
                     if is_changed:
-                        logger.info(f"更新笔记: {note_data.note_id}")
+                        note_logger.debug("更新笔记: %s", note_data.note_id)
                 
-                # 重新检查重要性
-                is_important = await self._check_note_importance(note_data)
+                # 按最新数据更新重要性
                 if is_important != existing_note.is_important:
                     existing_note.is_important = is_important
             
@@ -190,9 +284,10 @@ class XhsDataService:
             existing_note.last_crawl_time = datetime.utcnow()
             existing_note.crawl_count += 1
             
-            # 更新标签
-            if NoteTag.CHANGED.value not in existing_note.current_tags:
-                existing_note.current_tags.append(NoteTag.CHANGED.value)
+            # 更新标签（重新赋值而非原地 append，否则 ORM 检测不到 JSONB 列的变更）
+            current_tags = existing_note.current_tags or []
+            if NoteTag.CHANGED.value not in current_tags:
+                existing_note.current_tags = [*current_tags, NoteTag.CHANGED.value]
         else:
             # 没有变化的情况下也要更新状态
             existing_note.is_changed = False
@@ -225,26 +320,13 @@ class XhsDataService:
     async def _check_note_importance(self, note_data: XhsNoteData) -> bool:
         """检查笔记是否重要（简化版）"""
         try:
-            # 获取关键词
-            result = await self.db.execute(
-                select(BusinessKeyword).filter(BusinessKeyword.is_active == True)
-            )
-            keywords = result.scalars().all()
-            
-            # 检查标题和描述中是否包含关键词
-            text_to_check = f"{note_data.title or ''} {note_data.desc or ''}"
-            
-            for keyword in keywords:
-                if keyword.keyword.lower() in text_to_check.lower():
-                    return True
-            
-            # 根据互动数据判断
-            if (note_data.liked_count > 1000 or 
-                note_data.comment_count > 100 or
-                note_data.collected_count > 500):
-                return True
-                
-            return False
+            # 启用的关键词来自内存注册表，不再每条笔记查询一次关键词表
+            await keyword_registry.ensure_loaded(self.db)
+
+            # 单条笔记直接在当前进程计算，规则与批量计算（ingest_cpu）一致
+            matcher = ingest_cpu.matcher(keyword_registry.active_terms)
+            payload = note_payload(note_data, tuple(IMPORTANT_ENGAGEMENT_THRESHOLDS))
+            return score_notes(matcher, tuple(IMPORTANT_ENGAGEMENT_THRESHOLDS.values()), [payload])[0]
             
         except Exception as e:
             logger.error(f"检查笔记重要性失败: {str(e)}")
@@ -289,14 +371,9 @@ class XhsDataService:
             }
             
         except Exception as e:
+            # 不返回全 0 的统计：调用方会把结果缓存在当前 ETag 下
             logger.error(f"获取统计信息失败: {str(e)}")
-            return {
-                "total_notes": 0,
-                "new_notes": 0,
-                "changed_notes": 0,
-                "important_notes": 0,
-                "today_crawled": 0
-            }
+            raise
     
     async def search_notes(self, 
                           keyword: Optional[str] = None,
@@ -309,26 +386,23 @@ class XhsDataService:
                           limit: int = 50,
                           offset: int = 0,
                           filters: Optional[str] = None,
-                          sort: Optional[str] = None) -> List[XhsNote]:
-        """搜索笔记 - 支持高级筛选和排序"""
+                          sort: Optional[str] = None,
+                          fields: Optional[List[str]] = None) -> List[XhsNote]:
+        """
+        搜索笔记 - 支持高级筛选和排序
+        
+        指定 fields 时只加载这些列，其余列延迟加载且禁止隐式懒加载
+        （访问未加载的列会直接报错，避免逐行补查询）。
+        """
         try:
+            self._record_query_shape("list", keyword, is_new, is_changed, author_user_id, date_from, date_to, filters, sort)
             query = select(XhsNote)
-            
-            # 应用基础筛选条件
-            query = self._apply_basic_filters(query, keyword, is_new, is_changed, is_important, author_user_id, date_from, date_to)
-            
-            # 应用高级筛选
-            if filters:
-                filter_list = parse_filters(filters)
-                query = apply_filters_to_query(query, filter_list, XhsNote)
-            
-            # 应用排序
-            if sort:
-                sort_list = parse_sort(sort)
-                query = apply_sorting_to_query(query, sort_list, XhsNote)
-            else:
-                # 默认排序
-                query = query.order_by(desc(XhsNote.last_crawl_time))
+            if fields:
+                query = query.options(load_only(*resolve_note_columns(fields), raiseload=True))
+            query = self._build_search_query(
+                query, keyword, is_new, is_changed, is_important,
+                author_user_id, date_from, date_to, filters, sort
+            )
             
             # 分页
             query = query.offset(offset).limit(limit)
@@ -338,7 +412,65 @@ class XhsDataService:
             
         except Exception as e:
             logger.error(f"搜索笔记失败: {str(e)}")
-            return []
+            raise
+
+    async def search_note_rows(self,
+                               columns: List[Any],
+                               keyword: Optional[str] = None,
+                               is_new: Optional[bool] = None,
+                               is_changed: Optional[bool] = None,
+                               is_important: Optional[bool] = None,
+                               author_user_id: Optional[str] = None,
+                               date_from: Optional[datetime] = None,
+                               date_to: Optional[datetime] = None,
+                               limit: int = 50,
+                               offset: int = 0,
+                               filters: Optional[str] = None,
+                               sort: Optional[str] = None,
+                               include_deleted: bool = False) -> List[Any]:
+        """搜索笔记，只查询 columns 指定的列并返回元组行（不构造 ORM 对象）"""
+        try:
+            self._record_query_shape("list", keyword, is_new, is_changed, author_user_id, date_from, date_to, filters, sort, include_deleted)
+            query = self._build_search_query(
+                select(*columns), keyword, is_new, is_changed, is_important,
+                author_user_id, date_from, date_to, filters, sort, include_deleted
+            )
+            query = query.offset(offset).limit(limit)
+            
+            result = await self.db.execute(query)
+            return result.all()
+            
+        except Exception as e:
+            logger.error(f"搜索笔记失败: {str(e)}")
+            raise
+
+    async def stream_note_rows(self,
+                               columns: List[Any],
+                               keyword: Optional[str] = None,
+                               is_new: Optional[bool] = None,
+                               is_changed: Optional[bool] = None,
+                               is_important: Optional[bool] = None,
+                               author_user_id: Optional[str] = None,
+                               date_from: Optional[datetime] = None,
+                               date_to: Optional[datetime] = None,
+                               filters: Optional[str] = None,
+                               sort: Optional[str] = None,
+                               batch_size: int = 1000,
+                               include_deleted: bool = False) -> AsyncIterator[List[Any]]:
+        """
+        通过服务端游标流式读取笔记行，每次产出一批 Row
+
+        只查询 columns 指定的列，不构造 ORM 对象；整个结果集只执行一次顺序扫描，
+        内存占用只与 batch_size 有关。调用方消费得慢时游标不会继续拉取数据。
+        """
+        self._record_query_shape("export", keyword, is_new, is_changed, author_user_id, date_from, date_to, filters, sort, include_deleted)
+        query = self._build_search_query(
+            select(*columns), keyword, is_new, is_changed, is_important,
+            author_user_id, date_from, date_to, filters, sort, include_deleted
+        )
+        result = await self.db.stream(query.execution_options(yield_per=batch_size))
+        async for partition in result.partitions():
+            yield partition
 
     async def count_notes(self,
                          keyword: Optional[str] = None,
@@ -348,13 +480,15 @@ class XhsDataService:
                          author_user_id: Optional[str] = None,
                          date_from: Optional[datetime] = None,
                          date_to: Optional[datetime] = None,
-                         filters: Optional[str] = None) -> int:
+                         filters: Optional[str] = None,
+                         include_deleted: bool = False) -> int:
         """计算符合条件的笔记总数 - 支持高级筛选"""
         try:
+            self._record_query_shape("count", keyword, is_new, is_changed, author_user_id, date_from, date_to, filters, None, include_deleted)
             query = select(func.count(XhsNote.id))
             
             # 应用基础筛选条件
-            query = self._apply_basic_filters(query, keyword, is_new, is_changed, is_important, author_user_id, date_from, date_to)
+            query = self._apply_basic_filters(query, keyword, is_new, is_changed, is_important, author_user_id, date_from, date_to, include_deleted)
             
             # 应用高级筛选
             if filters:
@@ -366,7 +500,54 @@ class XhsDataService:
             
         except Exception as e:
             logger.error(f"计算笔记总数失败: {str(e)}")
-            return 0
+            raise
+
+    @staticmethod
+    def _record_query_shape(kind, keyword=None, is_new=None, is_changed=None, author_user_id=None, date_from=None, date_to=None, filters=None, sort=None, include_deleted=False):
+        """记录查询形态（谓词与 _apply_basic_filters 一一对应），供 commands.index_advisor 给出索引建议"""
+        predicates = [] if include_deleted else ["is_deleted = false"]
+        if keyword:
+            predicates.append("title ilike OR desc ilike")
+        flags = [
+            f"{name} = {str(value).lower()}"
+            for name, value in (("is_new", is_new), ("is_changed", is_changed))
+            if value is not None
+        ]
+        if flags:
+            predicates.append(" OR ".join(flags))
+        if author_user_id:
+            predicates.append("author_user_id =")
+        if date_from:
+            predicates.append("last_crawl_time >=")
+        if date_to:
+            predicates.append("last_crawl_time <=")
+        if filters:
+            predicates.extend(describe_filters(parse_filters(filters), XhsNote))
+
+        order = []
+        if kind != "count":
+            order = describe_sort(parse_sort(sort), XhsNote) if sort else ["last_crawl_time desc"]
+        query_shape_recorder.record(kind, predicates, order)
+
+    def _build_search_query(self, query, keyword=None, is_new=None, is_changed=None, is_important=None, author_user_id=None, date_from=None, date_to=None, filters=None, sort=None, include_deleted=False):
+        """组合基础筛选、高级筛选和排序，列表查询与导出共用"""
+        # 应用基础筛选条件
+        query = self._apply_basic_filters(query, keyword, is_new, is_changed, is_important, author_user_id, date_from, date_to, include_deleted)
+        
+        # 应用高级筛选
+        if filters:
+            filter_list = parse_filters(filters)
+            query = apply_filters_to_query(query, filter_list, XhsNote)
+        
+        # 应用排序
+        if sort:
+            sort_list = parse_sort(sort)
+            query = apply_sorting_to_query(query, sort_list, XhsNote)
+        else:
+            # 默认排序
+            query = query.order_by(desc(XhsNote.last_crawl_time))
+        
+        return query
     
     def _apply_basic_filters(self, query, keyword=None, is_new=None, is_changed=None, is_important=None, author_user_id=None, date_from=None, date_to=None, include_deleted: bool = False):
         """应用基础筛选条件的通用方法"""
@@ -429,6 +610,18 @@ class XhsDataService:
             logger.error(f"获取笔记详情失败: {str(e)}")
             return None
 
+    async def get_note_row(self, note_id: str, columns: List[Any]) -> Optional[Any]:
+        """根据note_id获取笔记的指定列"""
+        try:
+            result = await self.db.execute(
+                select(*columns).filter(XhsNote.note_id == note_id, XhsNote.is_deleted == False)
+            )
+            return result.first()
+            
+        except Exception as e:
+            logger.error(f"获取笔记详情失败: {str(e)}")
+            return None
+
     async def soft_delete_note(self, note_id: str) -> bool:
         """软删除一个笔记"""
         try:
@@ -442,6 +635,7 @@ class XhsDataService:
             
             note_to_delete.is_deleted = True
             await self.db.commit()
+            data_version.bump("notes")
             logger.info(f"笔记 {note_id} 已被软删除。")
             return True
             
@@ -5,8 +5,11 @@
 
 import json
 import secrets
-from typing import List, Dict, Any, Optional, Union
-from sqlalchemy import asc, desc, and_, or_, func
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple, Union
+from sqlalchemy import String, Text, asc, bindparam, desc, and_, or_, func, literal
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.orm import Query
 from sqlalchemy.sql import Select
 
@@ -48,76 +51,291 @@ def parse_sort(sort_json: str) -> List[Dict[str, Any]]:
         return []
 
 
-def apply_filters_to_query(query: Union[Query, Select], filters: List[Dict[str, Any]], model_class) -> Union[Query, Select]:
+def parse_fields(fields: Optional[str]) -> List[str]:
     """
-    将筛选条件应用到 SQLAlchemy 查询中
+    解析前端传来的字段列表（稀疏字段集）
     
-    Args:
-        query: SQLAlchemy 查询对象
-        filters: 筛选条件列表
-        model_class: 数据模型类
-        
-    Returns:
-        应用了筛选条件的查询对象
+    格式：逗号分隔，如 "note_id,title,liked_count"；去重并保持顺序
     """
-    if not filters:
-        return query
-        
+    if not fields:
+        return []
+    result = []
+    for name in fields.split(","):
+        name = name.strip()
+        if name and name not in result:
+            result.append(name)
+    return result
+
+
+# 筛选条件编译后的绑定参数前缀
+FILTER_PARAM_PREFIX = "flt_"
+
+# 无需取值的操作符
+_VALUELESS_OPERATORS = {"isEmpty", "isNotEmpty"}
+_COMPARISON_OPERATORS = {"eq", "ne", "gt", "gte", "lt", "lte"}
+_LIKE_OPERATORS = {"iLike", "notILike"}
+_LIST_OPERATORS = {"inArray", "notInArray"}
+# JSONB 数组列（tags、current_tags）专用：contains 为包含全部取值（@>），overlaps 为包含任一取值（?|），
+# 两者都能使用列上的 GIN 索引；inArray / notInArray 在数组列上按 overlaps 处理
+_ARRAY_OPERATORS = {"contains", "overlaps"}
+_ARRAY_COLUMN_OPERATORS = _ARRAY_OPERATORS | _LIST_OPERATORS | _VALUELESS_OPERATORS
+
+
+def _is_array_column(field) -> bool:
+    return isinstance(field.type, JSONB)
+
+
+@lru_cache(maxsize=None)
+def get_filterable_columns(model_class) -> Dict[str, Any]:
+    """
+    获取模型允许筛选/排序的列
+    
+    模型通过 __filterable__ 声明白名单；未声明时只允许表中的普通列，
+    不会暴露关系属性或其他类属性。
+    """
+    names = getattr(model_class, "__filterable__", None)
+    if names is None:
+        names = [column.key for column in model_class.__table__.columns]
+    return {name: getattr(model_class, name) for name in names}
+
+
+def _parse_datetime(value: Any) -> datetime:
+    """前端日期筛选传毫秒时间戳（数字或数字字符串），也兼容 ISO 字符串"""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, (int, float)) or (isinstance(value, str) and value.isdigit()):
+        return datetime.fromtimestamp(int(value) / 1000, tz=timezone.utc).replace(tzinfo=None)
+    return datetime.fromisoformat(str(value))
+
+
+def _coerce_value(field, value: Any, variant: str) -> Any:
+    """按列类型转换筛选值，使其能作为类型化的绑定参数"""
+    try:
+        python_type = field.type.python_type
+    except NotImplementedError:
+        return value
+    if variant == "boolean" or python_type is bool:
+        return value == "true" if isinstance(value, str) else bool(value)
+    if python_type is int and not isinstance(value, int):
+        return int(value)
+    if python_type is datetime:
+        return _parse_datetime(value)
+    return value
+
+
+def _normalize_filter(filter_item: Dict[str, Any], columns: Dict[str, Any]):
+    """
+    校验并规范化单个筛选条件，返回 (字段名, 操作符, 取值)；无效条件返回 None
+    """
+    field_name = filter_item.get("id")
+    value = filter_item.get("value")
+    operator = filter_item.get("operator", "eq")
+    variant = filter_item.get("variant", "text")
+    
+    if not field_name or field_name not in columns:
+        return None
+    field = columns[field_name]
+    
+    if _is_array_column(field):
+        if operator not in _ARRAY_COLUMN_OPERATORS:
+            return None
+        if operator in _VALUELESS_OPERATORS:
+            return field_name, operator, None
+        values = value if isinstance(value, list) else [value]
+        if not values or not all(isinstance(item, (str, int)) for item in values):
+            return None
+        return field_name, operator, [str(item) for item in values]
+    
+    try:
+        if operator in _VALUELESS_OPERATORS:
+            return field_name, operator, None
+        if operator in _COMPARISON_OPERATORS:
+            return field_name, operator, _coerce_value(field, value, variant)
+        if operator in _LIKE_OPERATORS:
+            if isinstance(value, str):
+                return field_name, operator, f"%{value}%"
+            return None
+        if operator in _LIST_OPERATORS:
+            if isinstance(value, list):
+                return field_name, operator, [_coerce_value(field, item, variant) for item in value]
+            return None
+    except (TypeError, ValueError, OverflowError):
+        return None
+    
+    return None
+
+
+def _array_condition(field, operator: str, key: str):
+    """JSONB 数组列的筛选条件"""
+    if operator == "contains":
+        return field.contains(bindparam(key, type_=JSONB))
+    if operator in ("overlaps", "inArray"):
+        return field.has_any(bindparam(key, type_=ARRAY(Text)))
+    if operator == "notInArray":
+        return ~field.has_any(bindparam(key, type_=ARRAY(Text)))
+    if operator == "isEmpty":
+        return or_(field.is_(None), field == literal([], JSONB))
+    return and_(field.is_not(None), field != literal([], JSONB))
+
+
+@lru_cache(maxsize=256)
+def _compile_filter_shape(model_class, shape: Tuple[Tuple[str, str], ...]):
+    """
+    按筛选“形状”（字段 + 操作符序列）编译 WHERE 子句，取值全部是命名绑定参数
+    
+    同一形状返回同一个子句对象，因此 SQLAlchemy 的编译缓存和 asyncpg 的
+    预编译语句都能复用；variant 只影响取值转换，不参与形状。
+    """
+    columns = get_filterable_columns(model_class)
     conditions = []
     
-    for filter_item in filters:
-        field_name = filter_item.get("id")
-        value = filter_item.get("value")
-        operator = filter_item.get("operator", "eq")
-        variant = filter_item.get("variant", "text")
+    for index, (field_name, operator) in enumerate(shape):
+        field = columns[field_name]
+        key = f"{FILTER_PARAM_PREFIX}{index}"
         
-        if not field_name or not hasattr(model_class, field_name):
+        if _is_array_column(field):
+            conditions.append(_array_condition(field, operator, key))
             continue
-            
-        field = getattr(model_class, field_name)
         
         # 根据操作符构建条件
         if operator == "eq":
-            if variant == "boolean":
-                conditions.append(field == (value == "true" if isinstance(value, str) else bool(value)))
-            else:
-                conditions.append(field == value)
+            conditions.append(field == bindparam(key, type_=field.type))
         elif operator == "ne":
-            if variant == "boolean":
-                conditions.append(field != (value == "true" if isinstance(value, str) else bool(value)))
-            else:
-                conditions.append(field != value)
+            conditions.append(field != bindparam(key, type_=field.type))
         elif operator == "iLike":
-            if isinstance(value, str):
-                conditions.append(field.ilike(f"%{value}%"))
+            conditions.append(field.ilike(bindparam(key, type_=String())))
         elif operator == "notILike":
-            if isinstance(value, str):
-                conditions.append(~field.ilike(f"%{value}%"))
+            conditions.append(~field.ilike(bindparam(key, type_=String())))
         elif operator == "gt":
-            conditions.append(field > value)
+            conditions.append(field > bindparam(key, type_=field.type))
         elif operator == "gte":
-            conditions.append(field >= value)
+            conditions.append(field >= bindparam(key, type_=field.type))
         elif operator == "lt":
-            conditions.append(field < value)
+            conditions.append(field < bindparam(key, type_=field.type))
         elif operator == "lte":
-            conditions.append(field <= value)
+            conditions.append(field <= bindparam(key, type_=field.type))
         elif operator == "isEmpty":
             conditions.append(or_(field.is_(None), field == ""))
         elif operator == "isNotEmpty":
             conditions.append(and_(field.is_not(None), field != ""))
         elif operator == "inArray":
-            if isinstance(value, list):
-                conditions.append(field.in_(value))
+            conditions.append(field.in_(bindparam(key, expanding=True, type_=field.type)))
         elif operator == "notInArray":
-            if isinstance(value, list):
-                conditions.append(~field.in_(value))
+            conditions.append(~field.in_(bindparam(key, expanding=True, type_=field.type)))
     
-    if conditions:
-        query = query.filter(and_(*conditions))
+    return and_(*conditions)
+
+
+def _normalize_filters(filters: List[Dict[str, Any]], model_class) -> List[Tuple[str, str, Any]]:
+    """校验并规范化筛选条件列表，跳过无效条件"""
+    if not filters:
+        return []
+    columns = get_filterable_columns(model_class)
+    normalized = []
+    for filter_item in filters:
+        if not isinstance(filter_item, dict):
+            continue
+        item = _normalize_filter(filter_item, columns)
+        if item is not None:
+            normalized.append(item)
+    return normalized
+
+
+def compile_filters(filters: List[Dict[str, Any]], model_class) -> Tuple[Optional[Any], Dict[str, Any]]:
+    """
+    把筛选条件编译为 (可缓存的 WHERE 子句, 绑定参数)
+    
+    没有有效条件时返回 (None, {})。
+    """
+    shape = []
+    params = {}
+    
+    for field_name, operator, value in _normalize_filters(filters, model_class):
+        if operator not in _VALUELESS_OPERATORS:
+            params[f"{FILTER_PARAM_PREFIX}{len(shape)}"] = value
+        shape.append((field_name, operator))
+    
+    if not shape:
+        return None, {}
+    
+    return _compile_filter_shape(model_class, tuple(shape)), params
+
+
+# 查询形态描述中操作符的写法（见 app.core.query_shapes）
+_SHAPE_OPERATORS = {
+    "eq": "=", "ne": "!=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<=",
+    "iLike": "ilike", "notILike": "not ilike", "isEmpty": "is empty", "isNotEmpty": "is not empty",
+    "inArray": "in", "notInArray": "not in", "contains": "@>", "overlaps": "?|",
+}
+_ARRAY_SHAPE_OPERATORS = {"inArray": "?|", "notInArray": "not ?|"}
+
+
+def describe_filters(filters: List[Dict[str, Any]], model_class) -> List[str]:
+    """
+    把筛选条件描述为不含取值的谓词，如 "liked_count >="、"tags @>"
+
+    布尔列的等值条件保留取值（"is_important = true"），因为取值决定能否使用部分索引。
+    """
+    columns = get_filterable_columns(model_class)
+    terms = []
+    for field_name, operator, value in _normalize_filters(filters, model_class):
+        if _is_array_column(columns[field_name]) and operator in _ARRAY_SHAPE_OPERATORS:
+            term = f"{field_name} {_ARRAY_SHAPE_OPERATORS[operator]}"
+        else:
+            term = f"{field_name} {_SHAPE_OPERATORS[operator]}"
+        if isinstance(value, bool):
+            term = f"{term} {str(value).lower()}"
+        terms.append(term)
+    return terms
+
+
+def apply_filters_to_query(query: Union[Query, Select], filters: List[Dict[str, Any]], model_class) -> Union[Query, Select]:
+    """
+    将筛选条件应用到 SQLAlchemy 查询中
+    
+    Args:
+        query: SQLAlchemy 查询对象
+        filters: 筛选条件列表
+        model_class: 数据模型类（只允许 __filterable__ 白名单中的列）
+        
+    Returns:
+        应用了筛选条件的查询对象，取值以绑定参数形式附带
+    """
+    clause, params = compile_filters(filters, model_class)
+    if clause is None:
+        return query
+    
+    query = query.filter(clause)
+    if params:
+        query = query.params(**params)
     
     return query
 
 
+@lru_cache(maxsize=256)
+def _compile_sort_shape(model_class, shape: Tuple[Tuple[str, bool], ...]) -> Tuple[Any, ...]:
+    """按 (字段, 是否倒序) 序列编译 ORDER BY 子句"""
+    columns = get_filterable_columns(model_class)
+    return tuple(
+        desc(columns[field_name]) if is_desc else asc(columns[field_name])
+        for field_name, is_desc in shape
+    )
+
+
+def _sort_shape(sort_list: List[Dict[str, Any]], model_class) -> Tuple[Tuple[str, bool], ...]:
+    columns = get_filterable_columns(model_class)
+    return tuple(
+        (sort_item.get("id"), bool(sort_item.get("desc", False)))
+        for sort_item in sort_list or []
+        if isinstance(sort_item, dict) and sort_item.get("id") in columns
+    )
+
+
+def describe_sort(sort_list: List[Dict[str, Any]], model_class) -> List[str]:
+    """把排序条件描述为 "字段 asc/desc" 列表"""
+    return [f"{field_name} {'desc' if is_desc else 'asc'}" for field_name, is_desc in _sort_shape(sort_list, model_class)]
+
+
 def apply_sorting_to_query(query: Union[Query, Select], sort_list: List[Dict[str, Any]], model_class) -> Union[Query, Select]:
     """
     将排序条件应用到 SQLAlchemy 查询中
@@ -125,31 +343,13 @@ def apply_sorting_to_query(query: Union[Query, Select], sort_list: List[Dict[str
     Args:
         query: SQLAlchemy 查询对象  
         sort_list: 排序条件列表
-        model_class: 数据模型类
+        model_class: 数据模型类（只允许 __filterable__ 白名单中的列）
         
     Returns:
         应用了排序条件的查询对象
     """
-    if not sort_list:
-        return query
-        
-    order_clauses = []
-    
-    for sort_item in sort_list:
-        field_name = sort_item.get("id")
-        is_desc = sort_item.get("desc", False)
-        
-        if not field_name or not hasattr(model_class, field_name):
-            continue
-            
-        field = getattr(model_class, field_name)
-        
-        if is_desc:
-            order_clauses.append(desc(field))
-        else:
-            order_clauses.append(asc(field))
-    
-    if order_clauses:
-        query = query.order_by(*order_clauses)
+    shape = _sort_shape(sort_list, model_class)
+    if shape:
+        query = query.order_by(*_compile_sort_shape(model_class, shape))
     
     return query
@@ -0,0 +1,11 @@
+"""
+gunicorn worker 类
+在 uvicorn-worker 的基础上固定使用 uvloop 事件循环和 httptools 解析器（uvicorn[standard] 已包含），
+缺少依赖时启动即报错，而不是静默退回 asyncio/h11。
+"""
+
+from uvicorn_worker import UvicornWorker as _UvicornWorker
+
+
+class UvicornWorker(_UvicornWorker):
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools", "lifespan": "on"}
@@ -0,0 +1,41 @@
+"""
+笔记归档
+
+把软删除的笔记和超过 --cold-days 天未再爬取的笔记分批移入 xhs_notes_archive。
+每批单独提交，可多进程同时运行（候选行使用 SKIP LOCKED 加锁）；
+仍有评论或标签日志引用的笔记保留在笔记表中。
+
+用法: python -m commands.archive_notes --cold-days 90 --batch-size 1000
+"""
+
+import argparse
+import asyncio
+
+from app.config import settings
+from app.database import async_session_maker
+from app.services.note_archive import archive_notes, cold_cutoff, count_archive_candidates
+
+
+async def run(args: argparse.Namespace) -> None:
+    cold_before = None if args.deleted_only else cold_cutoff(args.cold_days)
+    async with async_session_maker() as db:
+        if args.dry_run:
+            counts = await count_archive_candidates(db, cold_before)
+            print(f"待归档: 软删除 {counts['deleted']} 个，冷数据 {counts['cold']} 个")
+            return
+        moved = await archive_notes(db, cold_before, batch_size=args.batch_size, max_batches=args.max_batches)
+        print(f"已归档: 软删除 {moved['deleted']} 个，冷数据 {moved['cold']} 个")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cold-days", type=int, default=settings.ARCHIVE_COLD_DAYS, help="超过多少天未爬取视为冷数据")
+    parser.add_argument("--batch-size", type=int, default=settings.ARCHIVE_BATCH_SIZE, help="每批归档的笔记数")
+    parser.add_argument("--max-batches", type=int, help="最多执行的批次数（默认直到没有候选）")
+    parser.add_argument("--deleted-only", action="store_true", help="只归档软删除的笔记")
+    parser.add_argument("--dry-run", action="store_true", help="只统计候选数量，不移动数据")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
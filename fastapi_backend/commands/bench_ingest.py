@@ -0,0 +1,320 @@
+"""
+笔记入库基准
+
+在本地 Postgres（DATABASE_URL）上生成合成笔记，分别测量：
+- service: 直接调用 XhsDataService.process_notes_batch
+- webhook: 通过 ASGI 客户端调用 POST /api/webhook/xhs-result（包含请求解析、校验和后台处理）
+- lanes: 按 --lanes 中的每个分区数调用 ingest_partitioned（note_id 分区并行入库），
+  输出相对 1 个分区的 notes/sec 倍数
+- validate: 只测回调笔记的转换和校验（不访问数据库），对比逐条 XhsNoteData(**...)、
+  整批 TypeAdapter 校验和可信来源跳过校验三种方式
+
+每个批次按 --mix 比例混合新笔记、重复爬取（无变化）和有变化的笔记，
+输出 notes/sec、批次延迟 p50/p99、查询次数和峰值内存，可保存为 JSON 并与上次结果对比。
+service / webhook 的重要性计算按 INGEST_CPU_MODE 在当前进程或进程池中执行，可分别运行后用 --compare 对比。
+基准数据的 note_id 以 --prefix 开头，运行前后会清理，请勿在生产库上运行。
+
+用法: python -m commands.bench_ingest --batches 20 --batch-size 200 --output bench.json
+"""
+
+import argparse
+import asyncio
+import gc
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import delete, insert
+
+from app.config import settings
+from app.core.ingest_cpu import ingest_cpu
+from app.core.metrics import DB_QUERY_DURATION
+from app.core.serialization import json_dumps
+from app.database import async_session_maker
+from app.models.keyword import BusinessKeyword
+from app.models.note import XhsNote
+from app.schemas.notes import XhsNoteData
+from app.services.ingest_lanes import ingest_partitioned
+from app.services.note_validation import prepare_notes
+from app.services.xhs_async_service import XhsDataService
+from commands.bench_normalize import transform_note_data
+from commands.benchmark import (
+    compare_results,
+    latency_summary,
+    peak_rss_mb,
+    run_metadata,
+    write_results,
+)
+from commands.synthetic import (
+    DEFAULT_PREFIX,
+    BatchPlanner,
+    NoteMix,
+    SyntheticNoteGenerator,
+    default_keywords,
+)
+
+MODES = ("service", "webhook", "lanes", "validate")
+DB_MODES = ("service", "webhook", "lanes")
+VALIDATION_STRATEGIES = {
+    # 原路径：逐条转换为 dict 再构造模型
+    "per_object": lambda items: [XhsNoteData(**transform_note_data(item)) for item in items if "note_id" in item],
+    "batch": lambda items: prepare_notes(items).notes,
+    "trusted": lambda items: prepare_notes(items, trusted=True).notes,
+}
+KEYWORD_CATEGORY = "benchmark"
+SEED_CHUNK_SIZE = 1000
+COMPARE_KEYS = [
+    f"{mode}.{key}"
+    for mode in ("service", "webhook")
+    for key in ("notes_per_sec", "batch_latency.p50_ms", "batch_latency.p99_ms", "queries_per_note", "peak_rss_mb")
+] + [f"validate.{strategy}.notes_per_sec" for strategy in VALIDATION_STRATEGIES]
+
+
+def parse_lanes(value: str) -> List[int]:
+    try:
+        lanes = [int(part) for part in value.split(",") if part.strip()]
+    except ValueError:
+        lanes = []
+    if not lanes or min(lanes) < 1:
+        raise ValueError(f"无效的分区数: {value}")
+    return lanes
+
+
+async def cleanup(prefix: str) -> None:
+    async with async_session_maker() as db:
+        await db.execute(delete(XhsNote).where(XhsNote.note_id.like(f"{prefix}%")))
+        await db.execute(delete(BusinessKeyword).where(BusinessKeyword.category == KEYWORD_CATEGORY))
+        await db.commit()
+
+
+async def seed(generator: SyntheticNoteGenerator, existing: int) -> None:
+    """写入关键词和“已有笔记”，已有笔记的最后爬取时间为两天前"""
+    async with async_session_maker() as db:
+        for keyword in generator.keywords:
+            db.add(BusinessKeyword(keyword=keyword, category=KEYWORD_CATEGORY, is_active=True))
+        for start in range(0, existing, SEED_CHUNK_SIZE):
+            rows = [generator.note_row(index) for index in range(start, min(start + SEED_CHUNK_SIZE, existing))]
+            await db.execute(insert(XhsNote), rows)
+        await db.commit()
+
+
+def summarize(latencies: List[float], notes: int, queries: int) -> Dict[str, Any]:
+    elapsed = sum(latencies)
+    return {
+        "notes": notes,
+        "elapsed_sec": round(elapsed, 3),
+        "notes_per_sec": round(notes / elapsed, 1) if elapsed else 0.0,
+        "batch_latency": latency_summary(latencies),
+        "queries_total": queries,
+        "queries_per_note": round(queries / notes, 2) if notes else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+async def run_service(planner: BatchPlanner, batches: int, batch_size: int, warmup: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    queries = 0
+    for i in range(warmup + batches):
+        notes = planner.next_batch(batch_size)
+        before = DB_QUERY_DURATION.count()
+        started_at = time.perf_counter()
+        async with async_session_maker() as db:
+            await XhsDataService(db).process_notes_batch(notes)
+        if i >= warmup:
+            latencies.append(time.perf_counter() - started_at)
+            queries += DB_QUERY_DURATION.count() - before
+    return summarize(latencies, batches * batch_size, queries)
+
+
+async def run_webhook(planner: BatchPlanner, batches: int, batch_size: int, warmup: int) -> Dict[str, Any]:
+    from app.main import app
+
+    latencies: List[float] = []
+    queries = 0
+    # ASGITransport 会等待后台任务执行完成后才返回，延迟包含实际入库时间
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        for i in range(warmup + batches):
+            body = json_dumps({
+                "status": "success",
+                "message": "benchmark",
+                "timestamp": datetime.utcnow(),
+                "run_id": f"bench-{i}",
+                "data": {"notes": planner.next_batch(batch_size, raw=True)},
+            })
+            before = DB_QUERY_DURATION.count()
+            started_at = time.perf_counter()
+            response = await client.post(
+                "/api/webhook/xhs-result", content=body, headers={"content-type": "application/json"}
+            )
+            response.raise_for_status()
+            if i >= warmup:
+                latencies.append(time.perf_counter() - started_at)
+                queries += DB_QUERY_DURATION.count() - before
+    return summarize(latencies, batches * batch_size, queries)
+
+
+async def run_lanes(
+    planner: BatchPlanner, batches: int, batch_size: int, warmup: int, lane_counts: List[int]
+) -> Dict[str, Any]:
+    """同样的批次构成下，分区数从 1 到 N 的吞吐"""
+    results: Dict[str, Any] = {}
+    for lanes in lane_counts:
+        latencies: List[float] = []
+        queries = 0
+        for i in range(warmup + batches):
+            notes = planner.next_batch(batch_size)
+            before = DB_QUERY_DURATION.count()
+            started_at = time.perf_counter()
+            async with async_session_maker() as db:
+                await ingest_partitioned(XhsDataService(db), notes, lanes)
+            if i >= warmup:
+                latencies.append(time.perf_counter() - started_at)
+                queries += DB_QUERY_DURATION.count() - before
+        results[str(lanes)] = summarize(latencies, batches * batch_size, queries)
+
+    baseline = results[str(lane_counts[0])]["notes_per_sec"]
+    for result in results.values():
+        result["scaling"] = round(result["notes_per_sec"] / baseline, 2) if baseline else 0.0
+    return results
+
+
+def run_validate(planner: BatchPlanner, batches: int, batch_size: int, warmup: int) -> Dict[str, Any]:
+    """各校验方式处理同一组原始批次的吞吐"""
+    raw_batches = [planner.next_batch(batch_size, raw=True) for _ in range(warmup + batches)]
+    # 输入数据不参与分代回收，避免各方式的耗时被扫描输入的 GC 停顿淹没
+    gc.collect()
+    gc.freeze()
+    results: Dict[str, Any] = {}
+    try:
+        for strategy, validate in VALIDATION_STRATEGIES.items():
+            gc.collect()
+            latencies: List[float] = []
+            for i, items in enumerate(raw_batches):
+                started_at = time.perf_counter()
+                validated = validate(items)
+                if i >= warmup:
+                    latencies.append(time.perf_counter() - started_at)
+                assert len(validated) == batch_size
+            elapsed = sum(latencies)
+            results[strategy] = {
+                "notes_per_sec": round(batches * batch_size / elapsed, 1) if elapsed else 0.0,
+                "batch_latency": latency_summary(latencies),
+            }
+    finally:
+        gc.unfreeze()
+    return results
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    mix = NoteMix.parse(args.mix)
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    generator = SyntheticNoteGenerator(
+        seed=args.seed,
+        prefix=args.prefix,
+        keywords=default_keywords(args.keywords),
+        keyword_hit_rate=args.keyword_hit_rate,
+        text_length=args.text_length,
+    )
+    lane_counts = parse_lanes(args.lanes)
+    # lanes 模式每个分区数各跑一轮，需要各自的已有笔记
+    runs = len(modes) + (len(lane_counts) - 1 if "lanes" in modes else 0)
+    existing = BatchPlanner.existing_needed(mix, args.batch_size, args.batches + args.warmup) * runs
+    planner = BatchPlanner(generator, mix, existing)
+
+    uses_db = any(mode in DB_MODES for mode in modes)
+    if uses_db:
+        await cleanup(args.prefix)
+        await seed(generator, existing)
+
+    results: Dict[str, Any] = {
+        "meta": run_metadata(),
+        "config": {
+            **vars(args),
+            "mix": mix.__dict__,
+            "existing_notes": existing,
+            "ingest_cpu_mode": settings.INGEST_CPU_MODE,
+        },
+    }
+    await ingest_cpu.start()
+    try:
+        for mode in modes:
+            if mode == "validate":
+                results[mode] = run_validate(planner, args.batches, args.batch_size, args.warmup)
+                continue
+            if mode == "lanes":
+                results[mode] = await run_lanes(planner, args.batches, args.batch_size, args.warmup, lane_counts)
+                continue
+            runner = run_service if mode == "service" else run_webhook
+            results[mode] = await runner(planner, args.batches, args.batch_size, args.warmup)
+    finally:
+        ingest_cpu.shutdown()
+        if uses_db and not args.keep_data:
+            await cleanup(args.prefix)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batches", type=int, default=20, help="计时的批次数")
+    parser.add_argument("--batch-size", type=int, default=200, help="每批笔记数")
+    parser.add_argument("--warmup", type=int, default=1, help="不计时的预热批次数")
+    parser.add_argument("--mix", default="50:30:20", help="新笔记:重复:变化 的比例")
+    parser.add_argument("--keywords", type=int, default=50, help="启用的业务关键词数")
+    parser.add_argument("--keyword-hit-rate", type=float, default=0.1, help="正文命中关键词的笔记比例")
+    parser.add_argument("--text-length", type=int, default=200, help="正文长度（字符）")
+    parser.add_argument("--modes", default=",".join(MODES), help="service、webhook、lanes、validate，逗号分隔")
+    parser.add_argument("--lanes", default="1,2,4,8", help="lanes 模式测量的分区数，逗号分隔，第一个为基准")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--prefix", default=DEFAULT_PREFIX, help="基准数据 note_id 前缀")
+    parser.add_argument("--keep-data", action="store_true", help="结束后保留基准数据")
+    parser.add_argument("--output", help="结果 JSON 文件路径")
+    parser.add_argument("--compare", help="与之前保存的结果 JSON 对比")
+    args = parser.parse_args()
+
+    unknown = set(args.modes.split(",")) - set(MODES)
+    if unknown:
+        parser.error(f"未知模式: {', '.join(sorted(unknown))}")
+    try:
+        parse_lanes(args.lanes)
+    except ValueError as e:
+        parser.error(str(e))
+
+    results = asyncio.run(run(args))
+
+    for mode in ("service", "webhook"):
+        if mode not in results:
+            continue
+        result = results[mode]
+        latency = result["batch_latency"]
+        print(
+            f"{mode:<8} {result['notes_per_sec']:>9.1f} notes/s  "
+            f"p50 {latency['p50_ms']:>8.1f} ms  p99 {latency['p99_ms']:>8.1f} ms  "
+            f"{result['queries_per_note']:>6.2f} queries/note  peak RSS {result['peak_rss_mb']} MB"
+        )
+
+    for lanes, result in results.get("lanes", {}).items():
+        latency = result["batch_latency"]
+        print(
+            f"lanes {lanes:<3} {result['notes_per_sec']:>9.1f} notes/s  "
+            f"p50 {latency['p50_ms']:>8.1f} ms  p99 {latency['p99_ms']:>8.1f} ms  "
+            f"x{result['scaling']:.2f}"
+        )
+
+    for strategy, result in results.get("validate", {}).items():
+        latency = result["batch_latency"]
+        print(
+            f"validate {strategy:<10} {result['notes_per_sec']:>9.1f} notes/s  "
+            f"p50 {latency['p50_ms']:>8.1f} ms  p99 {latency['p99_ms']:>8.1f} ms"
+        )
+
+    if args.output:
+        write_results(args.output, results)
+    if args.compare:
+        lane_keys = [f"lanes.{lanes}.notes_per_sec" for lanes in results.get("lanes", {})]
+        for line in compare_results(args.compare, results, COMPARE_KEYS + lane_keys):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
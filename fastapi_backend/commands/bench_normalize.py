@@ -0,0 +1,96 @@
+"""
+回调笔记转换基准
+
+对比把回调中的原始笔记转换为入库数据的开销（不访问数据库）：
+- before: transform_note_data 构造扁平 dict -> XhsNoteData(**...)，只支持扁平格式
+- after:  compile_normalizer 生成的单次遍历转换，扁平格式和 note_card 原始格式（字符串计数）各测一次
+
+用法: python -m commands.bench_normalize --notes 10000 --repeat 5
+"""
+
+import argparse
+import time
+
+from app.schemas.notes import XhsNoteData
+from app.services.note_normalizer import normalize_notes
+from commands.synthetic import SyntheticNoteGenerator, default_keywords
+
+
+def transform_note_data(raw_data: dict) -> dict:
+    """原 webhook 中的转换函数，保留作为对比基线"""
+    transformed = {}
+    for key in ['note_id', 'note_url', 'note_type', 'title', 'desc', 'tags',
+                'upload_time', 'ip_location', 'video_cover',
+                'image_list', 'xsec_token']:
+        if key in raw_data:
+            transformed[key] = raw_data[key]
+
+    if 'author' in raw_data and isinstance(raw_data['author'], dict):
+        author = raw_data['author']
+        transformed['author_user_id'] = author.get('user_id')
+        transformed['author_nickname'] = author.get('nickname')
+        transformed['author_avatar'] = author.get('avatar')
+
+    if 'interact_info' in raw_data and isinstance(raw_data['interact_info'], dict):
+        interact = raw_data['interact_info']
+        transformed['liked_count'] = interact.get('liked_count', 0)
+        transformed['collected_count'] = interact.get('collected_count', 0)
+        transformed['comment_count'] = interact.get('comment_count', 0)
+        transformed['share_count'] = interact.get('share_count', 0)
+    else:
+        transformed['liked_count'] = raw_data.get('liked_count', 0)
+        transformed['collected_count'] = raw_data.get('collected_count', 0)
+        transformed['comment_count'] = raw_data.get('comment_count', 0)
+        transformed['share_count'] = raw_data.get('share_count', 0)
+
+    return transformed
+
+
+def build_before(items):
+    return [
+        XhsNoteData(**transform_note_data(item))
+        for item in items
+        if isinstance(item, dict) and "note_id" in item
+    ]
+
+
+def build_after(items):
+    return normalize_notes(items)
+
+
+def measure(fn, repeat):
+    fn()  # 预热
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=10000, help="每次转换的笔记数")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    generator = SyntheticNoteGenerator(seed=args.seed, keywords=default_keywords(50))
+    flat = [generator.raw_note(index) for index in range(args.notes)]
+    cards = [generator.note_card(index) for index in range(args.notes)]
+
+    results = [
+        ("before (flat)", measure(lambda: build_before(flat), args.repeat)),
+        ("after (flat)", measure(lambda: build_after(flat), args.repeat)),
+        ("after (note_card)", measure(lambda: build_after(cards), args.repeat)),
+    ]
+
+    print(f"notes: {args.notes}, repeat: {args.repeat}")
+    for name, seconds in results:
+        print(
+            f"{name:<18} {seconds * 1000:8.2f} ms  {seconds / args.notes * 1e6:6.2f} us/note  "
+            f"{args.notes / seconds:>10.0f} notes/s"
+        )
+    print(f"speedup (flat): {results[0][1] / results[1][1]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
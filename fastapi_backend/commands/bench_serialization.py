@@ -0,0 +1,121 @@
+"""
+笔记列表响应序列化基准
+
+对比两条路径的单行序列化开销（不访问数据库）：
+- before: ORM 行 -> XhsNoteResponse -> response_model 校验 -> JSONResponse
+- after:  列元组 -> dict -> orjson 字节
+
+用法: python -m commands.bench_serialization --rows 500 --repeat 50
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.core.serialization import json_dumps, rows_to_dicts
+from app.schemas.notes import NotesListResponse, XhsNoteResponse
+from app.services.xhs_async_service import NOTE_RESPONSE_FIELDS
+
+
+def make_rows(count: int):
+    now = datetime(2025, 7, 1, 12, 0, 0)
+    rows = []
+    for i in range(count):
+        rows.append((
+            uuid.uuid4(),
+            f"6{i:023x}",
+            f"https://www.xiaohongshu.com/explore/6{i:023x}",
+            "normal" if i % 3 else "video",
+            f"笔记标题 {i} 夏日穿搭分享",
+            "这是一段笔记正文，包含一些描述文字。" * 8,
+            f"作者{i % 97}",
+            i * 13 % 100000,
+            i * 7 % 3000,
+            ["new"] if i % 2 else ["new", "changed"],
+            i % 2 == 0,
+            i % 5 == 0,
+            i % 7 == 0,
+            False,
+            now - timedelta(days=i % 30),
+            now - timedelta(hours=i % 48),
+            [f"https://sns-img.xhscdn.com/{i}/{j}.jpg" for j in range(4)],
+            f"https://sns-avatar.xhscdn.com/{i % 97}.jpg",
+        ))
+    return rows
+
+
+def build_before(rows, field):
+    """原路径：逐行构造 XhsNoteResponse，再由 FastAPI 按 response_model 校验、序列化"""
+    notes = []
+    for row in rows:
+        note = SimpleNamespace(**dict(zip(NOTE_RESPONSE_FIELDS, row)))
+        notes.append(XhsNoteResponse(
+            id=str(note.id),
+            note_id=note.note_id,
+            note_url=note.note_url,
+            note_type=note.note_type,
+            title=note.title,
+            desc=note.desc,
+            author_nickname=note.author_nickname,
+            liked_count=note.liked_count,
+            comment_count=note.comment_count,
+            current_tags=note.current_tags,
+            is_new=note.is_new,
+            is_changed=note.is_changed,
+            is_important=note.is_important,
+            is_deleted=note.is_deleted,
+            first_crawl_time=note.first_crawl_time,
+            last_crawl_time=note.last_crawl_time,
+            image_list=note.image_list,
+            author_avatar=note.author_avatar,
+        ))
+    content = NotesListResponse(notes=notes, total=len(rows), page=1, size=len(rows))
+    serialized = asyncio.run(serialize_response(field=field, response_content=content))
+    return JSONResponse(serialized).body
+
+
+def build_after(rows):
+    """快速路径：列元组直接编码"""
+    return json_dumps({
+        "notes": rows_to_dicts(rows, NOTE_RESPONSE_FIELDS),
+        "total": len(rows),
+        "page": 1,
+        "size": len(rows),
+    })
+
+
+def measure(fn, repeat):
+    fn()  # 预热
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500, help="每页行数")
+    parser.add_argument("--repeat", type=int, default=50, help="重复次数")
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    field = create_model_field(name="Response_search_notes", type_=NotesListResponse, mode="serialization")
+
+    before = measure(lambda: build_before(rows, field), args.repeat)
+    after = measure(lambda: build_after(rows), args.repeat)
+
+    print(f"rows/page: {args.rows}, repeat: {args.repeat}")
+    print(f"before: {before * 1000:8.2f} ms/page  {before / args.rows * 1e6:8.2f} us/row")
+    print(f"after:  {after * 1000:8.2f} ms/page  {after / args.rows * 1e6:8.2f} us/row")
+    print(f"speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+基准测试公共工具：延迟分位数、峰值内存、结果保存与对比
+"""
+
+import json
+import platform
+import resource
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+
+def percentile(values: Sequence[float], p: float) -> float:
+    """线性插值分位数，p 取 0-100"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def latency_summary(seconds: Sequence[float]) -> Dict[str, float]:
+    """延迟统计（毫秒）"""
+    return {
+        "count": len(seconds),
+        "p50_ms": round(percentile(seconds, 50) * 1000, 2),
+        "p90_ms": round(percentile(seconds, 90) * 1000, 2),
+        "p99_ms": round(percentile(seconds, 99) * 1000, 2),
+        "max_ms": round(max(seconds, default=0.0) * 1000, 2),
+        "mean_ms": round(sum(seconds) / len(seconds) * 1000, 2) if seconds else 0.0,
+    }
+
+
+def peak_rss_mb() -> float:
+    """当前进程的峰值常驻内存（MB）；Linux 下 ru_maxrss 单位为 KB，macOS 为字节"""
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return round(usage / 1024 / 1024, 1)
+    return round(usage / 1024, 1)
+
+
+def run_metadata() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+
+
+def write_results(path: str, results: Dict[str, Any]) -> None:
+    Path(path).write_text(json.dumps(results, ensure_ascii=False, indent=2, default=str))
+    print(f"结果已保存到 {path}")
+
+
+def compare_results(baseline_path: str, current: Dict[str, Any], keys: List[str]) -> List[str]:
+    """
+    与基线结果对比，keys 为点分路径（如 "process_notes_batch.notes_per_sec"）
+
+    返回可直接打印的对比行。
+    """
+    baseline = json.loads(Path(baseline_path).read_text())
+    lines = []
+    for key in keys:
+        before = _lookup(baseline, key)
+        after = _lookup(current, key)
+        if not isinstance(before, (int, float)) or not isinstance(after, (int, float)):
+            continue
+        change = f"{(after - before) / before * 100:+.1f}%" if before else "n/a"
+        lines.append(f"{key:<50} {before:>12} -> {after:<12} {change}")
+    return lines
+
+
+def _lookup(data: Dict[str, Any], key: str) -> Optional[Any]:
+    for part in key.split("."):
+        if not isinstance(data, dict) or part not in data:
+            return None
+        data = data[part]
+    return data
@@ -0,0 +1,234 @@
+"""
+笔记表索引建议
+
+读取 GET /api/admin/query-shapes 导出的查询形态（可传多个 worker 的文件），
+按出现次数为每种形态推导一个候选索引：
+- 布尔列的等值条件（is_deleted = false、is_new = true 等）放进部分索引的 WHERE
+- is_new = true OR is_changed = true 这类并集拆成每个标志一个部分索引（BitmapOr）
+- 等值列在前，排序列（或范围列）在后
+- ilike 等无法用 B-tree 的条件单独列出；tags / current_tags 的 @>、?| 已由 GIN 索引覆盖
+
+与模型中已声明的索引比对，标出已覆盖的建议和重复/冗余的现有索引，并输出建索引 SQL。
+选定的索引写入 Alembic 迁移后，用 commands.loadtest_read --output / --compare 做前后对比。
+
+用法:
+  curl -H "Authorization: Bearer $TOKEN" http://localhost:8000/api/admin/query-shapes > shapes.json
+  python -m commands.index_advisor shapes.json --min-share 0.01
+"""
+
+import argparse
+import json
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.models.note import XhsNote
+
+EQUALITY_OPERATORS = {"=", "in"}
+RANGE_OPERATORS = {">", ">=", "<", "<="}
+GIN_OPERATORS = {"@>", "?|"}
+BOOLEAN_VALUES = {"true", "false"}
+
+
+@dataclass(frozen=True)
+class Term:
+    column: str
+    operator: str
+    value: Optional[str] = None
+
+    @classmethod
+    def parse(cls, text: str) -> "Term":
+        column, _, rest = text.partition(" ")
+        operator, _, value = rest.rpartition(" ")
+        if value in BOOLEAN_VALUES and operator:
+            return cls(column, operator, value)
+        return cls(column, rest)
+
+    @property
+    def is_flag(self) -> bool:
+        return self.operator == "=" and self.value in BOOLEAN_VALUES
+
+    def __str__(self) -> str:
+        return f"{self.column} {self.operator} {self.value}" if self.value else f"{self.column} {self.operator}"
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    columns: Tuple[str, ...]
+    where: Tuple[str, ...] = ()
+    name: Optional[str] = None
+
+    def covers(self, other: "IndexSpec") -> bool:
+        """本索引能否服务 other 的查询：列是其前缀扩展，且部分索引条件是其子集"""
+        return self.columns[:len(other.columns)] == other.columns and set(self.where) <= set(other.where)
+
+    def default_name(self) -> str:
+        flags = [term.split(" ")[0] for term in self.where if term != "is_deleted = false"]
+        prefix = "idx_note_live" if "is_deleted = false" in self.where else "idx_note"
+        return "_".join([prefix, *flags, *self.columns])
+
+    def sql(self, table: str) -> str:
+        statement = f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {self.name or self.default_name()} ON {table} ({', '.join(self.columns)})"
+        if self.where:
+            statement += f" WHERE {' AND '.join(self.where)}"
+        return statement + ";"
+
+
+@dataclass
+class Proposal:
+    index: IndexSpec
+    weight: int = 0
+    shapes: List[Dict[str, Any]] = field(default_factory=list)
+    covered_by: Optional[str] = None
+
+
+def load_shapes(paths: Iterable[str]) -> List[Dict[str, Any]]:
+    """读取并合并多个形态文件，相同形态的次数相加"""
+    merged: Dict[Tuple, Dict[str, Any]] = {}
+    for path in paths:
+        data = json.loads(Path(path).read_text())
+        for shape in data["shapes"] if isinstance(data, dict) else data:
+            key = (shape["kind"], tuple(shape["predicates"]), tuple(shape.get("order", [])))
+            if key in merged:
+                merged[key]["count"] += shape["count"]
+            else:
+                merged[key] = {**shape}
+    return sorted(merged.values(), key=lambda shape: shape["count"], reverse=True)
+
+
+def candidate_indexes(shape: Dict[str, Any]) -> Tuple[List[IndexSpec], List[str]]:
+    """
+    为单个形态推导候选索引
+
+    返回 (候选索引列表, 无法用 B-tree 索引的谓词)。并集条件拆成多个候选，各自都需要。
+    """
+    where: List[str] = []
+    equality: List[str] = []
+    ranges: List[str] = []
+    unindexed: List[str] = []
+    union_flags: List[str] = []
+
+    for predicate in shape["predicates"]:
+        terms = [Term.parse(part) for part in predicate.split(" OR ")]
+        if len(terms) > 1:
+            if all(term.is_flag for term in terms):
+                union_flags = [str(term) for term in terms]
+            else:
+                unindexed.append(predicate)
+            continue
+        term = terms[0]
+        if term.is_flag:
+            where.append(str(term))
+        elif term.operator in EQUALITY_OPERATORS:
+            equality.append(term.column)
+        elif term.operator in RANGE_OPERATORS:
+            ranges.append(term.column)
+        elif term.operator not in GIN_OPERATORS:
+            unindexed.append(predicate)
+
+    order_columns = [item.split(" ")[0] for item in shape.get("order", [])]
+    key = list(dict.fromkeys(equality + (order_columns or ranges[:1])))
+    if not key:
+        return [], unindexed
+
+    wheres = [sorted(where + [flag]) for flag in union_flags] or [sorted(where)]
+    return [IndexSpec(tuple(key), tuple(clause)) for clause in wheres], unindexed
+
+
+def existing_indexes(model=XhsNote) -> List[IndexSpec]:
+    """模型中声明的 B-tree 索引（含列上的 index=True / unique=True）"""
+    specs = []
+    for index in model.__table__.indexes:
+        if index.dialect_options["postgresql"].get("using"):
+            continue
+        where = index.dialect_options["postgresql"].get("where")
+        clauses = tuple(sorted(str(where).split(" AND "))) if where is not None else ()
+        specs.append(IndexSpec(tuple(column.name for column in index.columns), clauses, index.name))
+    return specs
+
+
+def redundant_indexes(indexes: List[IndexSpec]) -> List[Tuple[IndexSpec, IndexSpec]]:
+    """返回 (冗余索引, 可替代它的索引)：列相同或为前缀、部分条件相同"""
+    pairs = []
+    for index in indexes:
+        for other in indexes:
+            if other is index or other.where != index.where:
+                continue
+            if other.columns[:len(index.columns)] != index.columns:
+                continue
+            # 完全相同时只报告名字靠后的那个
+            if other.columns == index.columns and (other.name or "") > (index.name or ""):
+                continue
+            pairs.append((index, other))
+            break
+    return pairs
+
+
+def propose_indexes(shapes: List[Dict[str, Any]], existing: List[IndexSpec]) -> Tuple[List[Proposal], Dict[str, int]]:
+    """合并所有形态的候选索引，按覆盖的查询次数排序"""
+    proposals: Dict[IndexSpec, Proposal] = {}
+    unindexed: Dict[str, int] = defaultdict(int)
+    for shape in shapes:
+        candidates, skipped = candidate_indexes(shape)
+        for predicate in skipped:
+            unindexed[predicate] += shape["count"]
+        for spec in candidates:
+            proposal = proposals.setdefault(spec, Proposal(spec))
+            proposal.weight += shape["count"]
+            proposal.shapes.append(shape)
+
+    # 优先匹配部分条件更多（更精确）的现有索引
+    existing = sorted(existing, key=lambda index: len(index.where), reverse=True)
+    for proposal in proposals.values():
+        for index in existing:
+            if index.covers(proposal.index):
+                proposal.covered_by = index.name
+                break
+    ordered = sorted(proposals.values(), key=lambda proposal: proposal.weight, reverse=True)
+    return ordered, dict(unindexed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="+", help="query-shapes 导出的 JSON 文件")
+    parser.add_argument("--min-share", type=float, default=0.01, help="忽略占比低于该值的建议")
+    args = parser.parse_args()
+
+    shapes = load_shapes(args.files)
+    total = sum(shape["count"] for shape in shapes) or 1
+    existing = existing_indexes()
+    proposals, unindexed = propose_indexes(shapes, existing)
+
+    print(f"共 {len(shapes)} 种查询形态，{total} 次查询\n")
+    print("建议索引:")
+    missing = []
+    for proposal in proposals:
+        share = proposal.weight / total
+        if share < args.min_share:
+            continue
+        status = f"已有 {proposal.covered_by}" if proposal.covered_by else "缺失"
+        where = f" WHERE {' AND '.join(proposal.index.where)}" if proposal.index.where else ""
+        print(f"  {share:6.1%}  ({', '.join(proposal.index.columns)}){where}  [{status}]")
+        if not proposal.covered_by:
+            missing.append(proposal.index)
+
+    if unindexed:
+        print("\n无法使用 B-tree 索引的条件（考虑 pg_trgm 或改写查询）:")
+        for predicate, count in sorted(unindexed.items(), key=lambda item: item[1], reverse=True):
+            print(f"  {count / total:6.1%}  {predicate}")
+
+    redundant = redundant_indexes(existing)
+    if redundant:
+        print("\n冗余的现有索引:")
+        for index, other in redundant:
+            print(f"  {index.name} ({', '.join(index.columns)}) 可由 {other.name} 替代")
+
+    if missing:
+        print("\n-- 缺失索引的建索引语句")
+        for spec in missing:
+            print(spec.sql(XhsNote.__tablename__))
+
+
+if __name__ == "__main__":
+    main()
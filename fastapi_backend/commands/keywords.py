@@ -0,0 +1,86 @@
+"""
+关键词批量导入导出
+
+导入文件格式同 GET /api/keywords/export 的导出文件（CSV / JSON / NDJSON，按扩展名识别），
+已存在的关键词按文件内容更新。导入后运行中的服务在注册表过期
+（KEYWORD_REGISTRY_MAX_AGE_SECONDS）后加载新数据；需要立即生效时改用 POST /api/keywords/bulk。
+
+用法:
+  python -m commands.keywords import keywords.csv
+  python -m commands.keywords export keywords.ndjson
+  python -m commands.keywords export - --format csv > keywords.csv
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+from app.database import async_session_maker
+from app.schemas.keywords import KeywordFileFormat
+from app.services.keyword_bulk import (
+    ENCODERS,
+    KeywordImportError,
+    format_from_filename,
+    parse_keywords,
+    stream_keyword_rows,
+    upsert_keywords,
+)
+
+
+def resolve_format(args: argparse.Namespace) -> KeywordFileFormat:
+    format = args.format or format_from_filename(args.file)
+    if format is None:
+        sys.exit("无法识别文件格式，请指定 --format（csv / json / ndjson）")
+    return format
+
+
+async def import_keywords(args: argparse.Namespace) -> None:
+    format = resolve_format(args)
+    try:
+        items = parse_keywords(Path(args.file).read_bytes(), format)
+    except KeywordImportError as e:
+        sys.exit(f"导入失败: {e}")
+    async with async_session_maker() as db:
+        counts = await upsert_keywords(db, items) if items else {"total": 0, "created": 0, "updated": 0, "unchanged": 0}
+        if args.dry_run:
+            await db.rollback()
+        else:
+            await db.commit()
+    prefix = "[dry-run] " if args.dry_run else ""
+    print(f"{prefix}共 {counts['total']} 个关键词: 新建 {counts['created']}，更新 {counts['updated']}，未变化 {counts['unchanged']}")
+
+
+async def export_keywords(args: argparse.Namespace) -> None:
+    format = args.format or format_from_filename(args.file) or KeywordFileFormat.CSV
+    output = sys.stdout.buffer if args.file == "-" else open(args.file, "wb")
+    try:
+        async with async_session_maker() as db:
+            async for chunk in ENCODERS[format](stream_keyword_rows(db)):
+                output.write(chunk)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="从文件批量导入关键词")
+    import_parser.add_argument("file", help="CSV / JSON / NDJSON 文件")
+    import_parser.add_argument("--format", type=KeywordFileFormat, help="文件格式（默认按扩展名判断）")
+    import_parser.add_argument("--dry-run", action="store_true", help="只统计结果，回滚不写入")
+    import_parser.set_defaults(handler=import_keywords)
+
+    export_parser = subparsers.add_parser("export", help="导出全部关键词")
+    export_parser.add_argument("file", help="输出文件，- 表示标准输出")
+    export_parser.add_argument("--format", type=KeywordFileFormat, help="文件格式（默认按扩展名判断，否则 csv）")
+    export_parser.set_defaults(handler=export_keywords)
+
+    args = parser.parse_args()
+    asyncio.run(args.handler(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""
+读接口压测
+
+按固定速率（开环，不因响应变慢而降低发送速率）回放看板的读请求组合：
+/api/notes（分页、筛选 DSL、排序、关键词、稀疏字段）、/api/notes/stats、/api/tasks 等，
+按查询形状和路由输出延迟分位数。
+
+- latency: 从计划发送时间到收到响应，包含客户端排队，能反映过载时的真实等待
+- service: 从实际发送到收到响应
+
+默认在进程内通过 ASGI 调用应用（压测客户端与应用共享事件循环，结果偏保守）；
+指定 --base-url 时请求本地运行的 uvicorn。
+--seed-notes 会先用 COPY 写入合成笔记（note_id 以 --prefix 开头），请勿在生产库上运行。
+
+查询组合可通过 --mix-file 指定 JSON 文件，格式为：
+[{"name": "notes_default", "path": "/api/notes/", "weight": 30, "params": {"page": [1, 2, 3], "size": 50}}]
+params 中的列表表示从中随机取值，取到的非字符串值（如 filters 数组）会编码为 JSON。
+
+用法: python -m commands.loadtest_read --seed-notes 1000000 --rps 50 --duration 60 --output read.json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlencode
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import JSON, delete
+
+from app.core.serialization import json_dumps_str
+from app.database import async_session_maker, engine
+from app.models.note import XhsNote
+from commands.benchmark import (
+    compare_results,
+    latency_summary,
+    peak_rss_mb,
+    run_metadata,
+    write_results,
+)
+from commands.synthetic import SyntheticNoteGenerator
+
+DEFAULT_PREFIX = "lt"
+COPY_CHUNK_SIZE = 10000
+# 合成笔记的最后爬取时间分布在最近 30 天内
+CRAWL_TIME_SPREAD_MINUTES = 30 * 24 * 60
+
+
+# 看板的典型请求组合
+DEFAULT_MIX: List[Dict[str, Any]] = [
+    {"name": "notes_default", "path": "/api/notes/", "weight": 25, "params": {"page": [1, 1, 1, 2, 3], "size": 50}},
+    {"name": "notes_today", "path": "/api/notes/", "weight": 10, "params": {"today_only": "true", "size": 50}},
+    {"name": "notes_flags", "path": "/api/notes/", "weight": 10, "params": {
+        "is_important": "true", "is_changed": ["true", "false"], "size": 50,
+    }},
+    {"name": "notes_new_or_changed", "path": "/api/notes/", "weight": 6, "params": {
+        "is_new": "true", "is_changed": "true", "size": 50,
+    }},
+    {"name": "notes_author", "path": "/api/notes/", "weight": 4, "params": {
+        "author_user_id": [f"u{index:023x}" for index in (7, 42, 1234, 4321)], "size": 50,
+    }},
+    {"name": "notes_keyword", "path": "/api/notes/", "weight": 8, "params": {"keyword": ["穿搭", "护肤", "露营"], "size": 20}},
+    {"name": "notes_filter_dsl", "path": "/api/notes/", "weight": 12, "params": {
+        "filters": [
+            [
+                {"id": "liked_count", "value": "500", "operator": "gte", "variant": "number"},
+                {"id": "note_type", "value": "video", "operator": "eq"},
+            ],
+            [{"id": "ip_location", "value": ["上海", "北京"], "operator": "inArray", "variant": "multiSelect"}],
+            [{"id": "title", "value": "夏日", "operator": "iLike"}],
+        ],
+        "size": 50,
+    }},
+    {"name": "notes_sorted", "path": "/api/notes/", "weight": 8, "params": {
+        "sort": [[{"id": "liked_count", "desc": True}], [{"id": "comment_count", "desc": True}]],
+        "size": 50,
+    }},
+    {"name": "notes_deep_page", "path": "/api/notes/", "weight": 4, "params": {"page": [50, 100, 200], "size": 50}},
+    {"name": "notes_table_fields", "path": "/api/notes/", "weight": 8, "params": {
+        "fields": "title,author_nickname,liked_count,comment_count,is_important,last_crawl_time", "size": 100,
+    }},
+    {"name": "notes_stats", "path": "/api/notes/stats", "weight": 8, "params": {}},
+    {"name": "tasks_list", "path": "/api/tasks/", "weight": 4, "params": {"page": 1, "size": 10}},
+    {"name": "tasks_stats", "path": "/api/tasks/stats", "weight": 3, "params": {}},
+]
+
+
+@dataclass
+class QueryShape:
+    name: str
+    path: str
+    weight: float = 1
+    params: Dict[str, Any] = field(default_factory=dict)
+
+    def build_url(self, rng: random.Random) -> str:
+        query = {}
+        for key, value in self.params.items():
+            if isinstance(value, list):
+                value = rng.choice(value)
+            if isinstance(value, (list, dict)):
+                value = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+            query[key] = value
+        return f"{self.path}?{urlencode(query)}" if query else self.path
+
+
+@dataclass
+class Sample:
+    shape: str
+    route: str
+    status: int
+    latency: float
+    service: float
+
+
+def load_mix(path: Optional[str]) -> List[QueryShape]:
+    mix = json.loads(Path(path).read_text()) if path else DEFAULT_MIX
+    return [QueryShape(**item) for item in mix]
+
+
+def _copy_value(column, value: Any) -> Any:
+    if value is not None and isinstance(column.type, JSON):
+        return json_dumps_str(value)
+    return value
+
+
+async def seed_notes(generator: SyntheticNoteGenerator, count: int) -> None:
+    """用 COPY 批量写入合成笔记，完成后 ANALYZE，使执行计划基于真实的数据分布"""
+    columns = list(XhsNote.__table__.columns)
+    names = [column.name for column in columns]
+    now = datetime.utcnow()
+    started_at = time.perf_counter()
+
+    async with engine.connect() as conn:
+        raw_connection = (await conn.get_raw_connection()).driver_connection
+        for start in range(0, count, COPY_CHUNK_SIZE):
+            records = []
+            for index in range(start, min(start + COPY_CHUNK_SIZE, count)):
+                crawl_time = now - timedelta(minutes=(index * 37) % CRAWL_TIME_SPREAD_MINUTES)
+                row = generator.note_row(index, crawl_time=crawl_time)
+                row.update(id=uuid.uuid4(), created_at=row["first_crawl_time"], updated_at=crawl_time)
+                records.append(tuple(_copy_value(column, row.get(column.name)) for column in columns))
+            await raw_connection.copy_records_to_table(XhsNote.__tablename__, records=records, columns=names)
+            print(f"已写入 {min(start + COPY_CHUNK_SIZE, count)}/{count} 条笔记")
+        await raw_connection.execute(f"ANALYZE {XhsNote.__tablename__}")
+
+    print(f"写入完成，用时 {time.perf_counter() - started_at:.1f}s")
+
+
+async def cleanup(prefix: str) -> None:
+    async with async_session_maker() as db:
+        await db.execute(delete(XhsNote).where(XhsNote.note_id.like(f"{prefix}%")))
+        await db.commit()
+
+
+async def run_load(
+    client: AsyncClient,
+    shapes: List[QueryShape],
+    rps: float,
+    duration: float,
+    concurrency: int,
+    revalidate: float,
+    rng: random.Random,
+) -> List[Sample]:
+    """
+    开环发送请求：第 i 个请求计划在 i / rps 秒发出，并发上限由 concurrency 控制
+
+    revalidate 为携带上次 ETag 的比例，模拟看板轮询时的条件请求。
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    etags: Dict[str, str] = {}
+    samples: List[Sample] = []
+    weights = [shape.weight for shape in shapes]
+
+    async def send(shape: QueryShape, url: str, scheduled_at: float) -> None:
+        async with semaphore:
+            headers = {}
+            if url in etags and rng.random() < revalidate:
+                headers["If-None-Match"] = etags[url]
+            sent_at = time.perf_counter()
+            try:
+                response = await client.get(url, headers=headers)
+                status = response.status_code
+                if response.headers.get("etag"):
+                    etags[url] = response.headers["etag"]
+            except Exception:
+                status = 0
+            finished_at = time.perf_counter()
+            samples.append(Sample(shape.name, shape.path, status, finished_at - scheduled_at, finished_at - sent_at))
+
+    tasks = []
+    started_at = time.perf_counter()
+    for i in range(int(rps * duration)):
+        scheduled_at = started_at + i / rps
+        delay = scheduled_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        shape = rng.choices(shapes, weights)[0]
+        tasks.append(asyncio.create_task(send(shape, shape.build_url(rng), scheduled_at)))
+    await asyncio.gather(*tasks)
+    return samples
+
+
+def summarize(samples: List[Sample], key: str, elapsed: float) -> Dict[str, Any]:
+    groups: Dict[str, List[Sample]] = defaultdict(list)
+    for sample in samples:
+        groups[getattr(sample, key)].append(sample)
+
+    report = {}
+    for name, items in sorted(groups.items()):
+        report[name] = {
+            "requests": len(items),
+            "rps": round(len(items) / elapsed, 2) if elapsed else 0.0,
+            "errors": sum(1 for item in items if item.status == 0 or item.status >= 400),
+            "not_modified": sum(1 for item in items if item.status == 304),
+            "latency": latency_summary([item.latency for item in items]),
+            "service": latency_summary([item.service for item in items]),
+        }
+    return report
+
+
+def print_report(title: str, report: Dict[str, Any]) -> None:
+    print(f"\n{title}")
+    print(f"{'':<22} {'req':>6} {'err':>5} {'304':>5} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}  (ms)")
+    for name, item in report.items():
+        latency = item["latency"]
+        print(
+            f"{name:<22} {item['requests']:>6} {item['errors']:>5} {item['not_modified']:>5} "
+            f"{latency['p50_ms']:>9.1f} {latency['p90_ms']:>9.1f} {latency['p99_ms']:>9.1f} {latency['max_ms']:>9.1f}"
+        )
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    shapes = load_mix(args.mix_file)
+
+    if args.cleanup:
+        await cleanup(args.prefix)
+    if args.seed_notes:
+        await seed_notes(SyntheticNoteGenerator(seed=args.seed, prefix=args.prefix), args.seed_notes)
+
+    if args.base_url:
+        client = AsyncClient(base_url=args.base_url, timeout=args.timeout)
+    else:
+        from app.main import app
+
+        client = AsyncClient(transport=ASGITransport(app=app), base_url="http://loadtest", timeout=args.timeout)
+
+    rng = random.Random(args.seed)
+    async with client:
+        started_at = time.perf_counter()
+        samples = await run_load(client, shapes, args.rps, args.duration, args.concurrency, args.revalidate, rng)
+        elapsed = time.perf_counter() - started_at
+
+    return {
+        "meta": run_metadata(),
+        "config": vars(args),
+        "elapsed_sec": round(elapsed, 2),
+        "requests": len(samples),
+        "achieved_rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "overall": latency_summary([sample.latency for sample in samples]),
+        "peak_rss_mb": peak_rss_mb(),
+        "by_shape": summarize(samples, "shape", elapsed),
+        "by_route": summarize(samples, "route", elapsed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed-notes", type=int, default=0, help="压测前写入的合成笔记数，0 表示使用现有数据")
+    parser.add_argument("--cleanup", action="store_true", help="写入前删除上次写入的合成笔记")
+    parser.add_argument("--prefix", default=DEFAULT_PREFIX, help="合成笔记 note_id 前缀")
+    parser.add_argument("--rps", type=float, default=20, help="目标每秒请求数")
+    parser.add_argument("--duration", type=float, default=30, help="压测时长（秒）")
+    parser.add_argument("--concurrency", type=int, default=64, help="最大并发请求数")
+    parser.add_argument("--revalidate", type=float, default=0.3, help="携带 If-None-Match 的请求比例")
+    parser.add_argument("--mix-file", help="查询组合 JSON 文件，默认使用内置的看板组合")
+    parser.add_argument("--base-url", help="请求本地运行的服务，如 http://127.0.0.1:8000；默认进程内调用")
+    parser.add_argument("--timeout", type=float, default=30, help="单个请求超时（秒）")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--output", help="结果 JSON 文件路径")
+    parser.add_argument("--compare", help="与之前保存的结果 JSON 对比")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    print(f"\n{results['requests']} 个请求，实际 {results['achieved_rps']} req/s，目标 {args.rps} req/s")
+    print_report("按查询形状", results["by_shape"])
+    print_report("按路由", results["by_route"])
+
+    if args.output:
+        write_results(args.output, results)
+    if args.compare:
+        keys = ["achieved_rps", "overall.p50_ms", "overall.p99_ms"] + [
+            f"by_shape.{name}.latency.{metric}"
+            for name in results["by_shape"]
+            for metric in ("p50_ms", "p99_ms")
+        ]
+        for line in compare_results(args.compare, results, keys):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+合成笔记数据生成器
+
+供基准测试和压测使用，按序号确定性地生成笔记，同一序号、同一版本每次生成的内容相同：
+- raw_note(): 爬虫回调的扁平格式（author / interact_info 嵌套），用于 webhook 接口
+- note_card(): 搜索结果原始格式（note_card 嵌套，互动数据为字符串），与 raw_note() 内容相同
+- note_data(): 转换后的 XhsNoteData，用于直接调用 process_notes_batch
+- note_row(): xhs_notes 表的行，用于批量预置数据
+"""
+
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.models.note import NoteTag
+from app.schemas.notes import XhsNoteData
+
+# 基准数据的 note_id 前缀，便于清理；真实 note_id 为 24 位十六进制
+DEFAULT_PREFIX = "be"
+
+_WORDS = (
+    "夏日", "穿搭", "分享", "好物", "推荐", "护肤", "测评", "平价", "通勤", "旅行",
+    "攻略", "美食", "探店", "家居", "收纳", "健身", "减脂", "读书", "笔记", "露营",
+)
+_NOTE_TYPES = ("normal", "normal", "normal", "video")
+_IP_LOCATIONS = ("上海", "北京", "广东", "浙江", "四川", "江苏")
+
+
+def default_keywords(count: int) -> List[str]:
+    return [f"基准词{i:03d}" for i in range(count)]
+
+
+@dataclass
+class NoteMix:
+    """一个批次中新笔记、重复爬取（无变化）和有变化笔记的比例"""
+    new: float = 0.5
+    repeat: float = 0.3
+    changed: float = 0.2
+
+    @classmethod
+    def parse(cls, spec: str) -> "NoteMix":
+        """解析 "new:repeat:changed" 形式的比例，如 "50:30:20" """
+        parts = [float(part) for part in spec.split(":")]
+        if len(parts) != 3 or sum(parts) <= 0 or min(parts) < 0:
+            raise ValueError(f"无效的比例: {spec}")
+        total = sum(parts)
+        return cls(*(part / total for part in parts))
+
+    def split(self, size: int) -> Dict[str, int]:
+        new = round(size * self.new)
+        changed = round(size * self.changed)
+        return {"new": new, "changed": changed, "repeat": max(size - new - changed, 0)}
+
+
+def _count_text(count: int) -> str:
+    return f"{count / 10000:.1f}万" if count >= 10000 else str(count)
+
+
+class SyntheticNoteGenerator:
+    def __init__(
+        self,
+        seed: int = 0,
+        prefix: str = DEFAULT_PREFIX,
+        keywords: Sequence[str] = (),
+        keyword_hit_rate: float = 0.1,
+        text_length: int = 200,
+        images: int = 4,
+    ) -> None:
+        self.seed = seed
+        self.prefix = prefix
+        self.keywords = list(keywords)
+        self.keyword_hit_rate = keyword_hit_rate
+        self.text_length = text_length
+        self.images = images
+
+    def note_id(self, index: int) -> str:
+        return f"{self.prefix}{index:0{24 - len(self.prefix)}x}"
+
+    def _rng(self, index: int, version: int = 0) -> random.Random:
+        return random.Random(f"{self.seed}:{index}:{version}")
+
+    def _text(self, rng: random.Random, length: int) -> str:
+        parts: List[str] = []
+        size = 0
+        while size < length:
+            word = rng.choice(_WORDS)
+            parts.append(word)
+            size += len(word)
+        return "".join(parts)[:length]
+
+    def raw_note(self, index: int, version: int = 0) -> Dict[str, Any]:
+        """
+        爬虫回调格式的笔记
+
+        version 只影响互动数据：版本号增加时评论数变化，处理时会被识别为“有变化”。
+        标题、正文和是否命中关键词只由序号决定。
+        """
+        rng = self._rng(index)
+        note_id = self.note_id(index)
+        title = self._text(rng, 12)
+        desc = self._text(rng, self.text_length)
+        if self.keywords and rng.random() < self.keyword_hit_rate:
+            keyword = rng.choice(self.keywords)
+            position = rng.randrange(len(desc) + 1)
+            desc = desc[:position] + keyword + desc[position:]
+
+        author_index = rng.randrange(5000)
+        liked = rng.randrange(900)
+        counts = self._rng(index, version)
+        return {
+            "note_id": note_id,
+            "note_url": f"https://www.xiaohongshu.com/explore/{note_id}",
+            "note_type": rng.choice(_NOTE_TYPES),
+            "title": title,
+            "desc": desc,
+            "tags": rng.sample(_WORDS, 3),
+            "upload_time": (datetime(2025, 1, 1) + timedelta(minutes=index)).isoformat(),
+            "ip_location": rng.choice(_IP_LOCATIONS),
+            "image_list": [f"https://sns-img.xhscdn.com/{note_id}/{i}.jpg" for i in range(self.images)],
+            "xsec_token": f"token{index}",
+            "author": {
+                "user_id": f"u{author_index:023x}",
+                "nickname": f"作者{author_index}",
+                "avatar": f"https://sns-avatar.xhscdn.com/{author_index}.jpg",
+            },
+            "interact_info": {
+                "liked_count": liked + version,
+                "collected_count": rng.randrange(400),
+                "comment_count": rng.randrange(90) + version,
+                "share_count": counts.randrange(50),
+            },
+        }
+
+    def note_card(self, index: int, version: int = 0) -> Dict[str, Any]:
+        """搜索结果原始格式的同一笔记，计数按爬虫返回的字符串格式（一万以上为 "1.2万"）"""
+        raw = self.raw_note(index, version)
+        author = raw["author"]
+        interact = raw["interact_info"]
+        return {
+            "id": raw["note_id"],
+            "model_type": "note",
+            "xsec_token": raw["xsec_token"],
+            "note_card": {
+                "type": raw["note_type"],
+                "display_title": raw["title"],
+                "desc": raw["desc"],
+                "tag_list": [{"name": tag} for tag in raw["tags"]],
+                "time": int(datetime.fromisoformat(raw["upload_time"]).replace(tzinfo=timezone.utc).timestamp() * 1000),
+                "ip_location": raw["ip_location"],
+                "user": {
+                    "user_id": author["user_id"],
+                    "nick_name": author["nickname"],
+                    "avatar": author["avatar"],
+                    "xsec_token": f"user{index}",
+                },
+                "interact_info": {
+                    "liked": False,
+                    "liked_count": _count_text(interact["liked_count"]),
+                    "collected": False,
+                    "collected_count": _count_text(interact["collected_count"]),
+                    "comment_count": _count_text(interact["comment_count"]),
+                    "shared_count": _count_text(interact["share_count"]),
+                },
+                "cover": {"height": 2560, "width": 1920, "url_default": raw["image_list"][0] if raw["image_list"] else None},
+                "image_list": [
+                    {
+                        "height": 2560,
+                        "width": 1920,
+                        "info_list": [
+                            {"image_scene": "WB_PRV", "url": f"{url}?prv"},
+                            {"image_scene": "WB_DFT", "url": url},
+                        ],
+                    }
+                    for url in raw["image_list"]
+                ],
+                "corner_tag_info": [{"type": "publish_time", "text": "8小时前"}],
+            },
+        }
+
+    def note_data(self, index: int, version: int = 0) -> XhsNoteData:
+        from app.services.note_normalizer import normalize_note
+
+        return XhsNoteData(**normalize_note(self.raw_note(index, version))._asdict())
+
+    def note_row(self, index: int, version: int = 0, crawl_time: Optional[datetime] = None) -> Dict[str, Any]:
+        """xhs_notes 表的一行，crawl_time 默认为两天前，使下次处理走每日变化检测"""
+        raw = self.raw_note(index, version)
+        interact = raw["interact_info"]
+        author = raw["author"]
+        crawl_time = crawl_time or datetime.utcnow() - timedelta(days=2)
+        rng = self._rng(index)
+        return {
+            "note_id": raw["note_id"],
+            "note_url": raw["note_url"],
+            "note_type": raw["note_type"],
+            "author_user_id": author["user_id"],
+            "author_nickname": author["nickname"],
+            "author_avatar": author["avatar"],
+            "title": raw["title"],
+            "desc": raw["desc"],
+            "tags": raw["tags"],
+            "upload_time": datetime.fromisoformat(raw["upload_time"]),
+            "ip_location": raw["ip_location"],
+            "liked_count": interact["liked_count"],
+            "collected_count": interact["collected_count"],
+            "comment_count": interact["comment_count"],
+            "share_count": interact["share_count"],
+            "image_list": raw["image_list"],
+            "is_new": False,
+            "is_changed": rng.random() < 0.2,
+            "is_important": rng.random() < 0.1,
+            "is_deleted": False,
+            "current_tags": [NoteTag.NEW.value],
+            "first_crawl_time": crawl_time - timedelta(days=rng.randrange(30)),
+            "last_crawl_time": crawl_time,
+            "crawl_count": 1,
+        }
+
+
+class BatchPlanner:
+    """
+    按比例规划批次
+
+    已存在的笔记（序号 0..existing-1）需预先写入数据库；每个批次从中取出未使用过的序号
+    作为重复 / 变化笔记，保证每批都走“今日首次爬取”的变化检测路径。
+    新笔记从 existing 之后顺序分配。
+    """
+
+    def __init__(self, generator: SyntheticNoteGenerator, mix: NoteMix, existing: int) -> None:
+        self.generator = generator
+        self.mix = mix
+        self.existing = existing
+        self._next_existing = 0
+        self._next_new = existing
+
+    @staticmethod
+    def existing_needed(mix: NoteMix, batch_size: int, batches: int) -> int:
+        split = mix.split(batch_size)
+        return (split["repeat"] + split["changed"]) * batches
+
+    def _take_existing(self, count: int) -> range:
+        start = self._next_existing
+        if start + count > self.existing:
+            raise ValueError("预置的已有笔记不足，请增大 existing")
+        self._next_existing += count
+        return range(start, start + count)
+
+    def next_batch(self, size: int, raw: bool = False) -> List[Any]:
+        split = self.mix.split(size)
+        plan = [(index, 0) for index in self._take_existing(split["repeat"])]
+        plan += [(index, 1) for index in self._take_existing(split["changed"])]
+        plan += [(index, 0) for index in range(self._next_new, self._next_new + split["new"])]
+        self._next_new += split["new"]
+        random.Random(f"{self.generator.seed}:{self._next_new}").shuffle(plan)
+
+        if raw:
+            return [self.generator.raw_note(index, version) for index, version in plan]
+        return [self.generator.note_data(index, version) for index, version in plan]
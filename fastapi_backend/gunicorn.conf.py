@@ -0,0 +1,40 @@
+"""
+生产环境 gunicorn 配置：gunicorn 作为进程管理器，每个 worker 运行一个 uvicorn 事件循环
+
+用法: gunicorn app.main:app -c gunicorn.conf.py
+
+- worker 数默认等于 CPU 核数（异步 worker 每核一个即可），可用 WEB_CONCURRENCY 覆盖
+- 每个 worker 处理 MAX_REQUESTS（加随机抖动）个请求后平滑重启，避免内存缓慢增长
+- kill -HUP <master pid> 平滑重载：先启动新 worker，再让旧 worker 处理完在途请求后退出
+- 多个 worker 时默认 PUBSUB_BACKEND=postgres，任务事件和数据版本经 LISTEN/NOTIFY 在 worker 间同步；
+  定时归档等单例任务由咨询锁保证只在一个 worker 中运行（见 app.core.coordination）
+"""
+
+import multiprocessing
+import os
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "0")) or multiprocessing.cpu_count()
+# 供应用按 worker 数均分默认资源（如 INGEST_CPU_WORKERS=0 时的入库进程池）
+os.environ["WEB_CONCURRENCY"] = str(workers)
+worker_class = "app.workers.UvicornWorker"
+
+# 不预加载应用：engine 连接池和事件循环必须在各 worker 进程内创建，不能跨 fork 共享
+preload_app = False
+
+max_requests = int(os.getenv("MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "1000"))
+
+# 后台入库任务在响应后继续执行，给足时间完成
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "60"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+
+# 访问日志由应用的 JSON 日志和 /metrics 负责
+accesslog = None
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info").lower()
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+if workers > 1:
+    os.environ.setdefault("PUBSUB_BACKEND", "postgres")
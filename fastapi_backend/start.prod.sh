@@ -7,6 +7,7 @@ set -e
 echo "Running database migrations..."
 uv run alembic upgrade head
 
-# Start the application using uvicorn
+# Start the application: gunicorn supervises uvicorn workers (see gunicorn.conf.py).
+# WEB_CONCURRENCY sets the worker count (default: CPU count).
 echo "Starting application..."
-uv run uvicorn app.main:app --host 0.0.0.0 --port 8000 
\ No newline at end of file
+exec uv run gunicorn app.main:app -c gunicorn.conf.py
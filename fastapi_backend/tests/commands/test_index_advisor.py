@@ -0,0 +1,75 @@
+from app.core.query_shapes import QueryShapeRecorder
+from app.services.xhs_async_service import XhsDataService
+from commands.index_advisor import IndexSpec, candidate_indexes, existing_indexes, propose_indexes, redundant_indexes
+
+
+def record_shapes(monkeypatch):
+    recorder = QueryShapeRecorder()
+    monkeypatch.setattr("app.services.xhs_async_service.query_shape_recorder", recorder)
+    for _ in range(3):
+        XhsDataService._record_query_shape("list", is_new=True, is_changed=True)
+    XhsDataService._record_query_shape("count", is_new=True, is_changed=True)
+    XhsDataService._record_query_shape("list", author_user_id="u1")
+    XhsDataService._record_query_shape(
+        "list", keyword="穿搭",
+        filters='[{"id":"is_important","value":"true","variant":"boolean","operator":"eq"}]',
+        sort='[{"id":"liked_count","desc":true}]',
+    )
+    return recorder.snapshot()
+
+
+def test_recorded_shapes_describe_predicates_without_values(monkeypatch):
+    shapes = record_shapes(monkeypatch)
+
+    assert shapes[0] == {
+        **shapes[0],
+        "kind": "list",
+        "predicates": ["is_deleted = false", "is_new = true OR is_changed = true"],
+        "order": ["last_crawl_time desc"],
+        "count": 3,
+    }
+    assert {"kind": "count", "order": []}.items() <= shapes[1].items()
+    assert "author_user_id =" in shapes[2]["predicates"]
+    assert "is_important = true" in shapes[3]["predicates"]
+
+
+def test_union_of_flags_becomes_one_partial_index_per_flag(monkeypatch):
+    shapes = record_shapes(monkeypatch)
+
+    candidates, unindexed = candidate_indexes(shapes[0])
+    assert candidates == [
+        IndexSpec(("last_crawl_time",), ("is_deleted = false", "is_new = true")),
+        IndexSpec(("last_crawl_time",), ("is_changed = true", "is_deleted = false")),
+    ]
+    assert unindexed == []
+
+    candidates, unindexed = candidate_indexes(shapes[3])
+    assert candidates == [IndexSpec(("liked_count",), ("is_deleted = false", "is_important = true"))]
+    assert unindexed == ["title ilike OR desc ilike"]
+
+
+def test_proposals_are_matched_against_model_indexes(monkeypatch):
+    existing = existing_indexes()
+    proposals, unindexed = propose_indexes(record_shapes(monkeypatch), existing)
+    covered = {proposal.index.columns + proposal.index.where: proposal.covered_by for proposal in proposals}
+
+    assert covered[("last_crawl_time", "is_deleted = false", "is_new = true")] == "idx_note_live_new"
+    assert covered[("author_user_id", "last_crawl_time", "is_deleted = false")] == "idx_note_live_author"
+    assert covered[("liked_count", "is_deleted = false", "is_important = true")] is None
+    assert unindexed == {"title ilike OR desc ilike": 1}
+    assert redundant_indexes(existing) == []
+
+
+def test_redundant_indexes_detects_duplicates_and_prefixes():
+    indexes = [
+        IndexSpec(("author_user_id",), name="idx_author_id"),
+        IndexSpec(("author_user_id",), name="ix_xhs_notes_author_user_id"),
+        IndexSpec(("last_crawl_time",), name="idx_note_crawl_time"),
+        IndexSpec(("last_crawl_time", "liked_count"), name="idx_crawl_likes"),
+    ]
+    pairs = {(index.name, other.name) for index, other in redundant_indexes(indexes)}
+
+    assert pairs == {
+        ("ix_xhs_notes_author_user_id", "idx_author_id"),
+        ("idx_note_crawl_time", "idx_crawl_likes"),
+    }
@@ -0,0 +1,25 @@
+import json
+import random
+from urllib.parse import parse_qs, urlsplit
+
+from commands.loadtest_read import DEFAULT_MIX, QueryShape, load_mix
+
+
+def test_build_url_picks_choices_and_encodes_filters():
+    shape = QueryShape(
+        name="dsl",
+        path="/api/notes/",
+        params={"page": [3], "filters": [[{"id": "liked_count", "value": "10", "operator": "gte"}]]},
+    )
+
+    query = parse_qs(urlsplit(shape.build_url(random.Random(0))).query)
+
+    assert query["page"] == ["3"]
+    assert json.loads(query["filters"][0]) == [{"id": "liked_count", "value": "10", "operator": "gte"}]
+
+
+def test_default_mix_loads():
+    shapes = load_mix(None)
+
+    assert len(shapes) == len(DEFAULT_MIX)
+    assert all(shape.build_url(random.Random(1)).startswith(shape.path) for shape in shapes)
@@ -0,0 +1,39 @@
+import pytest
+
+from commands.benchmark import percentile
+from commands.synthetic import BatchPlanner, NoteMix, SyntheticNoteGenerator
+
+
+def test_generator_is_deterministic_and_versioned():
+    generator = SyntheticNoteGenerator(seed=1, keywords=["关键词"], keyword_hit_rate=1.0)
+
+    first = generator.raw_note(7)
+    assert generator.raw_note(7) == first
+    assert "关键词" in first["desc"]
+    assert len(first["note_id"]) == 24
+
+    changed = generator.raw_note(7, version=1)
+    assert changed["desc"] == first["desc"]
+    assert changed["interact_info"]["comment_count"] != first["interact_info"]["comment_count"]
+    assert generator.note_data(7).note_id == first["note_id"]
+
+
+def test_planner_follows_mix_and_never_reuses_existing_notes():
+    generator = SyntheticNoteGenerator()
+    mix = NoteMix.parse("50:30:20")
+    existing = BatchPlanner.existing_needed(mix, 10, 2)
+    planner = BatchPlanner(generator, mix, existing)
+
+    first = {note.note_id for note in planner.next_batch(10)}
+    second = {note.note_id for note in planner.next_batch(10)}
+
+    assert len(first) == len(second) == 10
+    assert not first & second
+    with pytest.raises(ValueError):
+        planner.next_batch(10)
+
+
+def test_percentile_interpolates():
+    assert percentile([1, 2, 3, 4], 50) == 2.5
+    assert percentile([5], 99) == 5
+    assert percentile([], 50) == 0.0
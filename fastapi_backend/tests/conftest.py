@@ -9,9 +9,10 @@ from app.config import settings
 from app.models.user import User
 from app.models.base import Base
 
-from app.database import get_user_db, get_async_session
+from app.database import get_user_db, get_async_session, get_read_session
 from app.main import app
 from app.services.users import get_jwt_strategy
+from app.services.keyword_registry import keyword_registry
 
 
 @pytest_asyncio.fixture(scope="function")
@@ -65,6 +66,10 @@ async def test_client(db_session):
     # Set up test database overrides
     app.dependency_overrides[get_user_db] = override_get_user_db
     app.dependency_overrides[get_async_session] = override_get_async_session
+    app.dependency_overrides[get_read_session] = override_get_async_session
+
+    # 每个测试使用独立数据库，注册表需从该库重新加载
+    keyword_registry.invalidate()
 
     async with AsyncClient(
         transport=ASGITransport(app=app), base_url="http://localhost:8000"
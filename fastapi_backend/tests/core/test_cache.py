@@ -0,0 +1,91 @@
+import pytest
+from starlette.requests import Request
+
+from app.core.cache import DataVersion, ResponseCache, compute_etag, data_version, etag_matches, versioned_json_response
+from app.services.xhs_async_service import XhsDataService
+
+
+def make_request(query_string: bytes = b"", headers=None):
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/api/notes/",
+        "query_string": query_string,
+        "headers": [(key.lower().encode(), value.encode()) for key, value in (headers or {}).items()],
+    }
+    return Request(scope)
+
+
+def test_data_version_bump_is_per_scope():
+    version = DataVersion()
+    notes, tasks = version.get("notes"), version.get("tasks")
+
+    version.bump("notes")
+
+    assert version.get("notes") != notes
+    assert version.get("tasks") == tasks
+
+
+def test_data_version_adopts_tokens_from_other_workers():
+    first, second = DataVersion(), DataVersion()
+    assert first.get("notes") != second.get("notes")
+
+    first.bump("notes")
+    second.receive({"scopes": ["notes"], "token": first.get("notes")})
+
+    assert second.get("notes") == first.get("notes")
+    assert second.changed_within(("notes",), 5)
+    assert not second.changed_within(("tasks",), 5)
+
+
+def test_etag_ignores_query_order_and_changes_with_version():
+    first = compute_etag(make_request(b"page=1&size=50"), ("notes",))
+    assert compute_etag(make_request(b"size=50&page=1"), ("notes",)) == first
+    assert compute_etag(make_request(b"page=2&size=50"), ("notes",)) != first
+
+    data_version.bump("notes")
+    assert compute_etag(make_request(b"page=1&size=50"), ("notes",)) != first
+
+
+def test_etag_matches_if_none_match_list():
+    etag = '"abc"'
+    assert etag_matches(make_request(headers={"If-None-Match": '"x", "abc"'}), etag)
+    assert etag_matches(make_request(headers={"If-None-Match": 'W/"abc"'}), etag)
+    assert not etag_matches(make_request(headers={"If-None-Match": '"x"'}), etag)
+    assert not etag_matches(make_request(), etag)
+
+
+def test_response_cache_evicts_least_recently_used():
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", b"1")
+    cache.put("b", b"2")
+    cache.get("a")
+    cache.put("c", b"3")
+
+    assert cache.get("a") == b"1"
+    assert cache.get("b") is None
+    assert cache.get("c") == b"3"
+
+
+class FailingSession:
+    async def execute(self, *args, **kwargs):
+        raise ConnectionRefusedError("database unavailable")
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_failed_query_is_not_cached():
+    request = make_request(b"page=1")
+    scopes = ("cache_failure_test",)
+    sessions = [FailingSession()]
+
+    async def build() -> bytes:
+        if sessions:
+            await XhsDataService(sessions.pop()).count_notes()
+        return b'{"total": 3}'
+
+    with pytest.raises(ConnectionRefusedError):
+        await versioned_json_response(request, scopes, build)
+
+    response = await versioned_json_response(request, scopes, build)
+    assert response.body == b'{"total": 3}'
+    assert response.headers["ETag"] == compute_etag(request, scopes)
@@ -0,0 +1,65 @@
+import pytest
+
+from app.core.events import (
+    MAX_EVENT_ERROR_LENGTH,
+    MAX_EVENT_ERRORS,
+    TaskEventBroker,
+    format_sse,
+    ingest_chunk_data,
+    task_events,
+)
+from app.core.pubsub import MAX_PAYLOAD_BYTES, MessageTooLarge, PubSub
+from app.core.serialization import json_dumps
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_broker_delivers_to_task_subscribers_only():
+    broker = TaskEventBroker()
+
+    with broker.subscribe("task-a") as queue_a, broker.subscribe("task-b") as queue_b:
+        broker.dispatch({"task_id": "task-a", "event": "progress", "data": {"progress": 10}})
+
+        message = queue_a.get_nowait()
+        assert message["event"] == "progress"
+        assert message["data"] == {"progress": 10}
+        assert queue_b.empty()
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_broker_replays_last_event_to_new_subscriber():
+    broker = TaskEventBroker()
+    broker.dispatch({"task_id": "task-a", "event": "progress", "data": {"progress": 10}})
+    broker.dispatch({"task_id": "task-a", "event": "progress", "data": {"progress": 60}})
+
+    with broker.subscribe("task-a") as queue:
+        assert queue.get_nowait()["data"] == {"progress": 60}
+        assert queue.empty()
+
+
+def test_format_sse():
+    assert format_sse("progress", {"progress": 5}, 7) == b'id: 7\nevent: progress\ndata: {"progress":5}\n\n'
+
+
+def test_ingest_chunk_data_caps_errors():
+    errors = [f"第 {index} 条笔记无效: " + "x" * 500 for index in range(1, 1001)]
+
+    data = ingest_chunk_data({"total_processed": 1000, "new_count": 0, "errors": errors})
+
+    assert data["total_processed"] == 1000
+    assert data["error_count"] == 1000
+    assert len(data["errors"]) == MAX_EVENT_ERRORS
+    assert all(len(error) <= MAX_EVENT_ERROR_LENGTH for error in data["errors"])
+    assert len(json_dumps(data)) <= MAX_PAYLOAD_BYTES
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_oversize_messages_are_refused_and_events_truncated():
+    with pytest.raises(MessageTooLarge):
+        await PubSub("memory").publish("test", {"data": "x" * MAX_PAYLOAD_BYTES})
+
+    with task_events.subscribe("task-oversize") as queue:
+        await task_events.publish("task-oversize", "ingest_chunk", {"errors": ["x" * MAX_PAYLOAD_BYTES]})
+
+        message = queue.get_nowait()
+        assert message["event"] == "ingest_chunk"
+        assert message["data"] == {"truncated": True}
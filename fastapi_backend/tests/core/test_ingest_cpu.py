@@ -0,0 +1,73 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import ingest_cpu
+from app.core.ingest_cpu import INLINE, PROCESS, IngestCpuPool, KeywordMatcher
+
+THRESHOLDS = {"liked_count": 1000, "comment_count": 100}
+
+
+def note(title, desc="", liked_count=0, comment_count=0):
+    return SimpleNamespace(title=title, desc=desc, liked_count=liked_count, comment_count=comment_count)
+
+
+NOTES = [
+    note("夏日穿搭", "通勤好物"),
+    note("Sofa 推荐"),
+    note("a.b 记录"),
+    note("普通笔记", liked_count=1001),
+    note(None, None, comment_count=100),
+]
+EXPECTED = [True, True, False, True, False]
+
+
+def test_keyword_matcher_escapes_terms_and_handles_empty_set():
+    matcher = KeywordMatcher(("穿搭", "sofa", "a+b"))
+
+    assert matcher.matches("今日穿搭")
+    assert not matcher.matches("a.b")
+    assert matcher.matches("x a+b y")
+    assert not KeywordMatcher(()).matches("任何内容")
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_inline_scoring():
+    pool = IngestCpuPool(INLINE, workers=1, chunk_size=2)
+
+    scores = pool.score(NOTES, ("穿搭", "sofa"), THRESHOLDS)
+
+    assert [await scores.get(index) for index in range(len(NOTES))] == EXPECTED
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_process_pool_scores_chunks_in_workers():
+    pool = IngestCpuPool(PROCESS, workers=2, chunk_size=2)
+    try:
+        await pool.start()
+        scores = pool.score(NOTES, ("穿搭", "sofa"), THRESHOLDS)
+        assert [await scores.get(index) for index in range(len(NOTES))] == EXPECTED
+
+        # 关键词变化后工作进程重新编译
+        scores = pool.score(NOTES, ("记录",), THRESHOLDS)
+        assert [await scores.get(index) for index in range(len(NOTES))] == [False, False, True, True, False]
+    finally:
+        pool.shutdown()
+
+
+def test_unknown_mode_rejected():
+    with pytest.raises(ValueError):
+        IngestCpuPool("threads", workers=1, chunk_size=10)
+
+
+def test_default_workers_split_across_web_workers(monkeypatch):
+    monkeypatch.setattr(ingest_cpu.os, "cpu_count", lambda: 8)
+
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    assert IngestCpuPool(INLINE, workers=0, chunk_size=10).workers == 4
+    monkeypatch.setenv("WEB_CONCURRENCY", "2")
+    assert IngestCpuPool(INLINE, workers=0, chunk_size=10).workers == 2
+    monkeypatch.setenv("WEB_CONCURRENCY", "8")
+    assert IngestCpuPool(INLINE, workers=0, chunk_size=10).workers == 1
+    # 显式设置时不再均分
+    assert IngestCpuPool(INLINE, workers=3, chunk_size=10).workers == 3
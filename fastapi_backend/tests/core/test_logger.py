@@ -0,0 +1,47 @@
+import logging
+
+import orjson
+
+from app.core.logger import JSONFormatter, Logger, SamplingFilter, _parse_levels
+
+
+def make_record(level=logging.INFO, **fields):
+    record = logging.LogRecord("fastapi_app.notes", level, __file__, 1, "创建新笔记: %s", ("n1",), None)
+    record.__dict__.update(fields)
+    return record
+
+
+def test_json_formatter_flattens_structured_fields():
+    payload = orjson.loads(JSONFormatter().format(make_record(total=3, duration_ms=1.5)))
+
+    assert payload["message"] == "创建新笔记: n1"
+    assert payload["logger"] == "fastapi_app.notes"
+    assert payload["total"] == 3
+    assert payload["duration_ms"] == 1.5
+    assert "args" not in payload
+
+
+def test_sampling_filter_keeps_warnings():
+    muted = SamplingFilter(0)
+
+    assert not muted.filter(make_record(logging.DEBUG))
+    assert muted.filter(make_record(logging.WARNING))
+    assert SamplingFilter(1).filter(make_record(logging.DEBUG))
+
+
+def test_parse_levels():
+    assert _parse_levels("fastapi_app.notes=debug, httpx=WARNING,bad") == {
+        "fastapi_app.notes": "DEBUG",
+        "httpx": "WARNING",
+    }
+
+
+def test_disabled_level_skips_formatting():
+    class Exploding:
+        def __str__(self):
+            raise AssertionError("不应被格式化")
+
+    logger = Logger("fastapi_app.test_disabled")
+    logging.getLogger("fastapi_app.test_disabled").setLevel(logging.INFO)
+
+    logger.debug("值: %s", Exploding())
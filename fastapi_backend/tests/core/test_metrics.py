@@ -0,0 +1,79 @@
+import time
+
+from fastapi import BackgroundTasks, FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.metrics import (
+    REQUEST_DB_QUERIES,
+    REQUEST_DURATION,
+    REQUESTS_IN_FLIGHT,
+    REQUESTS_TOTAL,
+    Histogram,
+    MetricsMiddleware,
+    record_query,
+)
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("demo_seconds", "demo", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5, "/a")
+
+    lines = histogram.render()
+
+    assert 'demo_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 'demo_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'demo_seconds_count{route="/a"} 3' in lines
+
+
+def test_middleware_labels_by_route_template_and_counts_queries():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        record_query(0.002)
+        record_query(0.003)
+        return {"item_id": item_id}
+
+    labels = ("GET", "/items/{item_id}")
+    before_requests = REQUESTS_TOTAL.value(*labels, "200")
+    before_queries = REQUEST_DB_QUERIES.sum(*labels)
+
+    response = TestClient(app).get("/items/42")
+
+    assert response.status_code == 200
+    assert 'desc="2 queries"' in response.headers["server-timing"]
+    assert REQUESTS_TOTAL.value(*labels, "200") == before_requests + 1
+    assert REQUEST_DB_QUERIES.sum(*labels) == before_queries + 2
+
+
+def test_background_tasks_are_not_counted_in_request_metrics():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+    in_flight = []
+
+    def ingest():
+        in_flight.append(REQUESTS_IN_FLIGHT.value())
+        record_query(0.5)
+        time.sleep(0.3)
+
+    @app.post("/hooks")
+    async def hook(background_tasks: BackgroundTasks):
+        record_query(0.001)
+        background_tasks.add_task(ingest)
+        return {"status": "received"}
+
+    labels = ("POST", "/hooks")
+    before_duration = REQUEST_DURATION.sum(*labels)
+    before_queries = REQUEST_DB_QUERIES.sum(*labels)
+    before_in_flight = REQUESTS_IN_FLIGHT.value()
+
+    response = TestClient(app).post("/hooks")
+
+    assert response.status_code == 200
+    assert in_flight == [before_in_flight]
+    assert REQUEST_DURATION.sum(*labels) - before_duration < 0.3
+    assert REQUEST_DB_QUERIES.sum(*labels) == before_queries + 1
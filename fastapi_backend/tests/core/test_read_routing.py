@@ -0,0 +1,51 @@
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.core.read_routing import STICKY_COOKIE, ReadYourWritesMiddleware, prefers_primary
+
+
+def make_app():
+    app = FastAPI()
+    app.add_middleware(ReadYourWritesMiddleware)
+
+    @app.get("/read")
+    async def read(request: Request):
+        return {"primary": prefers_primary(request)}
+
+    @app.post("/write")
+    async def write():
+        return {"ok": True}
+
+    @app.post("/fail", status_code=400)
+    async def fail():
+        return {"ok": False}
+
+    return app
+
+
+def test_reads_use_primary_without_replica(monkeypatch):
+    monkeypatch.setattr(settings, "READ_DATABASE_URL", None)
+
+    assert TestClient(make_app()).get("/read").json() == {"primary": True}
+
+
+def test_successful_write_makes_client_sticky(monkeypatch):
+    monkeypatch.setattr(settings, "READ_DATABASE_URL", "postgresql://replica/db")
+    client = TestClient(make_app())
+
+    assert client.get("/read").json() == {"primary": False}
+    assert STICKY_COOKIE not in client.post("/fail").cookies
+
+    response = client.post("/write")
+    assert float(response.cookies[STICKY_COOKIE]) > time.time()
+    assert client.get("/read").json() == {"primary": True}
+
+
+def test_expired_sticky_cookie_reads_replica(monkeypatch):
+    monkeypatch.setattr(settings, "READ_DATABASE_URL", "postgresql://replica/db")
+    client = TestClient(make_app(), cookies={STICKY_COOKIE: str(time.time() - 1)})
+
+    assert client.get("/read").json() == {"primary": False}
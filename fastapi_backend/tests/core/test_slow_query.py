@@ -0,0 +1,43 @@
+from app.core.slow_query import BACKGROUND_ROUTE, SlowQueryTracer, normalize_sql, parameter_shapes
+
+
+def test_normalize_sql_folds_literals_and_in_lists():
+    first = normalize_sql("SELECT * FROM xhs_notes WHERE note_id IN ($1, $2)\n AND liked_count > 10 LIMIT $3")
+    second = normalize_sql("SELECT * FROM xhs_notes WHERE note_id IN ($1, $2, $3, $4) AND liked_count > 99 LIMIT $5")
+
+    assert first == second
+    assert first == "SELECT * FROM xhs_notes WHERE note_id IN (...) AND liked_count > ? LIMIT ?"
+    assert normalize_sql("SELECT 'it''s'") == "SELECT ?"
+
+
+def test_parameter_shapes_hide_values():
+    assert parameter_shapes(("secret", 3, None, ["a", "b"])) == ["str", "int", "null", "list[2]"]
+    assert parameter_shapes([("a", 1), ("b", 2)], executemany=True) == {"rows": 2, "row": ["str", "int"]}
+
+
+def test_tracer_summarizes_by_fingerprint():
+    tracer = SlowQueryTracer(threshold_ms=100)
+
+    tracer.record("SELECT * FROM t WHERE id = $1", ("x",), 120.0)
+    tracer.record("SELECT * FROM t WHERE id = $1", ("y",), 300.0)
+
+    summary = tracer.summary()
+    assert len(summary) == 1
+    assert summary[0]["count"] == 2
+    assert summary[0]["max_ms"] == 300.0
+    assert summary[0]["routes"] == [BACKGROUND_ROUTE]
+    assert len(tracer.recent) == 2
+
+
+def test_explain_skips_locking_and_side_effect_statements():
+    from app.services.ingest_lanes import _LOCK_NOTES
+
+    tracer = SlowQueryTracer(threshold_ms=100)
+
+    assert tracer._should_explain("k", "SELECT * FROM xhs_notes WHERE note_id = $1", 500.0)
+    assert not tracer._should_explain("k", str(_LOCK_NOTES), 500.0)
+    assert not tracer._should_explain("k", "SELECT pg_try_advisory_lock($1)", 500.0)
+    assert not tracer._should_explain("k", "SELECT pg_advisory_unlock($1)", 500.0)
+    assert not tracer._should_explain("k", "SELECT pg_notify($1, $2)", 500.0)
+    assert not tracer._should_explain("k", "SELECT nextval('seq')", 500.0)
+    assert not tracer._should_explain("k", "SELECT * FROM xhs_notes WHERE id = $1 FOR UPDATE", 500.0)
@@ -0,0 +1,90 @@
+import json
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.core.webhook_signature import WebhookSignatureMiddleware, sign
+
+SECRET = "s3cret"
+
+
+def make_app(secret=SECRET):
+    app = FastAPI()
+    app.add_middleware(WebhookSignatureMiddleware, secret=secret)
+    app.state.parsed = 0
+
+    @app.post("/api/webhook/data")
+    async def receive(request: Request):
+        payload = await request.json()
+        app.state.parsed += 1
+        return {
+            "payload": payload,
+            "verified": getattr(request.state, "webhook_signature_verified", False),
+            "digest": getattr(request.state, "webhook_body_digest", b"").hex(),
+        }
+
+    @app.post("/api/other")
+    async def other():
+        return {"ok": True}
+
+    return app
+
+
+def test_valid_signature_passes():
+    app = make_app()
+    body = json.dumps({"a": 1}).encode()
+
+    response = TestClient(app).post(
+        "/api/webhook/data", content=body, headers={"X-Hub-Signature-256": sign(SECRET, body)}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["payload"] == {"a": 1}
+    assert response.json()["verified"] is True
+    assert len(response.json()["digest"]) == 64
+
+
+def test_missing_or_malformed_signature_rejected():
+    app = make_app()
+    client = TestClient(app)
+
+    assert client.post("/api/webhook/data", content=b"{}").status_code == 401
+    assert client.post("/api/webhook/data", content=b"{}", headers={"X-Hub-Signature-256": "md5=00"}).status_code == 401
+    assert client.post("/api/webhook/data", content=b"{}", headers={"X-Hub-Signature-256": "sha256=zz"}).status_code == 401
+    assert app.state.parsed == 0
+
+
+def test_bad_signature_rejected_before_parsing():
+    app = make_app()
+    body = b'{"a": 1}'
+
+    response = TestClient(app).post(
+        "/api/webhook/data", content=body, headers={"X-Hub-Signature-256": sign("wrong", body)}
+    )
+
+    assert response.status_code == 401
+    assert response.json() == {"detail": "webhook 签名校验失败"}
+    assert app.state.parsed == 0
+
+
+def test_chunked_body_verified_incrementally():
+    app = make_app()
+    chunks = [b'{"items": [', b"1, 2, ", b"3]}"]
+
+    response = TestClient(app).post(
+        "/api/webhook/data",
+        content=iter(chunks),
+        headers={"X-Hub-Signature-256": sign(SECRET, b"".join(chunks))},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["payload"] == {"items": [1, 2, 3]}
+
+
+def test_other_paths_and_unset_secret_pass_through():
+    assert TestClient(make_app()).post("/api/other").status_code == 200
+
+    unsigned = TestClient(make_app(secret=None)).post("/api/webhook/data", content=b'{"a": 1}')
+    assert unsigned.status_code == 200
+    assert unsigned.json()["verified"] is False
+    assert unsigned.json()["digest"] == ""
@@ -0,0 +1,168 @@
+"""
+Keywords 路由测试
+测试关键词注册表与写接口的一致性
+"""
+
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import status
+from httpx import ASGITransport, AsyncClient
+
+from app.database import get_async_session, get_read_session
+from app.main import app
+from app.models.keyword import BusinessKeyword
+from app.models.note import XhsNote
+from app.services.keyword_registry import keyword_registry
+
+
+class TestKeywords:
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_keyword_writes_are_visible_in_list_and_stats(self, test_client, db_session):
+        """写接口提交后，列表、分类和统计立即反映变更"""
+        for payload in (
+            {"keyword": "装修", "category": "家居", "weight": 3},
+            {"keyword": "沙发", "category": "家居", "weight": 5},
+            {"keyword": "护肤", "category": "美妆", "weight": 5},
+        ):
+            response = await test_client.post("/api/keywords/", json=payload)
+            assert response.status_code == status.HTTP_200_OK
+        keyword_id = response.json()["id"]
+
+        response = await test_client.get("/api/keywords/", params={"limit": 2})
+        result = response.json()
+        assert result["total"] == 3
+        assert [item["keyword"] for item in result["keywords"]] == ["沙发", "护肤"]
+        assert result["categories"] == ["家居", "美妆"]
+
+        response = await test_client.patch(f"/api/keywords/{keyword_id}/toggle")
+        assert response.json()["is_active"] is False
+
+        response = await test_client.get("/api/keywords/stats")
+        assert response.json() == {
+            "total": 3,
+            "active": 2,
+            "inactive": 1,
+            "category_stats": {"家居": 2, "美妆": 1},
+            "weight_stats": {"权重3": 1, "权重5": 2},
+        }
+
+        response = await test_client.delete(f"/api/keywords/{keyword_id}")
+        assert response.status_code == status.HTTP_200_OK
+        response = await test_client.get("/api/keywords/categories")
+        assert response.json() == ["家居"]
+
+        # 重新从数据库加载后结果一致
+        keyword_registry.invalidate()
+        response = await test_client.get("/api/keywords/", params={"active_only": False})
+        assert response.json()["total"] == 2
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_bulk_import_reports_counts_and_export_round_trips(self, test_client, db_session):
+        """批量导入按关键词 upsert，导出文件可再次导入"""
+        await test_client.post("/api/keywords/", json={"keyword": "装修", "category": "家居", "weight": 3})
+        await test_client.post("/api/keywords/", json={"keyword": "沙发", "category": "家居", "weight": 5})
+
+        content = "keyword,category,weight\n装修,家居,3\n沙发,家居,8\n护肤,美妆,5\n".encode("utf-8")
+        response = await test_client.post(
+            "/api/keywords/bulk", files={"file": ("keywords.csv", content, "text/csv")}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {"total": 3, "created": 1, "updated": 1, "unchanged": 1}
+
+        response = await test_client.get("/api/keywords/", params={"search": "沙发"})
+        assert response.json()["keywords"][0]["weight"] == 8
+
+        response = await test_client.get("/api/keywords/export", params={"format": "ndjson"})
+        assert response.status_code == status.HTTP_200_OK
+        exported = response.content
+        assert len(exported.splitlines()) == 3
+
+        response = await test_client.post(
+            "/api/keywords/bulk", files={"file": ("keywords.ndjson", exported, "application/x-ndjson")}
+        )
+        assert response.json() == {"total": 3, "created": 0, "updated": 0, "unchanged": 3}
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_bulk_import_rejects_invalid_file(self, test_client, db_session):
+        response = await test_client.post(
+            "/api/keywords/bulk", files={"file": ("keywords.txt", b"keyword\n", "text/plain")}
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        response = await test_client.post(
+            "/api/keywords/bulk", files={"file": ("keywords.csv", b"name\n", "text/csv")}
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "keyword" in response.json()["detail"]
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_preview_counts_matches_and_importance_delta(self, test_client, db_session):
+        """预览按标题/描述匹配，统计新增和失去重要标记的笔记"""
+        db_session.add_all([
+            XhsNote(note_id="note_sofa_1", title="布艺沙发推荐", desc="客厅", is_important=False),
+            XhsNote(note_id="note_sofa_2", title="客厅", desc="真皮SOFA保养", is_important=True),
+            XhsNote(note_id="note_paint_1", title="墙面刷漆", desc="", is_important=True),
+            XhsNote(note_id="note_paint_2", title="刷漆教程", is_important=True, liked_count=5000),
+            XhsNote(note_id="note_deleted", title="沙发", is_deleted=True),
+        ])
+        await db_session.commit()
+
+        response = await test_client.post("/api/keywords/preview", json={
+            "keywords": ["沙发", "Sofa", "sofa"],
+            "mode": "replace",
+            "sample_size": 1,
+        })
+        assert response.status_code == status.HTTP_200_OK
+        result = response.json()
+
+        assert [(item["keyword"], item["match_count"], item["newly_important"]) for item in result["keywords"]] == [
+            ("沙发", 1, 1),
+            ("sofa", 1, 0),
+        ]
+        assert len(result["keywords"][0]["samples"]) == 1
+        assert result["total_matches"] == 2
+        assert result["newly_important"] == 1
+        # note_paint_1 不再命中任何关键词；note_paint_2 仍因互动数据保持重要
+        assert result["no_longer_important"] == 1
+        assert result["estimated"] is False
+        assert result["timed_out"] is False
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_registry_is_loaded_from_primary_not_replica():
+    """只读副本可能延迟，注册表只从主库会话加载"""
+    now = datetime.utcnow()
+    keyword = BusinessKeyword(
+        id=uuid.uuid4(), keyword="装修", category="家居", weight=1, is_active=True,
+        description=None, created_at=now, updated_at=now,
+    )
+
+    class PrimarySession:
+        async def execute(self, statement):
+            return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: [keyword]))
+
+    class ReplicaSession:
+        async def execute(self, statement):
+            raise AssertionError("注册表不应从只读副本加载")
+
+    async def primary():
+        yield PrimarySession()
+
+    async def replica():
+        yield ReplicaSession()
+
+    app.dependency_overrides[get_async_session] = primary
+    app.dependency_overrides[get_read_session] = replica
+    keyword_registry.invalidate()
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/api/keywords/categories")
+    finally:
+        app.dependency_overrides.clear()
+        keyword_registry.invalidate()
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == ["家居"]
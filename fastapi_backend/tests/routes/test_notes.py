@@ -3,11 +3,17 @@ Notes 路由测试
 测试笔记查询功能
 """
 
+import csv
+import io
+import json
+
 import pytest
 from fastapi import status
 from unittest.mock import AsyncMock, patch
 from app.models.note import XhsNote
-from sqlalchemy import insert
+from app.services.note_archive import archive_notes
+from app.services.note_export import EXPORT_FIELD_NAMES
+from sqlalchemy import insert, update
 
 
 class TestNotes:
@@ -216,4 +222,148 @@ class TestNotes:
         assert response.status_code == status.HTTP_404_NOT_FOUND
         result = response.json()
         assert "detail" in result
-        assert result["detail"] == "笔记不存在" 
\ No newline at end of file
+        assert result["detail"] == "笔记不存在"
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_export_notes_ndjson(self, test_client, db_session):
+        """测试流式导出笔记（NDJSON）"""
+        for i in range(3):
+            await db_session.execute(insert(XhsNote).values(
+                note_id=f"test_export_{i}",
+                title=f"导出笔记 {i}",
+                is_new=i != 1,
+                is_changed=False,
+                is_important=False
+            ))
+        await db_session.commit()
+
+        filters = '[{"id":"is_new","value":"true","variant":"boolean","operator":"eq"}]'
+        response = await test_client.get(f"/api/notes/export?format=ndjson&filters={filters}")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = response.text.strip().splitlines()
+        assert len(lines) == 2
+        assert all('"is_new": true' in line for line in lines)
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_export_notes_csv(self, test_client, db_session):
+        """测试 CSV 导出的表头与转义"""
+        await db_session.execute(insert(XhsNote).values(
+            note_id="test_export_csv",
+            title='含逗号, "引号"\n和换行',
+            tags=["穿搭", "通勤"],
+            liked_count=12
+        ))
+        await db_session.commit()
+
+        response = await test_client.get("/api/notes/export?format=csv")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("text/csv")
+        assert response.content.startswith("\ufeff".encode("utf-8"))
+        rows = list(csv.reader(io.StringIO(response.content.decode("utf-8-sig"))))
+        assert rows[0] == EXPORT_FIELD_NAMES
+        assert len(rows) == 2
+        row = dict(zip(rows[0], rows[1]))
+        assert row["note_id"] == "test_export_csv"
+        assert row["title"] == '含逗号, "引号"\n和换行'
+        assert json.loads(row["tags"]) == ["穿搭", "通勤"]
+        assert row["liked_count"] == "12"
+        assert row["desc"] == ""
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_export_notes_parquet(self, test_client, db_session):
+        """测试 Parquet 导出可被 pyarrow 读回"""
+        pq = pytest.importorskip("pyarrow.parquet")
+        for i in range(3):
+            await db_session.execute(insert(XhsNote).values(
+                note_id=f"test_export_pq_{i}",
+                title=f"导出笔记 {i}",
+                tags=["标签"],
+                liked_count=i
+            ))
+        await db_session.commit()
+
+        response = await test_client.get("/api/notes/export?format=parquet&batch_size=100")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"] == "application/vnd.apache.parquet"
+        table = pq.read_table(io.BytesIO(response.content))
+        assert table.column_names == EXPORT_FIELD_NAMES
+        rows = sorted(table.to_pylist(), key=lambda row: row["note_id"])
+        assert [row["liked_count"] for row in rows] == [0, 1, 2]
+        assert json.loads(rows[0]["tags"]) == ["标签"]
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_export_notes_parquet_without_pyarrow(self, test_client, db_session):
+        """测试未安装 pyarrow 时 Parquet 导出返回 501"""
+        with patch("app.routes.notes.parquet_available", return_value=False):
+            response = await test_client.get("/api/notes/export?format=parquet")
+
+        assert response.status_code == status.HTTP_501_NOT_IMPLEMENTED
+        assert response.json()["detail"] == "服务端未安装 pyarrow，无法导出 Parquet"
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_search_notes_with_fields(self, test_client, db_session):
+        """测试稀疏字段集只返回指定列"""
+        await db_session.execute(insert(XhsNote).values(
+            note_id="test_fields_1",
+            title="字段测试",
+            desc="不应返回的正文",
+            liked_count=7
+        ))
+        await db_session.commit()
+
+        response = await test_client.get("/api/notes/?fields=title,liked_count")
+        assert response.status_code == status.HTTP_200_OK
+        note = response.json()["notes"][0]
+        assert set(note) == {"id", "note_id", "title", "liked_count"}
+
+        response = await test_client.get("/api/notes/?fields=title,unknown_field")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_archive_and_restore_note(self, test_client, db_session):
+        """测试软删除笔记归档后可查询和恢复"""
+        await db_session.execute(insert(XhsNote).values(note_id="test_archive_1", title="归档笔记", liked_count=3))
+        await db_session.execute(insert(XhsNote).values(note_id="test_archive_2", title="保留笔记"))
+        await db_session.execute(
+            update(XhsNote).where(XhsNote.note_id == "test_archive_1").values(is_deleted=True)
+        )
+        await db_session.commit()
+
+        moved = await archive_notes(db_session, cold_before=None, batch_size=10)
+        assert moved == {"deleted": 1, "cold": 0}
+
+        response = await test_client.get("/api/notes/archived?include_deleted=true")
+        assert response.status_code == status.HTTP_200_OK
+        result = response.json()
+        assert result["total"] == 1
+        assert result["notes"][0]["note_id"] == "test_archive_1"
+        assert result["notes"][0]["archive_reason"] == "deleted"
+
+        response = await test_client.post("/api/notes/archived/test_archive_1/restore")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["liked_count"] == 3
+
+        response = await test_client.get("/api/notes/?include_deleted=true")
+        assert {note["note_id"] for note in response.json()["notes"]} == {"test_archive_1", "test_archive_2"}
+
+        response = await test_client.post("/api/notes/archived/test_archive_1/restore")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_search_notes_by_tags(self, test_client, db_session):
+        """测试按 JSONB 标签列筛选（contains / overlaps）"""
+        await db_session.execute(insert(XhsNote).values(note_id="test_tags_1", tags=["穿搭", "夏日"], current_tags=["new"]))
+        await db_session.execute(insert(XhsNote).values(note_id="test_tags_2", tags=["美食"], current_tags=["changed"]))
+        await db_session.commit()
+
+        filters = '[{"id":"tags","value":["穿搭","夏日"],"operator":"contains"}]'
+        response = await test_client.get(f"/api/notes/?filters={filters}")
+        assert [note["note_id"] for note in response.json()["notes"]] == ["test_tags_1"]
+
+        filters = '[{"id":"current_tags","value":["changed","important"],"operator":"overlaps"}]'
+        response = await test_client.get(f"/api/notes/?filters={filters}")
+        assert [note["note_id"] for note in response.json()["notes"]] == ["test_tags_2"]
@@ -3,8 +3,14 @@ Webhook 路由测试
 测试webhook接收和数据处理功能
 """
 
+import json
+
 import pytest
 from fastapi import status
+from sqlalchemy import select
+
+from app.models.note import XhsNote
+from app.models.webhook import WebhookReceipt
 
 
 class TestWebhook:
@@ -31,4 +37,41 @@ class TestWebhook:
         )
         
         # 应该返回422验证错误
-        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY 
\ No newline at end of file
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_webhook_retry_returns_original_result(self, test_client, db_session):
+        """相同请求体的重试不再入库，返回首次处理结果"""
+        body = json.dumps({
+            "status": "success",
+            "message": "ok",
+            "timestamp": "2025-01-01T00:00:00",
+            "run_id": "run-1",
+            "data": {"notes": [{"note_id": "64b8f0c1000000001e03a1b2", "title": "标题"}]},
+        }).encode()
+        headers = {"Content-Type": "application/json"}
+
+        first = await test_client.post("/api/webhook/xhs-result", content=body, headers=headers)
+        assert first.status_code == status.HTTP_200_OK
+        assert "Idempotent-Replay" not in first.headers
+
+        retry = await test_client.post("/api/webhook/xhs-result", content=body, headers=headers)
+        assert retry.status_code == status.HTTP_200_OK
+        assert retry.headers["Idempotent-Replay"] == "true"
+        assert retry.json()["message"] == first.json()["message"]
+        assert retry.json()["processed_count"] == 1
+
+        note = (await db_session.execute(select(XhsNote))).scalar_one()
+        assert note.crawl_count == 1
+        receipt = (await db_session.execute(select(WebhookReceipt))).scalar_one()
+        assert receipt.run_id == "run-1" and receipt.completed
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_rejected_webhook_is_not_recorded(self, test_client, db_session):
+        """校验失败的回调不占用幂等记录"""
+        for _ in range(2):
+            response = await test_client.post("/api/webhook/xhs-result", json={"invalid_field": 1})
+            assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+        assert (await db_session.execute(select(WebhookReceipt))).scalars().all() == []
+
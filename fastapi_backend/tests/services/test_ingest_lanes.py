@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.models.note import XhsNote
+from app.schemas.notes import ProcessResult
+from app.services import ingest_lanes
+from app.services.ingest_lanes import ingest_partitioned, partition_notes
+from app.services.xhs_async_service import XhsDataService
+from commands.synthetic import SyntheticNoteGenerator
+
+
+def make_notes(count):
+    generator = SyntheticNoteGenerator()
+    return [generator.note_data(index) for index in range(count)]
+
+
+def test_same_note_stays_in_one_lane_in_order():
+    notes = make_notes(50)
+    updated = SyntheticNoteGenerator().note_data(7, version=1)
+
+    partitions = partition_notes(notes + [updated], 4)
+
+    assert sum(len(partition) for partition in partitions) == 51
+    assert sum(1 for partition in partitions if partition) > 1
+    lane = next(partition for partition in partitions if updated in partition)
+    positions = [i for i, note in enumerate(lane) if note.note_id == updated.note_id]
+    assert [lane[i] for i in positions] == [notes[7], updated]
+    # 分区只取决于 note_id，重复分区结果一致
+    assert partition_notes(notes + [updated], 4) == partitions
+
+
+def test_single_lane_keeps_batch_order():
+    notes = make_notes(10)
+
+    assert partition_notes(notes, 1) == [notes]
+    assert partition_notes(notes, 0) == [notes]
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_partitioned_ingest_merges_lane_results(engine, db_session, monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_LANES", 4)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    notes = make_notes(20)
+    updated = SyntheticNoteGenerator().note_data(3, version=1)
+
+    result = await ingest_partitioned(
+        XhsDataService(db_session), notes + [updated], 4, session_factory, asyncio.Semaphore(3)
+    )
+
+    assert result.total_processed == 21
+    assert result.new_count == 20
+    assert result.errors == []
+    async with session_factory() as db:
+        assert await db.scalar(select(func.count(XhsNote.id))) == 20
+        stored = await db.scalar(select(XhsNote.comment_count).where(XhsNote.note_id == updated.note_id))
+    assert stored == updated.comment_count
+
+
+class CountingSessions:
+    """记录同时打开的会话数"""
+
+    def __init__(self):
+        self.open = 0
+        self.peak = 0
+        self.opened = 0
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        self.open += 1
+        self.opened += 1
+        self.peak = max(self.peak, self.open)
+        return object()
+
+    async def __aexit__(self, *exc):
+        self.open -= 1
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_extra_lane_sessions_share_process_limit(monkeypatch):
+    async def fake_lane(service, notes):
+        await asyncio.sleep(0.01)
+        return ProcessResult(total_processed=len(notes), new_count=0, changed_count=0, important_count=0)
+
+    monkeypatch.setattr(ingest_lanes, "_ingest_lane", fake_lane)
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 3)
+    sessions = CountingSessions()
+    slots = asyncio.Semaphore(ingest_lanes.lane_session_limit())
+
+    results = await asyncio.gather(*[
+        ingest_partitioned(XhsDataService(object()), make_notes(40), 8, sessions, slots)
+        for _ in range(5)
+    ])
+
+    assert all(result.total_processed == 40 for result in results)
+    # 分区数截断为连接池大小，5 个并发批次的额外分区合计最多占用 pool_size - 1 个连接
+    assert sessions.opened == 5 * 2
+    assert sessions.peak == 2
@@ -0,0 +1,75 @@
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.schemas.keywords import KeywordFileFormat
+from app.services.keyword_bulk import ENCODERS, KeywordImportError, parse_keywords, upsert_keywords
+
+ROWS = [("沙发", None, 5, True, None), ('逗号,"引号"', "家居", 2, False, "说明")]
+
+
+async def partitions():
+    yield ROWS
+
+
+def test_parse_csv_keeps_last_duplicate_and_tracks_columns():
+    content = "\ufeffkeyword,category,weight\n装修,家居,3\n沙发,,5\n装修,家居,4\n".encode("utf-8")
+
+    items = parse_keywords(content, KeywordFileFormat.CSV)
+
+    assert [(item.keyword, item.category, item.weight) for item in items] == [("沙发", None, 5), ("装修", "家居", 4)]
+    # 文件中没有的列不参与更新
+    assert items[0].model_fields_set == {"keyword", "category", "weight"}
+
+
+@pytest.mark.parametrize("content, message", [
+    (b'[{"keyword": "a", "weight": "x"}]', "第 1 条数据无效: weight"),
+    (b'"keywords"', "导入数据应为关键词列表"),
+    (b"[1", "JSON 解析失败"),
+    (b'[{"keyword": "  "}]', "关键词不能为空"),
+])
+def test_parse_rejects_invalid_input(content, message):
+    with pytest.raises(KeywordImportError, match=message):
+        parse_keywords(content, KeywordFileFormat.JSON)
+
+
+@pytest.mark.asyncio(loop_scope="function")
+@pytest.mark.parametrize("format", list(KeywordFileFormat))
+async def test_export_round_trips_through_import(format):
+    content = b"".join([chunk async for chunk in ENCODERS[format](partitions())])
+
+    items = parse_keywords(content, format)
+
+    assert [
+        (item.keyword, item.category, item.weight, item.is_active, item.description) for item in items
+    ] == ROWS
+
+
+class RecordingSession:
+    """记录 upsert 语句，不访问数据库"""
+
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return self
+
+    def all(self):
+        return []
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_upsert_only_updates_columns_present_on_each_item():
+    content = b'{"keyword": "a", "weight": 3}\n{"keyword": "b", "category": "c"}\n{"keyword": "d", "weight": 1}\n'
+    items = parse_keywords(content, KeywordFileFormat.NDJSON)
+    db = RecordingSession()
+
+    await upsert_keywords(db, items)
+
+    updates = []
+    for statement in db.statements:
+        compiled = statement.compile(dialect=postgresql.dialect())
+        keywords = sorted(value for name, value in compiled.params.items() if name.startswith("keyword"))
+        set_clause = str(compiled).split("DO UPDATE SET", 1)[1].split("WHERE", 1)[0]
+        updates.append((keywords, "weight" in set_clause, "category" in set_clause))
+    assert sorted(updates) == [(["a", "d"], True, False), (["b"], False, True)]
@@ -0,0 +1,35 @@
+import pytest
+
+from app.schemas.keywords import KeywordPreviewMode
+from app.services.keyword_preview import KeywordPreview, like_pattern, normalize_keywords
+
+
+def test_like_pattern_escapes_wildcards():
+    assert like_pattern("100%_纯棉\\") == "%100\\%\\_纯棉\\\\%"
+
+
+def test_normalize_keywords_lowercases_and_deduplicates():
+    assert normalize_keywords([" Sofa", "sofa", "", "沙发 "]) == ["sofa", "沙发"]
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_exhausted_budget_returns_partial_result():
+    class Session:
+        rolled_back = False
+
+        async def execute(self, statement):
+            raise AssertionError("预算用完后不应再执行语句")
+
+        async def rollback(self):
+            self.rolled_back = True
+
+    session = Session()
+    preview = KeywordPreview(session, time_budget_ms=100)
+    preview._deadline = 0
+
+    result = await preview.run(["沙发"], KeywordPreviewMode.REPLACE)
+
+    assert result["timed_out"] is True
+    assert result["keywords"] == []
+    assert result["total_matches"] is None and result["no_longer_important"] is None
+    assert session.rolled_back
@@ -0,0 +1,90 @@
+import time
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.keyword_registry import KeywordEntry, KeywordRegistry
+
+
+def make_entry(keyword, category=None, weight=1, is_active=True):
+    now = datetime(2025, 1, 1)
+    return KeywordEntry(uuid.uuid4(), keyword, category, weight, is_active, None, now, now)
+
+
+def loaded_registry(*entries):
+    registry = KeywordRegistry(max_age_seconds=300)
+    registry._loaded_at = time.monotonic()
+    for entry in entries:
+        registry.receive({"op": "upsert", "keyword": entry.to_message()})
+    return registry
+
+
+def test_search_orders_filters_and_counts():
+    registry = loaded_registry(
+        make_entry("装修", "家居", weight=3),
+        make_entry("Sofa", "家居", weight=5),
+        make_entry("护肤", "美妆", weight=5),
+        make_entry("停用词", weight=9, is_active=False),
+    )
+
+    page, total = registry.search(limit=2)
+    assert total == 3
+    assert [entry.keyword for entry in page] == ["Sofa", "护肤"]
+
+    page, total = registry.search(category="家居", search="so")
+    assert total == 1 and page[0].keyword == "Sofa"
+
+    _, total = registry.search(active_only=False)
+    assert total == 4
+    assert registry.active_terms == ("sofa", "护肤", "装修")
+
+
+def test_stats_and_categories():
+    registry = loaded_registry(
+        make_entry("装修", "家居", weight=3),
+        make_entry("沙发", "家居", weight=3),
+        make_entry("护肤", "美妆", weight=5, is_active=False),
+    )
+
+    assert registry.categories() == ["家居", "美妆"]
+    assert registry.stats() == {
+        "total": 3,
+        "active": 2,
+        "inactive": 1,
+        "category_stats": {"家居": 2, "美妆": 1},
+        "weight_stats": {"权重3": 2, "权重5": 1},
+    }
+
+
+def test_receive_applies_remote_changes():
+    entry = make_entry("装修", "家居")
+    registry = loaded_registry(entry)
+
+    updated = KeywordEntry(**{**entry.__dict__, "is_active": False})
+    registry.receive({"op": "upsert", "keyword": updated.to_message()})
+    assert registry.active_terms == ()
+
+    registry.receive({"op": "remove", "id": str(entry.id)})
+    assert registry.search(active_only=False) == ([], 0)
+
+    registry.receive({"op": "reload"})
+    assert not registry.loaded
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_changes_received_while_loading_are_not_lost():
+    registry = KeywordRegistry(max_age_seconds=300)
+    entry = make_entry("装修")
+
+    class LoadingSession:
+        async def execute(self, statement):
+            # 快照查询进行中，其他 worker 新增了关键词
+            registry.receive({"op": "upsert", "keyword": entry.to_message()})
+            return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: []))
+
+    await registry.ensure_loaded(LoadingSession())
+
+    assert registry.loaded
+    assert registry.active_terms == ("装修",)
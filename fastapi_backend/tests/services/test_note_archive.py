@@ -0,0 +1,34 @@
+import pytest
+from sqlalchemy import func, insert, select, update
+
+from app.models.note import XhsNote, XhsNoteArchive
+from app.services import xhs_async_service
+from app.services.note_archive import archive_notes
+from app.services.xhs_async_service import XhsDataService
+from commands.synthetic import SyntheticNoteGenerator
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_batch_restores_only_archived_notes(db_session, monkeypatch):
+    generator = SyntheticNoteGenerator()
+    archived_note, new_note = generator.note_data(0), generator.note_data(1)
+    await db_session.execute(insert(XhsNote).values(note_id=archived_note.note_id, title="归档笔记"))
+    await db_session.execute(update(XhsNote).values(is_deleted=True))
+    await db_session.commit()
+    await archive_notes(db_session, cold_before=None, batch_size=10)
+
+    restored = []
+    restore = xhs_async_service.restore_archived_note
+
+    async def counting_restore(db, note_id):
+        restored.append(note_id)
+        return await restore(db, note_id)
+
+    monkeypatch.setattr(xhs_async_service, "restore_archived_note", counting_restore)
+
+    result = await XhsDataService(db_session).process_notes_batch([archived_note, new_note])
+
+    assert restored == [archived_note.note_id]
+    assert result.new_count == 1
+    assert await db_session.scalar(select(func.count(XhsNote.id))) == 2
+    assert await db_session.scalar(select(func.count()).select_from(XhsNoteArchive)) == 0
@@ -0,0 +1,61 @@
+import csv
+import io
+
+import pytest
+
+from app.services.note_export import EXPORT_FIELD_NAMES, encode_csv, encode_parquet
+
+
+def make_row(note_id, **values):
+    row = dict.fromkeys(EXPORT_FIELD_NAMES)
+    row.update(note_id=note_id, **values)
+    return tuple(row[field] for field in EXPORT_FIELD_NAMES)
+
+
+async def iterate(partitions):
+    for rows in partitions:
+        yield rows
+
+
+async def collect(stream):
+    return [chunk async for chunk in stream]
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_csv_streams_one_chunk_per_partition():
+    partitions = [[make_row("a"), make_row("b")], [make_row("c")]]
+
+    chunks = await collect(encode_csv(iterate(partitions)))
+
+    # 表头单独一块，之后每个分批一块，不会攒到最后才输出
+    assert len(chunks) == 3
+    assert chunks[0].decode("utf-8-sig") == ",".join(EXPORT_FIELD_NAMES) + "\r\n"
+    assert [row[0] for row in csv.reader(io.StringIO(chunks[1].decode()))] == ["a", "b"]
+    assert [row[0] for row in csv.reader(io.StringIO(chunks[2].decode()))] == ["c"]
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_csv_escapes_delimiters_and_json_fields():
+    title = '逗号, "引号"\n换行'
+    chunks = await collect(encode_csv(iterate([[make_row("a", title=title, tags=["穿搭"])]])))
+
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode("utf-8-sig"))))
+    row = dict(zip(rows[0], rows[1]))
+    assert row["title"] == title
+    assert row["tags"] == '["穿搭"]'
+    assert row["desc"] == ""
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_parquet_writes_one_row_group_per_partition():
+    pq = pytest.importorskip("pyarrow.parquet")
+    partitions = [[make_row("a", liked_count=1)], [make_row("b", liked_count=2, tags=["标签"])]]
+
+    data = b"".join(await collect(encode_parquet(iterate(partitions))))
+
+    parquet_file = pq.ParquetFile(io.BytesIO(data))
+    assert parquet_file.metadata.num_row_groups == 2
+    rows = parquet_file.read().to_pylist()
+    assert [row["note_id"] for row in rows] == ["a", "b"]
+    assert [row["liked_count"] for row in rows] == [1, 2]
+    assert rows[1]["tags"] == '["标签"]'
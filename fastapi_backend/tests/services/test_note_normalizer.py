@@ -0,0 +1,95 @@
+from datetime import datetime
+
+import pytest
+
+from app.schemas.notes import XhsNoteData
+from app.services.note_normalizer import (
+    NOTE_COLUMNS,
+    NoteRow,
+    Source,
+    compile_normalizer,
+    normalize_note,
+    normalize_notes,
+    parse_count,
+)
+from commands.synthetic import SyntheticNoteGenerator
+
+NOTE_ID = "64b8f0c1000000001e03a1b2"
+
+
+@pytest.mark.parametrize("value, expected", [
+    (12, 12), ("99871", 99871), ("1,234", 1234), ("1.2万", 12000), ("3亿", 300000000),
+    ("10w+", 100000), ("1.5k", 1500), (" 7 ", 7), (None, 0), ("", 0), ("赞", 0),
+])
+def test_parse_count(value, expected):
+    assert parse_count(value) == expected
+
+
+def test_raw_note_card_maps_to_row():
+    row = normalize_note({
+        "id": NOTE_ID,
+        "model_type": "note",
+        "xsec_token": "token",
+        "note_card": {
+            "type": "video",
+            "display_title": "标题",
+            "user": {"user_id": "u1", "nick_name": "作者", "avatar": "avatar.jpg", "xsec_token": "user-token"},
+            "interact_info": {"liked_count": "1.2万", "collected_count": "86361", "comment_count": "2557", "shared_count": "22727"},
+            "cover": {"url_pre": "pre.jpg", "url_default": "cover.jpg"},
+            "image_list": [{"info_list": [
+                {"image_scene": "WB_PRV", "url": "prv.jpg"},
+                {"image_scene": "WB_DFT", "url": "dft.jpg"},
+            ]}],
+            "time": 1735689600000,
+        },
+    })
+
+    assert row == NoteRow(
+        note_id=NOTE_ID,
+        note_url=f"https://www.xiaohongshu.com/explore/{NOTE_ID}",
+        note_type="video",
+        author_user_id="u1",
+        author_nickname="作者",
+        author_avatar="avatar.jpg",
+        title="标题",
+        upload_time=datetime(2025, 1, 1),
+        liked_count=12000,
+        collected_count=86361,
+        comment_count=2557,
+        share_count=22727,
+        video_cover="cover.jpg",
+        image_list=["dft.jpg"],
+        xsec_token="token",
+    )
+
+
+def test_flat_note_matches_pydantic_model():
+    raw = SyntheticNoteGenerator().raw_note(3)
+
+    row = normalize_note(raw)
+
+    assert NOTE_COLUMNS == tuple(XhsNoteData.model_fields)
+    assert XhsNoteData(**row._asdict()) == XhsNoteData(
+        **{**raw, **{f"author_{key}": value for key, value in raw["author"].items()}, **raw["interact_info"]}
+    )
+
+
+def test_note_card_and_flat_formats_agree():
+    generator = SyntheticNoteGenerator()
+
+    flat, card = normalize_note(generator.raw_note(5)), normalize_note(generator.note_card(5))
+
+    assert card._replace(xsec_token=None, video_cover=None) == flat._replace(xsec_token=None)
+
+
+def test_normalize_notes_skips_unknown_items_and_collects_invalid_notes():
+    batch = normalize_notes([{"foo": 1}, {"note_id": NOTE_ID}, {"note_id": "n1"}, {"note_id": NOTE_ID, "upload_time": "昨天"}])
+
+    assert [row.note_id for row in batch.notes] == [NOTE_ID]
+    assert batch.indexes == [1]
+    assert batch.errors == ["第 3 条笔记无效: note_id 无效", "第 4 条笔记无效: 无法解析时间: 昨天"]
+
+
+def test_compile_normalizer_rejects_mismatched_columns():
+    with pytest.raises(ValueError):
+        compile_normalizer({"note_id": Source(("item.note_id",))})
@@ -0,0 +1,66 @@
+from app.schemas.notes import XhsNoteData
+from app.services.note_normalizer import NoteRow
+from app.services.note_validation import compile_conformance, prepare_notes
+from commands.synthetic import SyntheticNoteGenerator
+
+
+def make_items(count):
+    generator = SyntheticNoteGenerator()
+    return [generator.raw_note(index) for index in range(count)]
+
+
+def test_well_formed_notes_pass_without_pydantic_models():
+    items = make_items(3)
+
+    batch = prepare_notes(items)
+
+    assert batch.invalid == []
+    assert batch.indexes == [0, 1, 2]
+    assert all(isinstance(note, NoteRow) for note in batch.notes)
+    assert [note.note_id for note in batch.notes] == [item["note_id"] for item in items]
+
+
+def test_invalid_notes_are_collected_with_index():
+    items = make_items(5)
+    items[1] = {**items[1], "title": 5}
+    items[3] = {**items[3], "note_id": "n1"}
+    items[4] = {**items[4], "tags": [1, "a"]}
+
+    batch = prepare_notes(items)
+
+    assert batch.indexes == [0, 2]
+    assert [note.index for note in batch.invalid] == [1, 3, 4]
+    assert batch.errors[0] == "第 2 条笔记无效: title Input should be a valid string"
+    assert batch.errors[1] == "第 4 条笔记无效: note_id 无效"
+    assert batch.errors[2].startswith("第 5 条笔记无效: tags.0")
+
+
+def test_coercible_values_are_converted_by_pydantic():
+    items = make_items(2)
+    items[1] = {**items[1], "tags": ("a", "b")}
+
+    batch = prepare_notes(items)
+
+    assert batch.invalid == []
+    assert isinstance(batch.notes[0], NoteRow)
+    assert isinstance(batch.notes[1], XhsNoteData)
+    assert batch.notes[1].tags == ["a", "b"]
+
+
+def test_trusted_source_skips_validation():
+    items = make_items(2)
+    items[1] = {**items[1], "title": 5}
+
+    batch = prepare_notes(items, trusted=True)
+
+    assert batch.invalid == []
+    assert batch.notes[1].title == 5
+
+
+def test_conformance_checks_exact_types():
+    conforms = compile_conformance(XhsNoteData)
+    row = prepare_notes(make_items(1)).notes[0]
+
+    assert conforms(row)
+    assert not conforms(row._replace(liked_count=True))
+    assert not conforms(row._replace(image_list=["a", None]))
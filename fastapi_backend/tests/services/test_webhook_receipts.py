@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.webhook import WebhookReceipt
+from app.services.webhook_receipts import claim_receipt
+
+DIGEST = b"\x01" * 32
+
+
+async def add_receipt(db_session, age, response=None, completed=False):
+    created_at = datetime.utcnow() - age
+    db_session.add(WebhookReceipt(
+        digest=DIGEST,
+        run_id="run-1",
+        response=response,
+        completed=completed,
+        created_at=created_at,
+        expires_at=created_at + timedelta(hours=48),
+    ))
+    await db_session.commit()
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_crashed_claim_is_reclaimed_after_lease(db_session):
+    # 抢占后 worker 退出，未写入响应
+    await add_receipt(db_session, timedelta(minutes=30))
+
+    assert await claim_receipt(db_session, DIGEST, lease_seconds=600) is None
+
+    receipt = await db_session.get(WebhookReceipt, DIGEST, populate_existing=True)
+    assert receipt.response is None and receipt.run_id is None and not receipt.completed
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_uncompleted_ingest_is_reclaimed_after_lease(db_session):
+    # 已返回“已接收”，后台入库完成前 worker 退出
+    await add_receipt(db_session, timedelta(minutes=30), response={"status": "received"})
+
+    assert await claim_receipt(db_session, DIGEST, lease_seconds=600) is None
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_receipt_within_lease_or_completed_is_replayed(db_session):
+    await add_receipt(db_session, timedelta(minutes=1), response={"status": "received"})
+    assert (await claim_receipt(db_session, DIGEST, lease_seconds=600)).response == {"status": "received"}
+
+    receipt = await db_session.get(WebhookReceipt, DIGEST)
+    receipt.completed = True
+    receipt.created_at = datetime.utcnow() - timedelta(hours=1)
+    await db_session.commit()
+    assert (await claim_receipt(db_session, DIGEST, lease_seconds=600)).completed
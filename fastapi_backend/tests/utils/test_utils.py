@@ -1,5 +1,17 @@
+from datetime import datetime
+
 from fastapi.routing import APIRoute
-from app.utils import simple_generate_unique_route_id
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql
+
+from app.models.note import XhsNote
+from app.utils import (
+    simple_generate_unique_route_id,
+    parse_fields,
+    compile_filters,
+    apply_filters_to_query,
+    apply_sorting_to_query,
+)
 
 
 def test_simple_generate_unique_route_id(mocker):
@@ -11,3 +23,75 @@ def test_simple_generate_unique_route_id(mocker):
     unique_id = simple_generate_unique_route_id(mock_route)
 
     assert unique_id == "auth-authenticate_user"
+
+
+def test_parse_fields():
+    assert parse_fields(None) == []
+    assert parse_fields("") == []
+    assert parse_fields(" title, liked_count,,title ") == ["title", "liked_count"]
+
+
+def test_compile_filters_reuses_clause_for_same_shape():
+    first, first_params = compile_filters(
+        [{"id": "title", "value": "穿搭", "operator": "iLike"},
+         {"id": "is_new", "value": "true", "variant": "boolean", "operator": "eq"}],
+        XhsNote,
+    )
+    second, second_params = compile_filters(
+        [{"id": "title", "value": "美食", "operator": "iLike"},
+         {"id": "is_new", "value": "false", "variant": "boolean", "operator": "eq"}],
+        XhsNote,
+    )
+
+    assert first is second
+    assert first_params == {"flt_0": "%穿搭%", "flt_1": True}
+    assert second_params == {"flt_0": "%美食%", "flt_1": False}
+
+
+def test_apply_filters_statement_cache_key_ignores_values():
+    def build(value):
+        query = select(func.count(XhsNote.id))
+        return apply_filters_to_query(
+            query, [{"id": "liked_count", "value": value, "operator": "inArray"}], XhsNote
+        )
+
+    assert build(["1", "2"])._generate_cache_key() == build([3])._generate_cache_key()
+
+
+def test_filters_and_sort_only_allow_whitelisted_columns():
+    clause, params = compile_filters(
+        [{"id": "comments", "value": "x"},
+         {"id": "is_deleted", "value": "true", "operator": "eq"},
+         {"id": "liked_count", "value": "abc", "operator": "gt"}],
+        XhsNote,
+    )
+    assert clause is None and params == {}
+
+    query = apply_sorting_to_query(select(XhsNote.id), [{"id": "metadata", "desc": True}], XhsNote)
+    assert query._order_by_clauses == ()
+
+
+def test_tag_filters_compile_to_jsonb_operators():
+    clause, params = compile_filters(
+        [{"id": "tags", "value": ["穿搭", "夏日"], "operator": "contains"},
+         {"id": "current_tags", "value": "changed", "operator": "overlaps"},
+         {"id": "tags", "value": ["x"], "operator": "inArray"},
+         {"id": "tags", "value": "x", "operator": "iLike"}],
+        XhsNote,
+    )
+    sql = str(clause.compile(dialect=postgresql.dialect()))
+
+    assert "xhs_notes.tags @> " in sql
+    assert sql.count("?|") == 2
+    assert "ILIKE" not in sql
+    assert params == {"flt_0": ["穿搭", "夏日"], "flt_1": ["changed"], "flt_2": ["x"]}
+
+
+def test_date_filters_accept_millisecond_timestamps():
+    _, params = compile_filters(
+        [{"id": "last_crawl_time", "value": "1760832000000", "operator": "gte"},
+         {"id": "last_crawl_time", "value": "2025-10-19T08:00:00", "operator": "lte"}],
+        XhsNote,
+    )
+
+    assert params == {"flt_0": datetime(2025, 10, 19, 0, 0), "flt_1": datetime(2025, 10, 19, 8, 0)}